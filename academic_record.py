@@ -2,15 +2,23 @@ import smartpy as sp
 
 @sp.module
 def main():
+    # Compact course entry: grade is an index into the grade scale and term is year * 10 + season
+    # (see record_schema.py for the encoding and the off-chain encode/decode helpers)
+    t_course: type = sp.TRecord(grade=sp.TNat, term=sp.TNat)
+    # Transcript: courses keyed by course code
+    t_transcript: type = sp.TMap(sp.TNat, t_course)
+
     class AcademicRecord(sp.Contract):
         # Constructor for initializing the AcademicRecord contract
-        def __init__(self, student_identifier, record_details, owner_address, required_approvals):
+        def __init__(self, student_identifier, record_details, owner_address, required_approvals, signatories, proposal_lifetime=7 * 24 * 3600, metadata_url=""):
             # Initialize the contract's storage
             self.init(
+                # TZIP-16 metadata pointer; metadata_url is where the generated metadata JSON is published (e.g., an ipfs:// URL)
+                metadata=sp.utils.metadata_of_url(metadata_url),
                 # Unique identifier for the student (e.g., student ID or hash)
                 student_identifier=student_identifier,
-                # Detailed academic record (e.g., courses, grades)
-                record_details=record_details,
+                # Detailed academic record: courses keyed by course code, with grade and term
+                record_details=sp.set_type_expr(record_details, t_transcript),
                 # Timestamp of record creation
                 creation_timestamp=sp.timestamp_from_utc_now(),
                 # Timestamp for the last update, initialized as None
@@ -19,18 +27,36 @@ def main():
                 record_hash=self.generate_hash(record_details),
                 # Address of the record's owner (e.g., educational institution)
                 owner=owner_address,
-                # Mapping of proposal IDs to their details for multisig functionality
-                proposals=sp.map(tkey=sp.TNat, tvalue=sp.TRecord(approvals=sp.TSet(sp.TAddress), proposed_changes=sp.TBytes)),
+                # Mapping of proposal IDs to their details and expiry for multisig functionality
+                # (code_hash is set on upgrade proposals: the hash of the packed code they approve, and proposed_owner
+                # on ownership change proposals: the owner they approve)
+                proposals=sp.big_map(tkey=sp.TNat, tvalue=sp.TRecord(approvals=sp.TSet(sp.TAddress), proposed_changes=t_transcript, expires_at=sp.TTimestamp, code_hash=sp.TOption(sp.TBytes), proposed_owner=sp.TOption(sp.TAddress))),
+                # Monotonic counter for proposal IDs, never reused after a proposal is removed
+                next_proposal_id=sp.nat(0),
+                # Lowest proposal ID that may still be stored; cleanup_expired scans forward from here
+                oldest_proposal_id=sp.nat(0),
+                # Number of seconds a proposal stays open for approvals and execution
+                proposal_lifetime=proposal_lifetime,
                 # Number of approvals required for a proposal to pass
-                required_approvals=required_approvals
+                required_approvals=required_approvals,
+                # Addresses allowed to approve proposals, including upgrade proposals
+                signatories=sp.set_type_expr(signatories, sp.TSet(sp.TAddress))
             )
+            # TZIP-16 metadata with off-chain views, so wallets and the frontend can read without fees
+            self.init_metadata("academic_record_metadata", {
+                "name": "GradeBlock Academic Record",
+                "interfaces": ["TZIP-016"],
+                "views": [self.offchain_get_record, self.offchain_get_record_hash, self.offchain_verify_integrity, self.offchain_get_proposal_status],
+            })
 
         # Entry point for updating the academic record
         @sp.entry_point
         def update_record(self, params):
             # Validate the new details and check multisig approval before updating
             self.validate_input(params.new_details)
-            self.verify_multisig(params.proposal_id)
+            self.verify_update(params.proposal_id)
+            # The details must be the ones the signatories approved
+            sp.verify(sp.pack(params.new_details) == sp.pack(self.data.proposals[params.proposal_id].proposed_changes), "Change does not match the proposal.")
 
             # Update the record details, timestamps, and hash
             self.data.record_details = params.new_details
@@ -38,63 +64,189 @@ def main():
             new_hash = self.generate_hash(params.new_details)
             sp.verify(new_hash != self.data.record_hash, "No changes detected.")
             self.data.record_hash = new_hash
+            # Consume the proposal so it cannot be replayed
+            del self.data.proposals[params.proposal_id]
+            # Report the new hash so off-chain consumers do not need to read the storage
+            sp.emit(sp.record(proposal_id=params.proposal_id, record_hash=new_hash), tag="record_updated")
 
-        # Entry point for retrieving the academic record
-        @sp.entry_point
-        def retrieve_record(self, params):
-            # Check if the requestor is authorized (owner or an approved signatory)
-            sp.verify(sp.sender == self.data.owner or sp.sender in self.data.proposals[params.proposal_id].approvals, "Access Denied.")
-            # Return the record details
+        # On-chain view for retrieving the academic record
+        # (storage is public on-chain, so reads are not restricted to the owner)
+        @sp.onchain_view()
+        def get_record(self):
             sp.result(self.data.record_details)
 
-        # Entry point for verifying the integrity of the academic record
-        @sp.entry_point
-        def verify_record(self, params):
+        # On-chain view for retrieving the record hash
+        @sp.onchain_view()
+        def get_record_hash(self):
+            sp.result(self.data.record_hash)
+
+        # On-chain view for verifying the integrity of the academic record
+        @sp.onchain_view()
+        def verify_integrity(self):
             # Compute the hash of the record details and compare with the stored hash
-            computed_hash = self.generate_hash(self.data.record_details)
-            sp.verify(computed_hash == self.data.record_hash, "Record integrity check failed.")
-        
+            sp.result(self.generate_hash(self.data.record_details) == self.data.record_hash)
+
+        # On-chain view for the status of a proposal
+        @sp.onchain_view()
+        def get_proposal_status(self, proposal_id):
+            sp.result(self.proposal_status(proposal_id))
+
+        # Off-chain (TZIP-16) counterparts of the views above, run by wallets through the RPC at no cost
+        @sp.offchain_view(pure=True, name="get_record")
+        def offchain_get_record(self):
+            sp.result(self.data.record_details)
+
+        @sp.offchain_view(pure=True, name="get_record_hash")
+        def offchain_get_record_hash(self):
+            sp.result(self.data.record_hash)
+
+        @sp.offchain_view(pure=True, name="verify_integrity")
+        def offchain_verify_integrity(self):
+            sp.result(self.generate_hash(self.data.record_details) == self.data.record_hash)
+
+        @sp.offchain_view(pure=True, name="get_proposal_status")
+        def offchain_get_proposal_status(self, proposal_id):
+            sp.result(self.proposal_status(proposal_id))
+
         # Entry point for changing the ownership of the academic record
-        @sp.entry_point
+        # (rarely used, so lazy: its code is kept in a big_map and only loaded when it is called)
+        @sp.entry_point(lazify=True)
         def change_ownership(self, new_owner_address, proposal_id):
             # Validate the new owner address and verify multisig approval
             self.validate_input(new_owner_address)
             self.verify_multisig(proposal_id)
+            # The new owner must be the one the signatories approved
+            proposed_owner = self.data.proposals[proposal_id].proposed_owner.open_some("Proposal is not an ownership change.")
+            sp.verify(new_owner_address == proposed_owner, "Change does not match the proposal.")
 
             # Change the ownership and update timestamps
             sp.verify(new_owner_address != sp.none, "Invalid new owner address.")
             self.data.owner = new_owner_address
             self.update_timestamps(update_creation=True)
+            # Consume the proposal so it cannot be replayed
+            del self.data.proposals[proposal_id]
+            # Report the new owner
+            sp.emit(sp.record(proposal_id=proposal_id, owner=new_owner_address), tag="ownership_changed")
 
         # Utility function to generate a hash of the record details
         def generate_hash(self, details):
             return sp.blake2b(sp.pack(details))
 
-        # Entry point to propose an update to the academic record
-        @sp.entry_point
-        def propose_update(self, proposal_details, proposal_id):
-            # Verify the sender's authorization and create a new proposal
+        # Entry point to propose an update to the academic record (lazy, like the rest of the proposal machinery)
+        @sp.entry_point(lazify=True)
+        def propose_update(self, proposal_details):
+            # Verify the sender's authorization and create a new proposal under the next proposal ID
             sp.verify(sp.sender == self.data.owner, "Unauthorized: Only the owner can propose updates.")
-            self.data.proposals[proposal_id] = sp.record(approvals=sp.set(), proposed_changes=proposal_details)
+            proposal_id = self.data.next_proposal_id
+            self.data.next_proposal_id += 1
+            self.data.proposals[proposal_id] = sp.record(approvals=sp.set(), proposed_changes=proposal_details, expires_at=sp.add_seconds(sp.now, self.data.proposal_lifetime), code_hash=sp.none, proposed_owner=sp.none)
+            # Report the new proposal ID and its expiry
+            sp.emit(sp.record(proposal_id=proposal_id, expires_at=self.data.proposals[proposal_id].expires_at), tag="proposal_created")
 
-        # Entry point for signatories to approve a proposed update
+        # Entry point to propose transferring the record to a new owner
+        @sp.entry_point(lazify=True)
+        def propose_ownership_change(self, new_owner_address):
+            # The proposal names the new owner, so the signatories approve who receives the record
+            sp.verify(sp.sender == self.data.owner, "Unauthorized: Only the owner can propose updates.")
+            proposal_id = self.data.next_proposal_id
+            self.data.next_proposal_id += 1
+            self.data.proposals[proposal_id] = sp.record(approvals=sp.set(), proposed_changes={}, expires_at=sp.add_seconds(sp.now, self.data.proposal_lifetime), code_hash=sp.none, proposed_owner=sp.some(new_owner_address))
+            # Report the new proposal ID and its expiry
+            sp.emit(sp.record(proposal_id=proposal_id, expires_at=self.data.proposals[proposal_id].expires_at), tag="proposal_created")
+
+        # Entry point to propose replacing the code of a lazy entry point
+        @sp.entry_point(lazify=True)
+        def propose_upgrade(self, code_hash):
+            # code_hash is blake2b(pack(new_code)) of the variant later passed to upgrade; the proposal goes through
+            # the same approvals and expiry as any other, and leaves the record details unchanged (so it carries no changes)
+            sp.verify(sp.sender == self.data.owner, "Unauthorized: Only the owner can propose updates.")
+            proposal_id = self.data.next_proposal_id
+            self.data.next_proposal_id += 1
+            self.data.proposals[proposal_id] = sp.record(approvals=sp.set(), proposed_changes={}, expires_at=sp.add_seconds(sp.now, self.data.proposal_lifetime), code_hash=sp.some(code_hash), proposed_owner=sp.none)
+            # Report the new proposal ID, its expiry and the code hash it approves
+            sp.emit(sp.record(proposal_id=proposal_id, expires_at=self.data.proposals[proposal_id].expires_at, code_hash=code_hash), tag="upgrade_proposed")
+
+        # Entry point to install the code approved by an upgrade proposal
         @sp.entry_point
+        def upgrade(self, proposal_id, new_code):
+            # new_code is a variant naming the lazy entry point to replace and carrying its new code
+            self.verify_approvals(proposal_id)
+            code_hash = self.data.proposals[proposal_id].code_hash.open_some("Proposal is not an upgrade.")
+            sp.verify(sp.blake2b(sp.pack(new_code)) == code_hash, "Code does not match the proposal.")
+            if new_code.is_variant("change_ownership"):
+                sp.set_entry_point("change_ownership", new_code.open_variant("change_ownership"))
+            if new_code.is_variant("propose_update"):
+                sp.set_entry_point("propose_update", new_code.open_variant("propose_update"))
+            if new_code.is_variant("propose_ownership_change"):
+                sp.set_entry_point("propose_ownership_change", new_code.open_variant("propose_ownership_change"))
+            if new_code.is_variant("approve_update"):
+                sp.set_entry_point("approve_update", new_code.open_variant("approve_update"))
+            if new_code.is_variant("cleanup_expired"):
+                sp.set_entry_point("cleanup_expired", new_code.open_variant("cleanup_expired"))
+            # Consume the proposal so the upgrade cannot be replayed
+            del self.data.proposals[proposal_id]
+            # Report the installed code by the hash it was approved under
+            sp.emit(sp.record(proposal_id=proposal_id, code_hash=code_hash), tag="upgraded")
+
+        # Entry point for signatories to approve a proposed update
+        @sp.entry_point(lazify=True)
         def approve_update(self, proposal_id):
-            # Verify the existence of the proposal and add the sender's approval
+            # Verify the existence of the proposal and add the sender's approval; only signatories can approve
             sp.verify(self.data.proposals.contains(proposal_id), "Proposal not found.")
+            sp.verify(sp.now < self.data.proposals[proposal_id].expires_at, "Proposal expired.")
+            sp.verify(self.data.signatories.contains(sp.sender), "Unauthorized: Only signatories can approve.")
             self.data.proposals[proposal_id].approvals.add(sp.sender)
+            # Report the approval count, so consumers see when the proposal passes
+            sp.emit(sp.record(proposal_id=proposal_id, approvals=sp.len(self.data.proposals[proposal_id].approvals)), tag="proposal_approved")
+
+        # Entry point to reclaim storage of expired proposals, visiting at most `limit` IDs per call
+        @sp.entry_point(lazify=True)
+        def cleanup_expired(self, limit):
+            # Proposal IDs are monotonic, so the scan starts at the oldest ID that may still be stored. Proposals that
+            # are still open are stepped over, so expired ones behind them are reclaimed too; oldest_proposal_id is a
+            # low-water mark that only advances over IDs that are no longer stored
+            visited = 0
+            advancing = True
+            proposal_id = self.data.oldest_proposal_id
+            removed = sp.list(t=sp.TNat)
+            while visited < limit and proposal_id < self.data.next_proposal_id:
+                if self.data.proposals.contains(proposal_id):
+                    if sp.now >= self.data.proposals[proposal_id].expires_at:
+                        del self.data.proposals[proposal_id]
+                        removed.push(proposal_id)
+                    else:
+                        advancing = False
+                if advancing:
+                    self.data.oldest_proposal_id = proposal_id + 1
+                proposal_id += 1
+                visited += 1
+            # Report the removed proposal IDs
+            sp.emit(sp.record(removed=removed, oldest_proposal_id=self.data.oldest_proposal_id), tag="proposals_expired")
 
         # Entry point to execute an update to the academic record upon proposal approval
         @sp.entry_point
         def execute_update(self, proposal_id):
             # Verify the proposal's approval and apply the changes to the record
-            self.verify_multisig(proposal_id)
+            self.verify_update(proposal_id)
             new_details = self.data.proposals[proposal_id].proposed_changes
             self.data.record_details = new_details
             self.data.last_updated_timestamp = sp.timestamp_from_utc_now()
             self.data.record_hash = self.generate_hash(new_details)
             # Optionally, remove the executed proposal
             del self.data.proposals[proposal_id]
+            # Report the new hash so off-chain consumers do not need to read the storage
+            sp.emit(sp.record(proposal_id=proposal_id, record_hash=self.data.record_hash), tag="record_updated")
+
+        # Utility function to summarize a proposal for the status views
+        def proposal_status(self, proposal_id):
+            sp.verify(self.data.proposals.contains(proposal_id), "Proposal not found.")
+            proposal = self.data.proposals[proposal_id]
+            return sp.record(
+                approvals=sp.len(proposal.approvals),
+                required_approvals=self.data.required_approvals,
+                expires_at=proposal.expires_at,
+                approved=sp.len(proposal.approvals) >= self.data.required_approvals and sp.now < proposal.expires_at
+            )
 
         # Utility function to validate input data
         def validate_input(self, input_data):
@@ -110,9 +262,22 @@ def main():
 
         # Utility function to verify multisig approval for a proposal
         def verify_multisig(self, proposal_id):
+            self.verify_approvals(proposal_id)
+            # Upgrade proposals only approve code, not record changes
+            sp.verify(self.data.proposals[proposal_id].code_hash.is_none(), "Proposal is an upgrade.")
+
+        # Utility function to verify multisig approval for a proposal of record changes
+        def verify_update(self, proposal_id):
+            self.verify_multisig(proposal_id)
+            # Ownership change proposals carry no record changes
+            sp.verify(self.data.proposals[proposal_id].proposed_owner.is_none(), "Proposal is an ownership change.")
+
+        # Utility function to check that a proposal is open and has the required approvals
+        def verify_approvals(self, proposal_id):
             # Check the proposal's existence and if it has the required number of approvals
             sp.verify(self.data.proposals.contains(proposal_id), "Proposal not found.")
             proposal = self.data.proposals[proposal_id]
+            sp.verify(sp.now < proposal.expires_at, "Proposal expired.")
             sp.verify(sp.len(proposal.approvals) >= self.data.required_approvals, "Insufficient approvals for the proposal.")
 
 
@@ -125,22 +290,97 @@ def test_academic_record():
     admin = sp.test_account("Administrator")
     student = sp.test_account("Student")
 
-    # Instantiate the contract
-    academic_record_contract = AcademicRecord(student_identifier="123456", record_details={"courses": []}, owner_address=admin.address)
+    # Instantiate the contract, with the administrator as the only signatory
+    academic_record_contract = AcademicRecord(student_identifier="123456", record_details={}, owner_address=admin.address, required_approvals=1, signatories=sp.set([admin.address]))
     scenario += academic_record_contract
 
-    # Test updating academic records (this should succeed)
-    new_record_details = {"courses": [{"name": "Math", "grade": "A"}]}
-    academic_record_contract.update_record(new_details=new_record_details).run(sender=admin)
+    # Test updating academic records through an approved proposal (this should succeed)
+    # Math (course 101): A (grade 1) in 2024 Fall (term 20243)
+    new_record_details = {101: sp.record(grade=1, term=20243)}
+    academic_record_contract.propose_update(proposal_details=new_record_details).run(sender=admin)
+    academic_record_contract.update_record(new_details=new_record_details, proposal_id=0).run(sender=admin, valid=False)
+    academic_record_contract.approve_update(proposal_id=0).run(sender=admin)
+    # Test that only the approved details can be written
+    academic_record_contract.update_record(new_details={101: sp.record(grade=0, term=20243)}, proposal_id=0).run(sender=admin, valid=False)
+    academic_record_contract.update_record(new_details=new_record_details, proposal_id=0).run(sender=admin)
+    # Test that the executed proposal cannot be replayed
+    academic_record_contract.update_record(new_details=new_record_details, proposal_id=0).run(sender=admin, valid=False)
+
+    # Test reading the academic record through views
+    scenario.verify(academic_record_contract.get_record() == new_record_details)
+    scenario.verify(academic_record_contract.verify_integrity())
+
+    # Test changing ownership through an approved proposal (this should succeed)
+    academic_record_contract.propose_ownership_change(student.address).run(sender=student, valid=False)
+    academic_record_contract.propose_ownership_change(student.address).run(sender=admin)
+    academic_record_contract.approve_update(proposal_id=1).run(sender=admin)
+    # An ownership change proposal carries no record changes
+    academic_record_contract.execute_update(proposal_id=1).run(sender=admin, valid=False)
+    # Test that only the approved owner can receive the record
+    academic_record_contract.change_ownership(new_owner_address=admin.address, proposal_id=1).run(sender=admin, valid=False)
+    academic_record_contract.change_ownership(new_owner_address=student.address, proposal_id=1).run(sender=admin)
+    scenario.verify(academic_record_contract.data.owner == student.address)
+    # Test that the executed proposal cannot be replayed
+    academic_record_contract.change_ownership(new_owner_address=student.address, proposal_id=1).run(sender=admin, valid=False)
+
+    # Test that proposals get monotonic IDs and expire
+    academic_record_contract.propose_update(proposal_details=new_record_details).run(sender=student, now=sp.timestamp(0))
+    academic_record_contract.propose_update(proposal_details=new_record_details).run(sender=student, now=sp.timestamp(0))
+    scenario.verify(academic_record_contract.data.next_proposal_id == 4)
+    expired = sp.timestamp(7 * 24 * 3600)
+    academic_record_contract.approve_update(proposal_id=2).run(sender=admin, now=expired, valid=False)
+
+    # Test cleaning up expired proposals in bounded batches (IDs 0 and 1 were executed)
+    academic_record_contract.cleanup_expired(limit=3).run(sender=admin, now=expired)
+    scenario.verify(~academic_record_contract.data.proposals.contains(2))
+    scenario.verify(academic_record_contract.data.proposals.contains(3))
+    academic_record_contract.cleanup_expired(limit=10).run(sender=admin, now=expired)
+    scenario.verify(academic_record_contract.data.oldest_proposal_id == 4)
 
-    # Test updating academic records (this should fail due to wrong sender)
-    academic_record_contract.update_record(new_details=new_record_details).run(sender=student, valid=False)
+    # Test reading the status of a proposal through a view
+    academic_record_contract.propose_update(proposal_details=new_record_details).run(sender=student, now=expired)
+    academic_record_contract.approve_update(proposal_id=4).run(sender=student, now=expired, valid=False)
+    academic_record_contract.approve_update(proposal_id=4).run(sender=admin, now=expired)
+    scenario.verify(academic_record_contract.get_proposal_status(4).approvals == 1)
 
-    # Test retrieving the academic record
-    academic_record_contract.retrieve_record().run(sender=admin)
+    # Test upgrading a lazy entry point through an approved proposal
+    def change_ownership_v2(self, params):
+        # Same as change_ownership, but refuses a transfer to the current owner
+        sp.verify(self.data.proposals.contains(params.proposal_id), "Proposal not found.")
+        proposal = self.data.proposals[params.proposal_id]
+        sp.verify(sp.now < proposal.expires_at, "Proposal expired.")
+        sp.verify(sp.len(proposal.approvals) >= self.data.required_approvals, "Insufficient approvals for the proposal.")
+        proposed_owner = proposal.proposed_owner.open_some("Proposal is not an ownership change.")
+        sp.verify(params.new_owner_address == proposed_owner, "Change does not match the proposal.")
+        sp.verify(params.new_owner_address != self.data.owner, "Already the owner.")
+        self.data.owner = params.new_owner_address
+        self.data.last_updated_timestamp = sp.some(sp.timestamp_from_utc_now())
+        del self.data.proposals[params.proposal_id]
 
-    # Test changing ownership (this should succeed)
-    academic_record_contract.change_ownership(new_owner_address=student.address).run(sender=admin)
+    new_code = sp.variant("change_ownership", sp.utils.wrap_entry_point("change_ownership", change_ownership_v2))
+    code_hash = scenario.compute(sp.blake2b(sp.pack(new_code)))
+    academic_record_contract.propose_upgrade(code_hash).run(sender=admin, now=expired, valid=False)
+    academic_record_contract.propose_upgrade(code_hash).run(sender=student, now=expired)
+    # The upgrade cannot be installed before it is approved, nor with other code than proposed
+    academic_record_contract.upgrade(proposal_id=5, new_code=new_code).run(sender=student, now=expired, valid=False)
+    # The upgrade proposal carries no record changes, and only signatories can approve it
+    scenario.verify(sp.len(academic_record_contract.data.proposals[5].proposed_changes) == 0)
+    academic_record_contract.approve_update(proposal_id=5).run(sender=student, now=expired, valid=False)
+    academic_record_contract.approve_update(proposal_id=5).run(sender=admin, now=expired)
+    academic_record_contract.execute_update(proposal_id=5).run(sender=student, now=expired, valid=False)
+    academic_record_contract.upgrade(proposal_id=5, new_code=new_code).run(sender=student, now=expired)
+    scenario.verify(~academic_record_contract.data.proposals.contains(5))
 
-    # Test changing ownership (this should fail due to wrong sender)
-    academic_record_contract.change_ownership(new_owner_address=admin.address).run(sender=student, valid=False)
+    # Test that the upgraded entry point still refuses expired proposals
+    academic_record_contract.propose_ownership_change(admin.address).run(sender=student, now=expired)
+    academic_record_contract.approve_update(proposal_id=6).run(sender=admin, now=expired)
+    academic_record_contract.change_ownership(new_owner_address=admin.address, proposal_id=6).run(sender=student, now=sp.timestamp(14 * 24 * 3600), valid=False)
+    # Test the rule the upgrade adds, then a transfer it allows
+    academic_record_contract.propose_ownership_change(student.address).run(sender=student, now=expired)
+    academic_record_contract.approve_update(proposal_id=7).run(sender=admin, now=expired)
+    academic_record_contract.change_ownership(new_owner_address=student.address, proposal_id=7).run(sender=student, now=expired, valid=False)
+    academic_record_contract.propose_ownership_change(admin.address).run(sender=student, now=expired)
+    academic_record_contract.approve_update(proposal_id=8).run(sender=admin, now=expired)
+    academic_record_contract.change_ownership(new_owner_address=admin.address, proposal_id=8).run(sender=student, now=expired)
+    scenario.verify(academic_record_contract.data.owner == admin.address)
+    scenario.verify(~academic_record_contract.data.proposals.contains(8))
@@ -2,15 +2,21 @@ import smartpy as sp
 
 @sp.module
 def main():
+    # Compact course entry: grade is an index into the grade scale and term is year * 10 + season
+    # (see record_schema.py for the encoding and the off-chain encode/decode helpers)
+    t_course: type = sp.TRecord(grade=sp.TNat, term=sp.TNat)
+    # Transcript: courses keyed by course code
+    t_transcript: type = sp.TMap(sp.TNat, t_course)
+
     class AcademicRecordWithMultisig(sp.Contract):
         # Constructor for initializing the AcademicRecordWithMultisig contract
-        def __init__(self, student_identifier, record_details, owner_address, signatories, threshold):
+        def __init__(self, student_identifier, record_details, owner_address, multisig_address):
             # Initialize the contract's storage
             self.init(
                 # Unique identifier for the student (e.g., student ID or hash)
                 student_identifier=student_identifier,
-                # Detailed academic record (e.g., courses, grades)
-                record_details=record_details,
+                # Detailed academic record: courses keyed by course code, with grade and term
+                record_details=sp.set_type_expr(record_details, t_transcript),
                 # Timestamp of record creation
                 creation_timestamp=sp.timestamp_from_utc_now(),
                 # Timestamp for the last update, initialized as None
@@ -19,32 +25,60 @@ def main():
                 record_hash=self.generate_hash(record_details),
                 # Address of the record's owner (e.g., educational institution)
                 owner=owner_address,
-                # Reference to the associated Multisig contract for managing approvals
-                multisig_contract=Multisig(signatories, threshold)
+                # Address of the shared Multisig contract that approves changes to this and other records
+                multisig_address=multisig_address
             )
 
         @sp.entry_point
-        def propose_update_record(self, proposal_details, proposal_id):
+        def propose_update_record(self, proposal_details):
+            # Only the owner can propose updates to the record
+            sp.verify(sp.sender == self.data.owner, "Unauthorized: Only the owner can propose updates.")
             # Validate the proposal details
             self.validate_input(proposal_details)
-            # Create a proposal in the Multisig contract for updating the academic record
-            self.data.multisig_contract.propose_change(proposal_details, proposal_id)
+            # Create a proposal keyed by this record's address in the Multisig contract;
+            # the Multisig assigns the next proposal ID for this record
+            propose_change = sp.contract(
+                sp.TRecord(record=sp.TAddress, proposal_details=sp.TBytes),
+                self.data.multisig_address,
+                entry_point="propose_change"
+            ).open_some("Invalid Multisig contract.")
+            sp.transfer(sp.record(record=sp.self_address, proposal_details=sp.pack(proposal_details)), sp.mutez(0), propose_change)
+            # The record's own storage is unchanged; the Multisig reports the new proposal in a "proposal_created" event
 
         @sp.entry_point
         def execute_approved_update(self, proposal_id):
             # Verify that the proposal has the required approvals in the Multisig contract
             self.verify_multisig(proposal_id)
-            # Apply the approved changes to the academic record
-            new_details = self.data.multisig_contract.get_proposal_details(proposal_id)
-            
+            # Apply the approved changes to the academic record; multisig proposals carry the packed transcript
+            proposal_details = sp.view("get_proposal_details", self.data.multisig_address, sp.record(record=sp.self_address, proposal_id=proposal_id), t=sp.TBytes).open_some("Invalid Multisig view.")
+            new_details = sp.unpack(proposal_details, t_transcript).open_some("Invalid record details.")
+
             # Validate the new details and update the record
             self.validate_input(new_details)
             self.data.record_details = new_details
             self.update_timestamps()
             self.data.record_hash = self.generate_hash(new_details)
+            # Report the new hash so off-chain consumers do not need to read the storage
+            sp.emit(sp.record(proposal_id=proposal_id, record_hash=self.data.record_hash), tag="record_updated")
 
-            # Optionally, remove the executed proposal from the Multisig contract
-            self.data.multisig_contract.remove_proposal(proposal_id)
+            # Remove the executed proposal from the Multisig contract so it cannot be applied twice
+            consume_proposal = sp.contract(sp.TNat, self.data.multisig_address, entry_point="consume_proposal").open_some("Invalid Multisig contract.")
+            sp.transfer(proposal_id, sp.mutez(0), consume_proposal)
+
+        @sp.entry_point
+        def update_record(self, proposal_details):
+            # Called by the Multisig when it executes an approved proposal for this record (execute_change or
+            # execute_batch), with the packed transcript the proposal carries; the Multisig removes the proposal itself
+            sp.verify(sp.sender == self.data.multisig_address, "Unauthorized: Only the Multisig can update the record.")
+            new_details = sp.unpack(proposal_details, t_transcript).open_some("Invalid record details.")
+
+            # Validate the new details and update the record
+            self.validate_input(new_details)
+            self.data.record_details = new_details
+            self.update_timestamps()
+            self.data.record_hash = self.generate_hash(new_details)
+            # Report the new hash; the Multisig reports the executed proposal ID in its "proposal_executed" event
+            sp.emit(sp.record(record_hash=self.data.record_hash), tag="record_updated")
 
         # Utility function to generate a hash of the record details
         def generate_hash(self, details):
@@ -67,7 +101,8 @@ def main():
         # Utility function to verify multisig approval for a proposal
         def verify_multisig(self, proposal_id):
             # Check if the proposal is approved in the Multisig contract
-            sp.verify(self.data.multisig_contract.is_proposal_approved(proposal_id), "Proposal not yet approved.")
+            approved = sp.view("is_proposal_approved", self.data.multisig_address, sp.record(record=sp.self_address, proposal_id=proposal_id), t=sp.TBool).open_some("Invalid Multisig view.")
+            sp.verify(approved, "Proposal not yet approved.")
 
 
 @sp.add_test(name="Academic Record With Multisig Test")
@@ -81,18 +116,56 @@ def test_academic_record_with_multisig():
     signatory2 = sp.test_account("Signatory2")
     student = sp.test_account("Student")
 
-    # Instantiate the contracts
+    # Instantiate one shared Multisig contract and two records governed by it
     multisig_contract = Multisig(signatories=[admin.address, signatory1.address, signatory2.address], threshold=2)
     scenario += multisig_contract
 
-    academic_record_multisig_contract = AcademicRecordWithMultisig(student_identifier="123456", record_details={"courses": []}, owner_address=admin.address, signatories=[admin.address, signatory1.address, signatory2.address], threshold=2)
+    academic_record_multisig_contract = AcademicRecordWithMultisig(student_identifier="123456", record_details={}, owner_address=admin.address, multisig_address=multisig_contract.address)
     scenario += academic_record_multisig_contract
+    other_record_contract = AcademicRecordWithMultisig(student_identifier="654321", record_details={}, owner_address=admin.address, multisig_address=multisig_contract.address)
+    scenario += other_record_contract
 
     # Test proposing and approving a record update
-    new_record_details = {"courses": [{"name": "Physics", "grade": "B"}]}
-    academic_record_multisig_contract.propose_update_record(proposal_details=sp.pack(new_record_details), proposal_id=0).run(sender=admin)
-    multisig_contract.vote_on_change(proposal_id=0).run(sender=signatory1)
-    multisig_contract.vote_on_change(proposal_id=0).run(sender=signatory2)
+    # Physics (course 102): B (grade 4) in 2024 Fall (term 20243)
+    new_record_details = {102: sp.record(grade=4, term=20243)}
+    academic_record_multisig_contract.propose_update_record(proposal_details=new_record_details).run(sender=admin)
+    academic_record_multisig_contract.propose_update_record(proposal_details=new_record_details).run(sender=student, valid=False)
+    multisig_contract.vote_on_change(record=academic_record_multisig_contract.address, proposal_id=0).run(sender=signatory1)
+
+    # Test executing before the threshold is reached (this should fail)
+    academic_record_multisig_contract.execute_approved_update(proposal_id=0).run(sender=admin, valid=False)
+    multisig_contract.vote_on_change(record=academic_record_multisig_contract.address, proposal_id=0).run(sender=signatory2)
+
+    # Test that the approval does not apply to another record
+    other_record_contract.execute_approved_update(proposal_id=0).run(sender=admin, valid=False)
 
     # Test executing the approved record update
     academic_record_multisig_contract.execute_approved_update(proposal_id=0).run(sender=admin)
+    scenario.verify(academic_record_multisig_contract.data.record_details == new_record_details)
+    scenario.verify(~multisig_contract.data.proposals.contains((academic_record_multisig_contract.address, 0)))
+
+    # Test that the executed proposal cannot be applied again
+    academic_record_multisig_contract.execute_approved_update(proposal_id=0).run(sender=admin, valid=False)
+
+    # Test executing approved proposals of both records in one batch through the Multisig
+    # Chemistry (course 103): A (grade 1) in 2025 Spring (term 20251)
+    batch_details = {103: sp.record(grade=1, term=20251)}
+    for record_contract in [academic_record_multisig_contract, other_record_contract]:
+        record_contract.propose_update_record(proposal_details=batch_details).run(sender=admin)
+    batch = [
+        sp.record(record=academic_record_multisig_contract.address, proposal_id=1),
+        sp.record(record=other_record_contract.address, proposal_id=0),
+        # A proposal that does not exist is skipped
+        sp.record(record=other_record_contract.address, proposal_id=1),
+    ]
+    for item in batch[:2]:
+        multisig_contract.vote_on_change(record=item.record, proposal_id=item.proposal_id).run(sender=signatory1)
+        multisig_contract.vote_on_change(record=item.record, proposal_id=item.proposal_id).run(sender=signatory2)
+    # Only the Multisig can call update_record
+    academic_record_multisig_contract.update_record(sp.pack(batch_details)).run(sender=admin, valid=False)
+    multisig_contract.execute_batch(batch).run(sender=admin)
+    scenario.verify(academic_record_multisig_contract.data.record_details == batch_details)
+    scenario.verify(other_record_contract.data.record_details == batch_details)
+    scenario.verify(other_record_contract.data.record_hash == sp.blake2b(sp.pack(batch_details)))
+    scenario.verify(~multisig_contract.data.proposals.contains((academic_record_multisig_contract.address, 1)))
+    scenario.verify(~multisig_contract.data.proposals.contains((other_record_contract.address, 0)))
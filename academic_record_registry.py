@@ -0,0 +1,786 @@
+import smartpy as sp
+
+@sp.module
+def main():
+    # Compact course entry: grade is an index into the grade scale and term is year * 10 + season
+    # (see record_schema.py for the encoding and the off-chain encode/decode helpers)
+    t_course: type = sp.TRecord(grade=sp.TNat, term=sp.TNat)
+    # Transcript: courses keyed by course code
+    t_transcript: type = sp.TMap(sp.TNat, t_course)
+    # Change to a single course, as chained into the record hash (course is None when the course is removed)
+    t_delta: type = sp.TRecord(code=sp.TNat, course=sp.TOption(t_course))
+
+    class AcademicRecordRegistry(sp.Contract):
+        # Constructor for initializing the AcademicRecordRegistry contract
+        def __init__(self, admin_address, required_approvals, metadata_url="", snapshot_interval=16):
+            # Storage is not checked at origination, and a zero interval would make every version fail on
+            # `version % snapshot_interval`, so it is checked when the contract is built
+            if snapshot_interval <= 0:
+                raise ValueError("snapshot_interval must be positive.")
+            # Initialize the contract's storage
+            self.init(
+                # TZIP-16 metadata pointer; metadata_url is where the generated metadata JSON is published (e.g., an ipfs:// URL)
+                metadata=sp.utils.metadata_of_url(metadata_url),
+                # Mapping of student identifiers to their academic records; a big_map so that
+                # only the entries touched by a call are loaded, whatever the enrollment size
+                records=sp.big_map(
+                    tkey=sp.TString,
+                    tvalue=sp.TRecord(
+                        # Detailed academic record: courses keyed by course code, with grade and term
+                        record_details=t_transcript,
+                        # Timestamp of record creation
+                        creation_timestamp=sp.TTimestamp,
+                        # Timestamp for the last update
+                        last_updated_timestamp=sp.TOption(sp.TTimestamp),
+                        # Hash of the record for integrity verification: the hash of the details (or Merkle root)
+                        # at the last full write, extended as a hash chain by every per-course change since
+                        record_hash=sp.TBytes,
+                        # Hash of the details (or Merkle root) at the last full write, where the hash chain starts
+                        checkpoint_hash=sp.TBytes,
+                        # Institution that owns the record; its controlling address is looked up in institutions
+                        institution_id=sp.TNat,
+                        # Whether only a Merkle root over the courses is stored (record_hash holds the root
+                        # and record_details stays empty, keeping the transcript off-chain)
+                        merkle_committed=sp.TBool,
+                        # Latest version of the record; version 0 is the record as registered
+                        version=sp.TNat
+                    )
+                ),
+                # Version history: (student identifier, version) to the packed list of per-course changes from the
+                # previous version, the record hash at that version and whether the version was a full write
+                # (checkpoint). Every snapshot_interval versions the packed details are kept as well (snapshot):
+                # history grows with what changed plus one full transcript per snapshot_interval versions, and
+                # rebuilding a version replays at most snapshot_interval - 1 changes lists
+                history=sp.big_map(tkey=sp.TPair(sp.TString, sp.TNat), tvalue=sp.TRecord(diff=sp.TBytes, record_hash=sp.TBytes, checkpoint=sp.TBool, snapshot=sp.TOption(sp.TBytes))),
+                # Number of versions between two snapshots in the history (positive)
+                snapshot_interval=sp.nat(snapshot_interval),
+                # Mapping of (student identifier, proposal ID) pairs to their details for multisig functionality
+                # (proposed_root carries the new Merkle root when the record is Merkle-committed, proposed_delta
+                # the single per-course change a course change proposal approves and proposed_institution the
+                # institution an ownership change proposal moves the record to)
+                proposals=sp.big_map(tkey=sp.TPair(sp.TString, sp.TNat), tvalue=sp.TRecord(approvals=sp.TSet(sp.TAddress), proposed_changes=t_transcript, proposed_root=sp.TOption(sp.TBytes), proposed_delta=sp.TOption(t_delta), proposed_institution=sp.TOption(sp.TNat))),
+                # Institutions by ID: the address that controls their records, the signers whose approvals count
+                # for their records' proposals and the multisig allowed to change them. Records only hold the ID, so
+                # rotating an institution's keys or merging it into another is one write however many records it owns
+                institutions=sp.big_map(tkey=sp.TNat, tvalue=sp.TRecord(controller=sp.TAddress, signers=sp.TSet(sp.TAddress), multisig=sp.TAddress)),
+                # Next unused institution ID
+                next_institution_id=sp.nat(0),
+                # Address allowed to register new records
+                admin=admin_address,
+                # Number of approvals required for a proposal to pass
+                required_approvals=required_approvals
+            )
+            # TZIP-16 metadata with off-chain views, so wallets and the frontend can read without fees
+            self.init_metadata("academic_record_registry_metadata", {
+                "name": "GradeBlock Academic Record Registry",
+                "interfaces": ["TZIP-016"],
+                "views": [
+                    self.offchain_get_record, self.offchain_get_record_hash, self.offchain_verify_integrity,
+                    self.offchain_get_proposal_status, self.offchain_verify_course,
+                    self.offchain_get_version, self.offchain_verify_version,
+                ],
+            })
+
+        # Entry point for registering a new academic record
+        @sp.entry_point
+        def add_record(self, student_identifier, record_details, institution_id):
+            # Only the registry admin can register records, and each student only once
+            sp.verify(sp.sender == self.data.admin, "Unauthorized: Only the admin can add records.")
+            sp.verify(not self.data.records.contains(student_identifier), "Record already exists.")
+            self.validate_input(record_details)
+            self.verify_institution_exists(institution_id)
+
+            # Store the record along with its creation timestamp and hash
+            self.data.records[student_identifier] = sp.record(
+                record_details=record_details,
+                creation_timestamp=sp.timestamp_from_utc_now(),
+                last_updated_timestamp=sp.none,
+                record_hash=self.generate_hash(record_details),
+                checkpoint_hash=self.generate_hash(record_details),
+                institution_id=institution_id,
+                merkle_committed=False,
+                version=0
+            )
+            # Version 0 adds every course of the initial transcript
+            self.data.history[(student_identifier, 0)] = sp.record(
+                diff=sp.pack(self.transcript_diff(sp.map(tkey=sp.TNat, tvalue=t_course), record_details)),
+                record_hash=self.data.records[student_identifier].record_hash,
+                checkpoint=True,
+                snapshot=sp.some(sp.pack(record_details))
+            )
+            # Report the new record
+            sp.emit(sp.record(student_identifier=student_identifier, institution_id=institution_id, record_hash=self.data.records[student_identifier].record_hash), tag="record_added")
+
+        # Entry point for registering a record in Merkle commitment mode
+        @sp.entry_point
+        def add_committed_record(self, student_identifier, merkle_root, institution_id):
+            # Only the registry admin can register records, and each student only once
+            sp.verify(sp.sender == self.data.admin, "Unauthorized: Only the admin can add records.")
+            sp.verify(not self.data.records.contains(student_identifier), "Record already exists.")
+            self.validate_input(merkle_root)
+            self.verify_institution_exists(institution_id)
+
+            # Store only the Merkle root over the courses; the full transcript is kept off-chain
+            self.data.records[student_identifier] = sp.record(
+                record_details={},
+                creation_timestamp=sp.timestamp_from_utc_now(),
+                last_updated_timestamp=sp.none,
+                record_hash=merkle_root,
+                checkpoint_hash=merkle_root,
+                institution_id=institution_id,
+                merkle_committed=True,
+                version=0
+            )
+            # Committed records have no on-chain courses, so their history only keeps the roots
+            self.data.history[(student_identifier, 0)] = sp.record(diff=sp.pack(sp.list(t=t_delta)), record_hash=merkle_root, checkpoint=True, snapshot=sp.none)
+            # Report the new record
+            sp.emit(sp.record(student_identifier=student_identifier, institution_id=institution_id, record_hash=merkle_root), tag="record_added")
+
+        # Entry point for updating an academic record
+        @sp.entry_point
+        def update_record(self, student_identifier, new_details, proposal_id):
+            # Validate the new details and check multisig approval before updating
+            self.validate_input(new_details)
+            self.verify_record_exists(student_identifier)
+            self.verify_not_committed(student_identifier)
+            self.verify_multisig(student_identifier, proposal_id)
+            # Only the details the signers approved can be written
+            self.verify_full_update(student_identifier, proposal_id)
+            self.verify_proposed_details(student_identifier, new_details, proposal_id)
+
+            # Update the record details, timestamps, and hash
+            new_hash = self.generate_hash(new_details)
+            sp.verify(new_hash != self.data.records[student_identifier].record_hash, "No changes detected.")
+            self.apply_update(student_identifier, new_details, new_hash, proposal_id)
+
+        # Entry point for applying many approved updates in a single operation (e.g., end-of-term grade publication)
+        @sp.entry_point
+        def batch_update_records(self, updates, atomic):
+            # Each item is a record(student_identifier, new_details, proposal_id).
+            # With atomic=True any invalid item fails the whole batch with the same error update_record would raise;
+            # with atomic=False invalid items are skipped and their positions are reported in a "batch_update" event.
+            applied = 0
+            skipped = []
+            index = 0
+            for item in updates:
+                new_hash = self.generate_hash(item.new_details)
+                if atomic:
+                    self.verify_record_exists(item.student_identifier)
+                    self.verify_not_committed(item.student_identifier)
+                    self.verify_multisig(item.student_identifier, item.proposal_id)
+                    self.verify_full_update(item.student_identifier, item.proposal_id)
+                    self.verify_proposed_details(item.student_identifier, item.new_details, item.proposal_id)
+                    sp.verify(new_hash != self.data.records[item.student_identifier].record_hash, "No changes detected.")
+                    self.apply_update(item.student_identifier, item.new_details, new_hash, item.proposal_id)
+                    applied += 1
+                else:
+                    if self.is_update_applicable(item.student_identifier, item.new_details, new_hash, item.proposal_id):
+                        self.apply_update(item.student_identifier, item.new_details, new_hash, item.proposal_id)
+                        applied += 1
+                    else:
+                        skipped.push(index)
+                index += 1
+            # Report the outcome of the batch to off-chain consumers
+            sp.emit(sp.record(applied=applied, skipped=skipped), tag="batch_update")
+
+        # On-chain view for retrieving an academic record
+        # (storage is public on-chain, so reads are not restricted to the owner)
+        @sp.onchain_view()
+        def get_record(self, student_identifier):
+            sp.verify(self.data.records.contains(student_identifier), "Record not found.")
+            sp.result(self.data.records[student_identifier])
+
+        # On-chain view for retrieving the hash of an academic record
+        @sp.onchain_view()
+        def get_record_hash(self, student_identifier):
+            sp.verify(self.data.records.contains(student_identifier), "Record not found.")
+            sp.result(self.data.records[student_identifier].record_hash)
+
+        # On-chain view for verifying the integrity of an academic record
+        @sp.onchain_view()
+        def verify_integrity(self, student_identifier):
+            sp.result(self.integrity_holds(student_identifier))
+
+        # On-chain view for the status of a proposal
+        @sp.onchain_view()
+        def get_proposal_status(self, params):
+            sp.result(self.proposal_status(params.student_identifier, params.proposal_id))
+
+        # Off-chain (TZIP-16) counterparts of the views, run by wallets through the RPC at no cost
+        @sp.offchain_view(pure=True, name="get_record")
+        def offchain_get_record(self, student_identifier):
+            sp.verify(self.data.records.contains(student_identifier), "Record not found.")
+            sp.result(self.data.records[student_identifier])
+
+        @sp.offchain_view(pure=True, name="get_record_hash")
+        def offchain_get_record_hash(self, student_identifier):
+            sp.verify(self.data.records.contains(student_identifier), "Record not found.")
+            sp.result(self.data.records[student_identifier].record_hash)
+
+        @sp.offchain_view(pure=True, name="verify_integrity")
+        def offchain_verify_integrity(self, student_identifier):
+            sp.result(self.integrity_holds(student_identifier))
+
+        @sp.offchain_view(pure=True, name="get_proposal_status")
+        def offchain_get_proposal_status(self, params):
+            sp.result(self.proposal_status(params.student_identifier, params.proposal_id))
+
+        @sp.offchain_view(pure=True, name="verify_course")
+        def offchain_verify_course(self, params):
+            sp.result(self.course_included(params.student_identifier, params.course, params.proof))
+
+        @sp.offchain_view(pure=True, name="get_version")
+        def offchain_get_version(self, params):
+            sp.result(self.version_details(params.student_identifier, params.version))
+
+        @sp.offchain_view(pure=True, name="verify_version")
+        def offchain_verify_version(self, params):
+            sp.result(sp.pack(self.version_details(params.student_identifier, params.version)) == sp.pack(params.record_details))
+
+        # Entry point for adding a course to an academic record
+        @sp.entry_point
+        def add_course(self, student_identifier, code, course, proposal_id):
+            delta = sp.record(code=code, course=sp.some(course))
+            self.verify_course_change(student_identifier, delta, proposal_id)
+            sp.verify(not self.data.records[student_identifier].record_details.contains(code), "Course already exists.")
+            self.apply_delta(student_identifier, delta, proposal_id)
+
+        # Entry point for amending the grade of a course in an academic record
+        @sp.entry_point
+        def amend_grade(self, student_identifier, code, grade, proposal_id):
+            self.verify_record_exists(student_identifier)
+            sp.verify(self.data.records[student_identifier].record_details.contains(code), "Course not found.")
+            course = self.data.records[student_identifier].record_details[code]
+            sp.verify(course.grade != grade, "No changes detected.")
+            delta = sp.record(code=code, course=sp.some(sp.record(grade=grade, term=course.term)))
+            self.verify_course_change(student_identifier, delta, proposal_id)
+            self.apply_delta(student_identifier, delta, proposal_id)
+
+        # Entry point for removing a course from an academic record
+        @sp.entry_point
+        def remove_course(self, student_identifier, code, proposal_id):
+            delta = sp.record(code=code, course=sp.none)
+            self.verify_course_change(student_identifier, delta, proposal_id)
+            sp.verify(self.data.records[student_identifier].record_details.contains(code), "Course not found.")
+            self.apply_delta(student_identifier, delta, proposal_id)
+
+        # Entry point for registering an institution that can own records
+        @sp.entry_point
+        def register_institution(self, controller, signers, multisig):
+            # Only the registry admin can register institutions; each gets the next institution ID
+            sp.verify(sp.sender == self.data.admin, "Unauthorized: Only the admin can register institutions.")
+            self.data.institutions[self.data.next_institution_id] = sp.record(controller=controller, signers=signers, multisig=multisig)
+            # Report the new institution ID and its addresses
+            sp.emit(sp.record(institution_id=self.data.next_institution_id, controller=controller, signers=signers, multisig=multisig), tag="institution_registered")
+            self.data.next_institution_id += 1
+
+        # Entry point for rotating the controlling address, signers and multisig of an institution
+        @sp.entry_point
+        def rotate_institution(self, institution_id, controller, signers, multisig):
+            # Only the institution's multisig can rotate it. This covers every record of the institution in one write;
+            # pointing an institution at another's controller and multisig merges them the same way
+            self.verify_institution_exists(institution_id)
+            sp.verify(sp.sender == self.data.institutions[institution_id].multisig, "Unauthorized: Only the institution's multisig can rotate it.")
+            self.data.institutions[institution_id] = sp.record(controller=controller, signers=signers, multisig=multisig)
+            # Report the new addresses; they apply to every record of the institution
+            sp.emit(sp.record(institution_id=institution_id, controller=controller, signers=signers, multisig=multisig), tag="institution_rotated")
+
+        # Entry point for moving an academic record to the institution named by an approved ownership change proposal
+        @sp.entry_point
+        def change_ownership(self, student_identifier, proposal_id):
+            # Only the controller or multisig of the institution owning the record can carry out the change
+            self.verify_record_exists(student_identifier)
+            institution = self.institution_of(student_identifier)
+            sp.verify(sp.sender == institution.multisig or sp.sender == institution.controller, "Unauthorized: Only the institution's controller or multisig can change ownership.")
+            # Verify multisig approval and move the record to the institution the proposal names
+            self.verify_multisig(student_identifier, proposal_id)
+            new_institution_id = self.data.proposals[(student_identifier, proposal_id)].proposed_institution.open_some("Proposal is not an ownership change.")
+            self.verify_institution_exists(new_institution_id)
+
+            # Change the ownership and update timestamps
+            self.data.records[student_identifier].institution_id = new_institution_id
+            self.data.records[student_identifier].creation_timestamp = sp.timestamp_from_utc_now()
+            self.data.records[student_identifier].last_updated_timestamp = sp.some(sp.timestamp_from_utc_now())
+            # Consume the proposal so it cannot be replayed
+            del self.data.proposals[(student_identifier, proposal_id)]
+            # Report the record's new institution
+            sp.emit(sp.record(student_identifier=student_identifier, institution_id=new_institution_id, proposal_id=proposal_id), tag="ownership_changed")
+
+        # Utility function to generate a hash of the record details
+        def generate_hash(self, details):
+            return sp.blake2b(sp.pack(details))
+
+        # Utility function to extend a record's hash chain with a per-course change
+        def chain_hash(self, previous_hash, delta):
+            return sp.blake2b(sp.concat([previous_hash, sp.pack(delta)]))
+
+        # Entry point to propose an update to an academic record
+        @sp.entry_point
+        def propose_update(self, student_identifier, proposal_details, proposal_id):
+            # Verify the sender's authorization and create a new proposal
+            self.verify_record_exists(student_identifier)
+            self.verify_controller(student_identifier)
+            sp.verify(not self.data.proposals.contains((student_identifier, proposal_id)), "Proposal already exists.")
+            self.data.proposals[(student_identifier, proposal_id)] = sp.record(approvals=sp.set(), proposed_changes=proposal_details, proposed_root=sp.none, proposed_delta=sp.none, proposed_institution=sp.none)
+            # Report the new proposal
+            sp.emit(sp.record(student_identifier=student_identifier, proposal_id=proposal_id), tag="proposal_created")
+
+        # Entry point to propose a new Merkle root for a Merkle-committed record
+        @sp.entry_point
+        def propose_root_update(self, student_identifier, merkle_root, proposal_id):
+            # Verify the sender's authorization and create a new proposal carrying only the root
+            self.verify_record_exists(student_identifier)
+            sp.verify(self.data.records[student_identifier].merkle_committed, "Record is not Merkle-committed.")
+            self.verify_controller(student_identifier)
+            sp.verify(not self.data.proposals.contains((student_identifier, proposal_id)), "Proposal already exists.")
+            self.data.proposals[(student_identifier, proposal_id)] = sp.record(approvals=sp.set(), proposed_changes={}, proposed_root=sp.some(merkle_root), proposed_delta=sp.none, proposed_institution=sp.none)
+            # Report the new proposal
+            sp.emit(sp.record(student_identifier=student_identifier, proposal_id=proposal_id), tag="proposal_created")
+
+        # Entry point to propose a single per-course change (add, amend or remove one course) to an academic record
+        @sp.entry_point
+        def propose_course_change(self, student_identifier, delta, proposal_id):
+            # Verify the sender's authorization and create a new proposal carrying the change, so add_course,
+            # amend_grade and remove_course can only apply the change the signers approved
+            self.verify_record_exists(student_identifier)
+            self.verify_not_committed(student_identifier)
+            self.verify_controller(student_identifier)
+            sp.verify(not self.data.proposals.contains((student_identifier, proposal_id)), "Proposal already exists.")
+            self.data.proposals[(student_identifier, proposal_id)] = sp.record(approvals=sp.set(), proposed_changes={}, proposed_root=sp.none, proposed_delta=sp.some(delta), proposed_institution=sp.none)
+            # Report the new proposal
+            sp.emit(sp.record(student_identifier=student_identifier, proposal_id=proposal_id), tag="proposal_created")
+
+        # Entry point to propose moving an academic record to another institution
+        @sp.entry_point
+        def propose_ownership_change(self, student_identifier, new_institution_id, proposal_id):
+            # Verify the sender's authorization and create a new proposal naming the target institution, so the
+            # signers approve where the record goes
+            self.verify_record_exists(student_identifier)
+            self.verify_institution_exists(new_institution_id)
+            self.verify_controller(student_identifier)
+            sp.verify(not self.data.proposals.contains((student_identifier, proposal_id)), "Proposal already exists.")
+            self.data.proposals[(student_identifier, proposal_id)] = sp.record(approvals=sp.set(), proposed_changes={}, proposed_root=sp.none, proposed_delta=sp.none, proposed_institution=sp.some(new_institution_id))
+            # Report the new proposal
+            sp.emit(sp.record(student_identifier=student_identifier, proposal_id=proposal_id), tag="proposal_created")
+
+        # Entry point for signatories to approve a proposed update
+        @sp.entry_point
+        def approve_update(self, student_identifier, proposal_id):
+            # Verify the existence of the proposal and add the sender's approval; only the signers of the
+            # institution that owns the record can approve
+            sp.verify(self.data.proposals.contains((student_identifier, proposal_id)), "Proposal not found.")
+            sp.verify(self.institution_of(student_identifier).signers.contains(sp.sender), "Unauthorized: Only the institution's signers can approve.")
+            self.data.proposals[(student_identifier, proposal_id)].approvals.add(sp.sender)
+            # Report the approval count, so consumers see when the proposal passes
+            sp.emit(sp.record(student_identifier=student_identifier, proposal_id=proposal_id, approvals=sp.len(self.data.proposals[(student_identifier, proposal_id)].approvals)), tag="proposal_approved")
+
+        # Entry point to execute an update to an academic record upon proposal approval
+        @sp.entry_point
+        def execute_update(self, student_identifier, proposal_id):
+            # Verify the proposal's approval and apply the changes to the record
+            self.verify_record_exists(student_identifier)
+            self.verify_multisig(student_identifier, proposal_id)
+            self.verify_full_update(student_identifier, proposal_id)
+            proposal = self.data.proposals[(student_identifier, proposal_id)]
+            if self.data.records[student_identifier].merkle_committed:
+                new_hash = proposal.proposed_root.open_some("Proposal does not carry a Merkle root.")
+            else:
+                new_hash = self.generate_hash(proposal.proposed_changes)
+            self.apply_update(student_identifier, proposal.proposed_changes, new_hash, proposal_id)
+
+        # On-chain view for checking that a single course belongs to a Merkle-committed record
+        @sp.onchain_view()
+        def verify_course(self, params):
+            # params.course is the course record(code, grade, term) and params.proof the list of sibling hashes from leaf to root,
+            # each flagged with whether the sibling sits on the left. Cost is O(log n) in the number of courses.
+            sp.result(self.course_included(params.student_identifier, params.course, params.proof))
+
+        # On-chain view for reconstructing a past version of an academic record from its history
+        @sp.onchain_view()
+        def get_version(self, params):
+            sp.result(self.version_details(params.student_identifier, params.version))
+
+        # On-chain view for checking details against a past version of an academic record
+        @sp.onchain_view()
+        def verify_version(self, params):
+            sp.result(sp.pack(self.version_details(params.student_identifier, params.version)) == sp.pack(params.record_details))
+
+        # Utility function to rebuild the details of a record at `version` by replaying its history from the nearest
+        # snapshot at or below it, so at most snapshot_interval - 1 changes lists are replayed whatever the version.
+        # Each version's hash is recomputed on the way (the hash of the details for a full write, the hash chain
+        # otherwise) and checked against the stored one, so the result is tied to the record hashes
+        def version_details(self, student_identifier, version):
+            self.verify_record_exists(student_identifier)
+            self.verify_not_committed(student_identifier)
+            sp.verify(version <= self.data.records[student_identifier].version, "Version not found.")
+            base = sp.as_nat(version - version % self.data.snapshot_interval)
+            entry = self.data.history[(student_identifier, base)]
+            details = sp.unpack(entry.snapshot.open_some("Missing snapshot."), t_transcript).open_some("Invalid history entry.")
+            if entry.checkpoint:
+                sp.verify(self.generate_hash(details) == entry.record_hash, "History does not match the record hash.")
+            record_hash = entry.record_hash
+            current = base + 1
+            while current <= version:
+                entry = self.data.history[(student_identifier, current)]
+                chained_hash = record_hash
+                for delta in sp.unpack(entry.diff, sp.TList(t_delta)).open_some("Invalid history entry."):
+                    if delta.course.is_some():
+                        details[delta.code] = delta.course.open_some()
+                    else:
+                        del details[delta.code]
+                    chained_hash = self.chain_hash(chained_hash, delta)
+                if entry.checkpoint:
+                    record_hash = self.generate_hash(details)
+                else:
+                    record_hash = chained_hash
+                sp.verify(record_hash == entry.record_hash, "History does not match the record hash.")
+                current += 1
+            return details
+
+        # Utility function to check a course inclusion proof against a committed Merkle root
+        def course_included(self, student_identifier, course, proof):
+            sp.verify(self.data.records.contains(student_identifier), "Record not found.")
+            record = self.data.records[student_identifier]
+            sp.verify(record.merkle_committed, "Record is not Merkle-committed.")
+            # Leaves and inner nodes are domain-separated so an inner node cannot be passed off as a course
+            node = sp.blake2b(sp.concat([sp.bytes("0x00"), sp.pack(course)]))
+            for step in proof:
+                if step.sibling_is_left:
+                    node = sp.blake2b(sp.concat([sp.bytes("0x01"), step.sibling, node]))
+                else:
+                    node = sp.blake2b(sp.concat([sp.bytes("0x01"), node, step.sibling]))
+            return node == record.record_hash
+
+        # Utility function to check a record's stored details and hash against its history: the latest version is
+        # rebuilt from the recorded changes (checking every version's hash on the way), so the stored details must
+        # match it and the stored hash must be the one recorded for it
+        def integrity_holds(self, student_identifier):
+            sp.verify(self.data.records.contains(student_identifier), "Record not found.")
+            record = self.data.records[student_identifier]
+            # Committed records have no on-chain details; use verify_course with an inclusion proof instead
+            sp.verify(not record.merkle_committed, "Record is Merkle-committed.")
+            details = self.version_details(student_identifier, record.version)
+            details_match = sp.pack(details) == sp.pack(record.record_details)
+            return self.data.history[(student_identifier, record.version)].record_hash == record.record_hash and details_match
+
+        # Utility function to summarize a proposal for the status views
+        def proposal_status(self, student_identifier, proposal_id):
+            sp.verify(self.data.proposals.contains((student_identifier, proposal_id)), "Proposal not found.")
+            approvals = self.approval_count(student_identifier, proposal_id)
+            return sp.record(
+                approvals=approvals,
+                required_approvals=self.data.required_approvals,
+                approved=approvals >= self.data.required_approvals
+            )
+
+        # Utility function to write new details and their hash to a record and consume the proposal
+        def apply_update(self, student_identifier, new_details, new_hash, proposal_id):
+            # Committed records only keep the new Merkle root, which is carried in new_hash
+            diff = sp.list(t=t_delta)
+            if not self.data.records[student_identifier].merkle_committed:
+                diff = self.transcript_diff(self.data.records[student_identifier].record_details, new_details)
+                self.data.records[student_identifier].record_details = new_details
+            self.data.records[student_identifier].last_updated_timestamp = sp.some(sp.timestamp_from_utc_now())
+            # A full write starts a new hash chain
+            self.data.records[student_identifier].record_hash = new_hash
+            self.data.records[student_identifier].checkpoint_hash = new_hash
+            self.record_version(student_identifier, diff, True, proposal_id)
+            # Consume the proposal so it cannot be replayed
+            del self.data.proposals[(student_identifier, proposal_id)]
+
+        # Utility function to apply a per-course change: only the affected entry is written and the
+        # record hash is extended as blake2b(previous hash ++ pack(delta)), so cost does not grow with the transcript
+        def apply_delta(self, student_identifier, delta, proposal_id):
+            if delta.course.is_some():
+                self.data.records[student_identifier].record_details[delta.code] = delta.course.open_some()
+            else:
+                del self.data.records[student_identifier].record_details[delta.code]
+            self.data.records[student_identifier].last_updated_timestamp = sp.some(sp.timestamp_from_utc_now())
+            self.data.records[student_identifier].record_hash = self.chain_hash(self.data.records[student_identifier].record_hash, delta)
+            self.record_version(student_identifier, [delta], False, proposal_id)
+            # Consume the proposal so it cannot be replayed
+            del self.data.proposals[(student_identifier, proposal_id)]
+
+        # Utility function to list the per-course changes that turn `old` into `new`
+        def transcript_diff(self, old, new):
+            diff = sp.list(t=t_delta)
+            for item in new.items():
+                if not old.contains(item.key) or old[item.key] != item.value:
+                    diff.push(sp.record(code=item.key, course=sp.some(item.value)))
+            for code in old.keys():
+                if not new.contains(code):
+                    diff.push(sp.record(code=code, course=sp.none))
+            return diff
+
+        # Utility function to append a new version, with its changes and the current record hash, to a record's history,
+        # and report it in a "record_updated" event so consumers can follow records without reading the storage
+        def record_version(self, student_identifier, diff, checkpoint, proposal_id):
+            version = self.data.records[student_identifier].version + 1
+            self.data.records[student_identifier].version = version
+            # Keep a snapshot of the details every snapshot_interval versions (committed records have none)
+            snapshot = sp.none
+            if version % self.data.snapshot_interval == 0 and not self.data.records[student_identifier].merkle_committed:
+                snapshot = sp.some(sp.pack(self.data.records[student_identifier].record_details))
+            self.data.history[(student_identifier, version)] = sp.record(
+                diff=sp.pack(diff),
+                record_hash=self.data.records[student_identifier].record_hash,
+                checkpoint=checkpoint,
+                snapshot=snapshot
+            )
+            sp.emit(sp.record(
+                student_identifier=student_identifier,
+                version=version,
+                record_hash=self.data.records[student_identifier].record_hash,
+                proposal_id=proposal_id
+            ), tag="record_updated")
+
+        # Utility function to check, without failing, whether an update can be applied
+        def is_update_applicable(self, student_identifier, new_details, new_hash, proposal_id):
+            key = (student_identifier, proposal_id)
+            if not self.data.records.contains(student_identifier) or not self.data.proposals.contains(key):
+                return False
+            if self.data.records[student_identifier].merkle_committed:
+                return False
+            if self.approval_count(student_identifier, proposal_id) < self.data.required_approvals:
+                return False
+            if self.data.proposals[key].proposed_delta.is_some() or self.data.proposals[key].proposed_institution.is_some():
+                return False
+            if sp.pack(new_details) != sp.pack(self.data.proposals[key].proposed_changes):
+                return False
+            return new_hash != self.data.records[student_identifier].record_hash
+
+        # Utility function to validate input data
+        def validate_input(self, input_data):
+            sp.verify(input_data is not None, "Input data is empty.")
+
+        # Utility function to check that a record keeps its details on-chain
+        def verify_not_committed(self, student_identifier):
+            sp.verify(not self.data.records[student_identifier].merkle_committed, "Record is Merkle-committed.")
+
+        # Utility function to check that a per-course change may be applied to a record: the proposal must be
+        # approved and carry exactly this change
+        def verify_course_change(self, student_identifier, delta, proposal_id):
+            self.verify_record_exists(student_identifier)
+            self.verify_not_committed(student_identifier)
+            self.verify_multisig(student_identifier, proposal_id)
+            proposed_delta = self.data.proposals[(student_identifier, proposal_id)].proposed_delta
+            sp.verify(sp.pack(sp.some(delta)) == sp.pack(proposed_delta), "Change does not match the proposal.")
+
+        # Utility function to check that an institution is registered
+        def verify_institution_exists(self, institution_id):
+            sp.verify(self.data.institutions.contains(institution_id), "Institution not found.")
+
+        # Utility function to look up the institution owning a record
+        def institution_of(self, student_identifier):
+            return self.data.institutions[self.data.records[student_identifier].institution_id]
+
+        # Utility function to check that the sender controls the institution owning a record
+        def verify_controller(self, student_identifier):
+            sp.verify(sp.sender == self.institution_of(student_identifier).controller, "Unauthorized: Only the owner can propose updates.")
+
+        # Utility function to check that a record is registered
+        def verify_record_exists(self, student_identifier):
+            sp.verify(self.data.records.contains(student_identifier), "Record not found.")
+
+        # Utility function to verify multisig approval for a proposal
+        def verify_multisig(self, student_identifier, proposal_id):
+            # Check the proposal's existence and if it has the required number of approvals
+            sp.verify(self.data.proposals.contains((student_identifier, proposal_id)), "Proposal not found.")
+            sp.verify(self.approval_count(student_identifier, proposal_id) >= self.data.required_approvals, "Insufficient approvals for the proposal.")
+
+        # Utility function to count the approvals of a proposal given by current signers of the record's institution,
+        # so approvals from signers removed by a rotation, or from another institution's signers, do not count
+        def approval_count(self, student_identifier, proposal_id):
+            signers = self.institution_of(student_identifier).signers
+            count = 0
+            for approver in self.data.proposals[(student_identifier, proposal_id)].approvals.elements():
+                if signers.contains(approver):
+                    count += 1
+            return count
+
+        # Utility function to check that a proposal is for a full update rather than a per-course or ownership change
+        def verify_full_update(self, student_identifier, proposal_id):
+            sp.verify(self.data.proposals[(student_identifier, proposal_id)].proposed_delta.is_none(), "Proposal is a course change.")
+            sp.verify(self.data.proposals[(student_identifier, proposal_id)].proposed_institution.is_none(), "Proposal is an ownership change.")
+
+        # Utility function to check that the details given to an update are the ones the proposal carries
+        def verify_proposed_details(self, student_identifier, new_details, proposal_id):
+            proposed_changes = self.data.proposals[(student_identifier, proposal_id)].proposed_changes
+            sp.verify(sp.pack(new_details) == sp.pack(proposed_changes), "Details do not match the proposal.")
+
+
+@sp.add_test(name="Academic Record Registry Test")
+def test_academic_record_registry():
+    scenario = sp.test_scenario()
+    scenario.h1("Academic Record Registry Contract Test")
+
+    # Initialize test accounts
+    admin = sp.test_account("Administrator")
+    university = sp.test_account("University")
+    signatory1 = sp.test_account("Signatory1")
+    signatory2 = sp.test_account("Signatory2")
+    student = sp.test_account("Student")
+    university_multisig = sp.test_account("UniversityMultisig")
+
+    # Instantiate the contract, with a snapshot every other version so that rebuilding versions starts from snapshots
+    registry_contract = AcademicRecordRegistry(admin_address=admin.address, required_approvals=2, snapshot_interval=2)
+    scenario += registry_contract
+
+    # Test registering institutions: the university (ID 0), whose proposals are approved by two signatories,
+    # and a student acting as its own institution (ID 1)
+    university_signers = sp.set([signatory1.address, signatory2.address])
+    registry_contract.register_institution(controller=university.address, signers=university_signers, multisig=university_multisig.address).run(sender=admin)
+    registry_contract.register_institution(controller=student.address, signers=sp.set([student.address]), multisig=student.address).run(sender=admin)
+    registry_contract.register_institution(controller=student.address, signers=sp.set([student.address]), multisig=student.address).run(sender=student, valid=False)
+
+    # Test registering records for several students (only the admin may register)
+    registry_contract.add_record(student_identifier="123456", record_details={}, institution_id=0).run(sender=admin)
+    registry_contract.add_record(student_identifier="654321", record_details={}, institution_id=0).run(sender=admin)
+    registry_contract.add_record(student_identifier="123456", record_details={}, institution_id=0).run(sender=admin, valid=False)
+    registry_contract.add_record(student_identifier="000001", record_details={}, institution_id=1).run(sender=student, valid=False)
+
+    # Test proposing, approving and executing an update for one student
+    # Math (course 101): A (grade 1) in 2024 Fall (term 20243)
+    new_record_details = {101: sp.record(grade=1, term=20243)}
+    registry_contract.propose_update(student_identifier="123456", proposal_details=new_record_details, proposal_id=0).run(sender=university)
+    registry_contract.propose_update(student_identifier="123456", proposal_details=new_record_details, proposal_id=1).run(sender=student, valid=False)
+    registry_contract.approve_update(student_identifier="123456", proposal_id=0).run(sender=signatory1)
+    # Test that only the institution's signers can approve
+    registry_contract.approve_update(student_identifier="123456", proposal_id=0).run(sender=student, valid=False)
+    registry_contract.approve_update(student_identifier="123456", proposal_id=0).run(sender=university, valid=False)
+
+    # Test executing the update (this should fail due to insufficient approvals)
+    registry_contract.execute_update(student_identifier="123456", proposal_id=0).run(sender=university, valid=False)
+
+    registry_contract.approve_update(student_identifier="123456", proposal_id=0).run(sender=signatory2)
+    # Test that the approval does not apply to another student's record
+    registry_contract.execute_update(student_identifier="654321", proposal_id=0).run(sender=university, valid=False)
+    # Test that update_record only writes the approved details
+    tampered_details = {101: sp.record(grade=0, term=20243)}
+    registry_contract.update_record(student_identifier="123456", new_details=tampered_details, proposal_id=0).run(sender=student, valid=False)
+    registry_contract.execute_update(student_identifier="123456", proposal_id=0).run(sender=university)
+    scenario.verify(registry_contract.data.records["123456"].record_details == new_record_details)
+    scenario.verify(~registry_contract.data.proposals.contains(("123456", 0)))
+
+    # Test reading and verifying a record through views
+    scenario.verify(registry_contract.get_record("123456").record_details == new_record_details)
+    scenario.verify(registry_contract.verify_integrity("123456"))
+
+    # Test changing ownership through an approved proposal naming the new institution
+    registry_contract.propose_ownership_change(student_identifier="654321", new_institution_id=1, proposal_id=0).run(sender=student, valid=False)
+    registry_contract.propose_ownership_change(student_identifier="654321", new_institution_id=1, proposal_id=0).run(sender=university)
+    registry_contract.approve_update(student_identifier="654321", proposal_id=0).run(sender=signatory1)
+    scenario.verify(~registry_contract.get_proposal_status(sp.record(student_identifier="654321", proposal_id=0)).approved)
+    registry_contract.approve_update(student_identifier="654321", proposal_id=0).run(sender=signatory2)
+    # An ownership change proposal cannot be executed as a full update
+    registry_contract.execute_update(student_identifier="654321", proposal_id=0).run(sender=university, valid=False)
+    # Only the institution's controller or multisig can carry out the change
+    registry_contract.change_ownership(student_identifier="654321", proposal_id=0).run(sender=student, valid=False)
+    registry_contract.change_ownership(student_identifier="654321", proposal_id=0).run(sender=university)
+    scenario.verify(registry_contract.data.records["654321"].institution_id == 1)
+    scenario.verify(registry_contract.data.records["123456"].institution_id == 0)
+
+    # Test batch updates for end-of-term publication
+    registry_contract.add_record(student_identifier="111111", record_details={}, institution_id=0).run(sender=admin)
+    registry_contract.add_record(student_identifier="222222", record_details={}, institution_id=0).run(sender=admin)
+    # Physics (course 102): B (grade 4) in 2024 Fall
+    term_details = {102: sp.record(grade=4, term=20243)}
+    for student_identifier in ["111111", "222222"]:
+        registry_contract.propose_update(student_identifier=student_identifier, proposal_details=term_details, proposal_id=0).run(sender=university)
+        registry_contract.approve_update(student_identifier=student_identifier, proposal_id=0).run(sender=signatory1)
+    # Only the first record's proposal reaches the threshold
+    registry_contract.approve_update(student_identifier="111111", proposal_id=0).run(sender=signatory2)
+    batch = [
+        sp.record(student_identifier="111111", new_details=term_details, proposal_id=0),
+        sp.record(student_identifier="222222", new_details=term_details, proposal_id=0),
+    ]
+
+    # Test the all-or-nothing policy (this should fail because of the second item)
+    registry_contract.batch_update_records(updates=batch, atomic=True).run(sender=university, valid=False)
+    scenario.verify(registry_contract.data.records["111111"].record_details == {})
+
+    # Test the skip-and-report policy (the first item is applied, the second is skipped)
+    registry_contract.batch_update_records(updates=batch, atomic=False).run(sender=university)
+    scenario.verify(registry_contract.data.records["111111"].record_details == term_details)
+    scenario.verify(registry_contract.data.records["222222"].record_details == {})
+    scenario.verify(registry_contract.data.proposals.contains(("222222", 0)))
+
+    # Test Merkle commitment mode with a four-course transcript kept off-chain
+    courses = [
+        sp.record(code=101, grade=1, term=20243),
+        sp.record(code=102, grade=4, term=20243),
+        sp.record(code=103, grade=1, term=20251),
+        sp.record(code=104, grade=7, term=20251),
+    ]
+    leaves = [sp.blake2b(sp.concat([sp.bytes("0x00"), sp.pack(course)])) for course in courses]
+    node_01 = sp.blake2b(sp.concat([sp.bytes("0x01"), leaves[0], leaves[1]]))
+    node_23 = sp.blake2b(sp.concat([sp.bytes("0x01"), leaves[2], leaves[3]]))
+    merkle_root = scenario.compute(sp.blake2b(sp.concat([sp.bytes("0x01"), node_01, node_23])))
+    registry_contract.add_committed_record(student_identifier="333333", merkle_root=merkle_root, institution_id=0).run(sender=admin)
+    scenario.verify(sp.len(registry_contract.data.records["333333"].record_details) == 0)
+
+    # Prove course 103 with its sibling leaf (on the right) and the sibling subtree (on the left)
+    proof = [
+        sp.record(sibling=leaves[3], sibling_is_left=False),
+        sp.record(sibling=node_01, sibling_is_left=True),
+    ]
+    scenario.verify(registry_contract.verify_course(sp.record(student_identifier="333333", course=courses[2], proof=proof)))
+    # A tampered grade does not match the committed root
+    tampered_course = sp.record(code=103, grade=4, term=20251)
+    scenario.verify(~registry_contract.verify_course(sp.record(student_identifier="333333", course=tampered_course, proof=proof)))
+
+    # Test updating a committed record by proposing a new root
+    registry_contract.propose_root_update(student_identifier="333333", merkle_root=node_01, proposal_id=0).run(sender=university)
+    registry_contract.approve_update(student_identifier="333333", proposal_id=0).run(sender=signatory1)
+    registry_contract.approve_update(student_identifier="333333", proposal_id=0).run(sender=signatory2)
+    registry_contract.execute_update(student_identifier="333333", proposal_id=0).run(sender=university)
+    scenario.verify(registry_contract.data.records["333333"].record_hash == node_01)
+
+    # Test per-course changes maintained as a hash chain, each approved as a proposal carrying the change
+    # Chemistry (course 103): A (grade 1) in 2025 Spring (term 20251)
+    deltas = [
+        sp.record(code=103, course=sp.some(sp.record(grade=1, term=20251))),
+        sp.record(code=102, course=sp.some(sp.record(grade=3, term=20243))),
+        sp.record(code=103, course=sp.none),
+    ]
+    for proposal_id in range(3):
+        registry_contract.propose_course_change(student_identifier="111111", delta=deltas[proposal_id], proposal_id=proposal_id).run(sender=university)
+        registry_contract.approve_update(student_identifier="111111", proposal_id=proposal_id).run(sender=signatory1)
+        registry_contract.approve_update(student_identifier="111111", proposal_id=proposal_id).run(sender=signatory2)
+    # A course change proposal cannot be executed as a full update
+    registry_contract.execute_update(student_identifier="111111", proposal_id=0).run(sender=university, valid=False)
+    checkpoint_hash = scenario.compute(registry_contract.data.records["111111"].record_hash)
+    registry_contract.add_course(student_identifier="111111", code=103, course=sp.record(grade=1, term=20251), proposal_id=0).run(sender=university)
+    # Only the approved change can be applied with a proposal
+    registry_contract.amend_grade(student_identifier="111111", code=102, grade=0, proposal_id=1).run(sender=university, valid=False)
+    registry_contract.remove_course(student_identifier="111111", code=102, proposal_id=1).run(sender=university, valid=False)
+    registry_contract.amend_grade(student_identifier="111111", code=102, grade=3, proposal_id=1).run(sender=university)
+    registry_contract.remove_course(student_identifier="111111", code=103, proposal_id=2).run(sender=university)
+    scenario.verify(registry_contract.data.records["111111"].record_details == {102: sp.record(grade=3, term=20243)})
+    scenario.verify(registry_contract.data.records["111111"].checkpoint_hash == checkpoint_hash)
+
+    # Test verifying the stored details and hash chain against the history
+    scenario.verify(registry_contract.verify_integrity("111111"))
+
+    # Test reconstructing past versions from the history: registration, batch update and three per-course changes
+    scenario.verify(registry_contract.data.records["111111"].version == 4)
+    scenario.verify(registry_contract.get_version(sp.record(student_identifier="111111", version=0)) == {})
+    scenario.verify(registry_contract.get_version(sp.record(student_identifier="111111", version=1)) == term_details)
+    version_3_details = {102: sp.record(grade=3, term=20243), 103: sp.record(grade=1, term=20251)}
+    scenario.verify(registry_contract.get_version(sp.record(student_identifier="111111", version=3)) == version_3_details)
+    scenario.verify(registry_contract.get_version(sp.record(student_identifier="111111", version=4)) == registry_contract.data.records["111111"].record_details)
+    scenario.verify(registry_contract.verify_version(sp.record(student_identifier="111111", version=3, record_details=version_3_details)))
+    # Versions 0, 2 and 4 keep a snapshot; version 3 is rebuilt from the snapshot of version 2 and one changes list
+    scenario.verify(registry_contract.data.history[("111111", 2)].snapshot.is_some())
+    scenario.verify(registry_contract.data.history[("111111", 3)].snapshot.is_none())
+    scenario.verify(~registry_contract.verify_version(sp.record(student_identifier="111111", version=2, record_details=version_3_details)))
+
+    # Test rotating the university's key: one operation moves control of all of its records
+    new_university = sp.test_account("NewUniversity")
+    registry_contract.rotate_institution(institution_id=0, controller=new_university.address, signers=university_signers, multisig=university_multisig.address).run(sender=university, valid=False)
+    registry_contract.rotate_institution(institution_id=0, controller=new_university.address, signers=university_signers, multisig=university_multisig.address).run(sender=university_multisig)
+    registry_contract.propose_update(student_identifier="123456", proposal_details=term_details, proposal_id=1).run(sender=university, valid=False)
+    registry_contract.propose_update(student_identifier="123456", proposal_details=term_details, proposal_id=1).run(sender=new_university)
+    registry_contract.propose_update(student_identifier="222222", proposal_details=term_details, proposal_id=1).run(sender=new_university)
+    # Records of other institutions are not affected
+    registry_contract.propose_update(student_identifier="654321", proposal_details=term_details, proposal_id=1).run(sender=new_university, valid=False)
@@ -17,9 +17,20 @@ def main():
         duration (in days).
 
         - For each deposit the amount to be paid out and the due date are recorded.
-        The corresponding amount of collateral is locked up.
+        The corresponding amount of collateral is locked up. A depositor can hold
+        many deposits at once; each one is identified by a deposit id.
 
-        - At maturity the deposit plus interest can be withdrawn.
+        - At maturity the deposit plus interest can be withdrawn, one deposit at a
+        time or all matured deposits of the sender in a single transfer.
+
+        - Deposits are also queued by maturity day, so once a day has passed the
+        administrator can pay out its deposits in bounded batches. Deposits of
+        contracts are left for them to withdraw, as a contract could reject the
+        transfer and block the batch.
+
+        Every entrypoint that changes the storage emits an event ("deposit",
+        "withdrawal", "settled", ...) with the values it changed, so off-chain
+        consumers can follow the ledger from operation receipts alone.
         """
 
         def __init__(self, admin, initialRate, initialDuration):
@@ -33,7 +44,28 @@ def main():
             """
             self.data.admin = admin
             self.data.collateral = sp.mutez(0)
-            self.data.ledger = {}
+            # Deposits keyed by (depositor, deposit id). A big_map, so only the
+            # entries touched by a call are loaded whatever the number of depositors.
+            self.data.ledger = sp.cast(
+                sp.big_map(),
+                sp.big_map[
+                    sp.pair[sp.address, sp.nat],
+                    sp.record(amount=sp.mutez, due=sp.timestamp),
+                ],
+            )
+            # Open deposit ids of each depositor.
+            self.data.deposits = sp.cast(sp.big_map(), sp.big_map[sp.address, sp.set[sp.nat]])
+            self.data.next_deposit_id = 0
+            # Settlement queue: (maturity day, position) -> (depositor, deposit id).
+            # Days are counted from the epoch.
+            self.data.settlement_queue = sp.cast(
+                sp.big_map(), sp.big_map[sp.pair[sp.nat, sp.nat], sp.pair[sp.address, sp.nat]]
+            )
+            # Number of queued deposits of each day and position of the next one
+            # to settle.
+            self.data.buckets = sp.cast(
+                sp.big_map(), sp.big_map[sp.nat, sp.record(size=sp.nat, cursor=sp.nat)]
+            )
             self.data.rate = initialRate
             self.data.duration = initialDuration
 
@@ -50,12 +82,14 @@ def main():
             assert sp.amount == sp.mutez(0)
             assert sp.sender == sp.to_address(sp.implicit_account(public_key_hash))
             sp.set_delegate(sp.Some(public_key_hash))
+            sp.emit(public_key_hash, tag="delegated")
 
         @sp.entrypoint
         def collateralize(self):
             """Admin-only. Provide tez as collateral for interest to be paid."""
             assert sp.sender == self.data.admin
             self.data.collateral += sp.amount
+            sp.emit(self.data.collateral, tag="collateral_changed")
 
         @sp.entrypoint
         def uncollateralize(self, amount, receiver):
@@ -72,6 +106,7 @@ def main():
             assert amount <= self.data.collateral, "insufficient collateral"
             self.data.collateral -= amount
             sp.send(receiver, amount)
+            sp.emit(self.data.collateral, tag="collateral_changed")
 
         @sp.entrypoint
         def set_offer(self, rate, duration):
@@ -86,6 +121,52 @@ def main():
             assert sp.amount == sp.mutez(0)
             self.data.rate = rate
             self.data.duration = duration
+            sp.emit(sp.record(rate=rate, duration=duration), tag="offer_changed")
+
+        @sp.entrypoint
+        def settle_bucket(self, day, limit):
+            """Admin-only. Pay out up to `limit` deposits that matured on `day`.
+
+            Deposits are settled in the order they were made, starting from the
+            bucket's cursor. Deposits already withdrawn by their owner are
+            skipped. Only implicit accounts are paid out: a contract depositor
+            could fail on receipt and block the bucket for good, so its deposit
+            stays in the ledger, to be withdrawn with `withdraw` or
+            `withdraw_all_matured`. The cursor moves past it either way. The
+            cost of a call depends on `limit` only. A "settled" event lists the
+            (depositor, deposit id) pairs paid out and the new cursor of the
+            bucket.
+
+            Args:
+                day (sp.nat): Maturity day, counted in days from the epoch.
+                limit (sp.nat): Maximum number of queued deposits to visit.
+            """
+            assert sp.sender == self.data.admin
+            assert sp.amount == sp.mutez(0)
+            assert sp.now >= sp.add_days(sp.timestamp(0), sp.to_int(day) + 1), "BucketNotMatured"
+            bucket = self.data.buckets.get(day, error="NoBucket")
+            cursor = bucket.cursor
+            end = sp.min(bucket.size, cursor + limit)
+            settled = sp.cast([], sp.list[sp.pair[sp.address, sp.nat]])
+            while cursor < end:
+                position = self.data.settlement_queue[(day, cursor)]
+                depositor = sp.fst(position)
+                deposit_id = sp.snd(position)
+                if self.data.ledger.contains((depositor, deposit_id)) and sp.is_implicit_account(depositor).is_some():
+                    amount = self.data.ledger[(depositor, deposit_id)].amount
+                    # Transfers of 0 tez to implicit accounts fail
+                    if amount > sp.mutez(0):
+                        sp.send(depositor, amount)
+                    del self.data.ledger[(depositor, deposit_id)]
+                    self.data.deposits[depositor].remove(deposit_id)
+                    settled.push((depositor, deposit_id))
+                del self.data.settlement_queue[(day, cursor)]
+                cursor += 1
+            if cursor == bucket.size:
+                del self.data.buckets[day]
+            else:
+                self.data.buckets[day] = sp.record(size=bucket.size, cursor=cursor)
+            sp.emit(sp.record(day=day, cursor=cursor, deposits=settled), tag="settled")
 
         # Permissionless entrypoints
 
@@ -93,32 +174,90 @@ def main():
         def deposit(self, rate, duration):
             """Deposit tez. The current offer has to be repeated in the parameters.
 
+            Each deposit gets a new deposit id, so a depositor can hold several
+            deposits at once. A "deposit" event carries the id, the amount due
+            (deposit and interest) and the due date.
+
             Args:
                 rate (sp.nat): Basis points to compute the interest.
                 duration (sp.nat): Number of days before a deposit can be withdrawn.
             """
             assert self.data.rate >= rate
             assert self.data.duration <= duration
-            assert not self.data.ledger.contains(sp.sender)
 
             # Compute interest to be paid.
             interest = sp.split_tokens(sp.amount, self.data.rate, 10_000)
             self.data.collateral -= interest
 
             # Record the payment to be made.
-            self.data.ledger[sp.sender] = sp.record(
+            deposit_id = self.data.next_deposit_id
+            self.data.next_deposit_id += 1
+            entry = sp.record(
                 amount=sp.amount + interest,
                 due=sp.add_days(sp.now, self.data.duration),
             )
+            self.data.ledger[(sp.sender, deposit_id)] = entry
+            open_ids = self.data.deposits.get(sp.sender, default=set())
+            open_ids.add(deposit_id)
+            self.data.deposits[sp.sender] = open_ids
+
+            # Queue the deposit in the bucket of its maturity day.
+            day = sp.as_nat(sp.now - sp.timestamp(0)) / 86400 + sp.as_nat(self.data.duration)
+            bucket = self.data.buckets.get(day, default=sp.record(size=0, cursor=0))
+            self.data.settlement_queue[(day, bucket.size)] = (sp.sender, deposit_id)
+            self.data.buckets[day] = sp.record(size=bucket.size + 1, cursor=bucket.cursor)
+            sp.emit(
+                sp.record(depositor=sp.sender, deposit_id=deposit_id, amount=entry.amount, due=entry.due),
+                tag="deposit",
+            )
 
         @sp.entrypoint
-        def withdraw(self, receiver):
-            """Withdraw tez at maturity."""
+        def withdraw(self, deposit_id, receiver):
+            """Withdraw one deposit at maturity.
+
+            Args:
+                deposit_id (sp.nat): Id of the sender's deposit.
+                receiver (sp.address): Address the payout is sent to.
+            """
             assert sp.amount == sp.mutez(0)
-            entry = self.data.ledger.get(sp.sender, error="NoDeposit")
+            entry = self.data.ledger.get((sp.sender, deposit_id), error="NoDeposit")
             assert sp.now >= entry.due
             sp.send(receiver, entry.amount)
-            del self.data.ledger[sp.sender]
+            del self.data.ledger[(sp.sender, deposit_id)]
+            self.data.deposits[sp.sender].remove(deposit_id)
+            sp.emit(
+                sp.record(depositor=sp.sender, deposit_ids=[deposit_id], amount=entry.amount),
+                tag="withdrawal",
+            )
+
+        @sp.entrypoint
+        def withdraw_all_matured(self, receiver):
+            """Withdraw every matured deposit of the sender in a single transfer.
+
+            Only the sender's own deposits are visited, so the cost does not
+            depend on the number of depositors.
+
+            Args:
+                receiver (sp.address): Address the payout is sent to.
+            """
+            assert sp.amount == sp.mutez(0)
+            open_ids = self.data.deposits.get(sp.sender, error="NoDeposit")
+            total = sp.mutez(0)
+            withdrawn = sp.cast([], sp.list[sp.nat])
+            for deposit_id in open_ids.elements():
+                entry = self.data.ledger[(sp.sender, deposit_id)]
+                if sp.now >= entry.due:
+                    total += entry.amount
+                    del self.data.ledger[(sp.sender, deposit_id)]
+                    open_ids.remove(deposit_id)
+                    withdrawn.push(deposit_id)
+            assert total > sp.mutez(0), "NoMaturedDeposit"
+            self.data.deposits[sp.sender] = open_ids
+            sp.send(receiver, total)
+            sp.emit(
+                sp.record(depositor=sp.sender, deposit_ids=withdrawn, amount=total),
+                tag="withdrawal",
+            )
 
 
 @sp.module
@@ -215,7 +354,7 @@ if "templates" not in __name__:
         )
         sc.verify(c.data.collateral == sp.tez(490))
         sc.verify(
-            c.data.ledger[delegator.address]
+            c.data.ledger[(delegator.address, 0)]
             == sp.record(amount=sp.tez(110), due=sp.timestamp(365 * 24 * 3600))
         )
         sc.h3("Failures")
@@ -231,59 +370,155 @@ if "templates" not in __name__:
             valid=False,
             exception="WrongCondition: self.data.duration <= params.duration",
         )
+        sc.h3("Second deposit")
         c.deposit(rate=1000, duration=365).run(
             sender=delegator.address,
             amount=sp.tez(100),
-            valid=False,
-            exception="WrongCondition: not (self.data.ledger.contains(sp.sender))",
+            now=sp.timestamp(365 * 24 * 3600),
+        )
+        sc.verify(c.data.collateral == sp.tez(480))
+        sc.verify(
+            c.data.ledger[(delegator.address, 1)]
+            == sp.record(amount=sp.tez(110), due=sp.timestamp(730 * 24 * 3600))
         )
+        sc.verify(c.data.deposits[delegator.address] == {0, 1})
 
         sc.h2("uncollateralize")
         sc.h3("Failures")
-        c.uncollateralize(amount=sp.tez(500), receiver=admin_receiver.address).run(
+        c.uncollateralize(amount=sp.tez(490), receiver=admin_receiver.address).run(
             sender=admin, valid=False, exception="insufficient collateral"
         )
-        c.uncollateralize(amount=sp.tez(490), receiver=admin_receiver.address).run(
+        c.uncollateralize(amount=sp.tez(480), receiver=admin_receiver.address).run(
             sender=non_admin,
             valid=False,
             exception="WrongCondition: sp.sender == self.data.admin",
         )
         sc.h3("Valid")
-        c.uncollateralize(amount=sp.tez(490), receiver=admin_receiver.address).run(
+        c.uncollateralize(amount=sp.tez(480), receiver=admin_receiver.address).run(
             sender=admin
         )
         sc.verify(c.data.collateral == sp.tez(0))
-        sc.verify(admin_receiver.balance == sp.tez(490))
+        sc.verify(admin_receiver.balance == sp.tez(480))
 
         sc.h2("withdraw")
         sc.h3("Failures")
-        c.withdraw(delegator.address).run(
+        c.withdraw(deposit_id=0, receiver=delegator.address).run(
             sender=delegator.address,
             amount=sp.mutez(1),
             now=sp.timestamp(365 * 24 * 3600),
             valid=False,
             exception="WrongCondition: sp.amount == sp.tez(0)",
         )
-        c.withdraw(delegator.address).run(
+        c.withdraw(deposit_id=0, receiver=delegator.address).run(
             sender=delegator.address,
             now=sp.timestamp(365 * 24 * 3600 - 1),
             valid=False,
             exception="WrongCondition: sp.now >= entry.due",
         )
         sc.h3("Valid")
-        c.withdraw(delegator.address).run(
+        c.withdraw(deposit_id=0, receiver=delegator.address).run(
             sender=delegator.address, now=sp.timestamp(365 * 24 * 3600)
         )
         sc.verify(delegator.balance == sp.tez(110))
-        sc.verify(~c.data.ledger.contains(delegator.address))
+        sc.verify(~c.data.ledger.contains((delegator.address, 0)))
+        sc.verify(c.data.deposits[delegator.address] == {1})
         sc.h3("Failures")
-        c.withdraw(delegator.address).run(
+        c.withdraw(deposit_id=0, receiver=delegator.address).run(
             sender=delegator.address,
             valid=False,
             now=sp.timestamp(365 * 24 * 3600),
             exception="NoDeposit",
         )
 
+        sc.h2("withdraw_all_matured")
+        sc.h3("Failures")
+        c.withdraw_all_matured(delegator.address).run(
+            sender=delegator.address,
+            now=sp.timestamp(730 * 24 * 3600 - 1),
+            valid=False,
+            exception="NoMaturedDeposit",
+        )
+        c.withdraw_all_matured(delegator.address).run(
+            sender=non_admin,
+            now=sp.timestamp(730 * 24 * 3600),
+            valid=False,
+            exception="NoDeposit",
+        )
+        sc.h3("Valid")
+        c.withdraw_all_matured(delegator.address).run(
+            sender=delegator.address, now=sp.timestamp(730 * 24 * 3600)
+        )
+        sc.verify(delegator.balance == sp.tez(220))
+        sc.verify(~c.data.ledger.contains((delegator.address, 1)))
+        sc.verify(sp.len(c.data.deposits[delegator.address]) == 0)
+
+    @sp.add_test(name="Settlement")
+    def test():
+        sc = sp.test_scenario([main, testing])
+        sc.h1("Settlement queue")
+        c = main.BakingSwap(admin.address, 1000, 1)
+        sc += c
+        # Two implicit accounts and a contract
+        receiver = testing.Receiver()
+        sc += receiver
+        depositors = [
+            sp.test_account("Depositor0").address,
+            sp.test_account("Depositor1").address,
+            receiver.address,
+        ]
+        c.collateralize().run(sender=admin, amount=sp.tez(100))
+
+        sc.h2("Deposits maturing on day 1")
+        for depositor in depositors:
+            c.deposit(rate=1000, duration=1).run(
+                sender=depositor, amount=sp.tez(10), now=sp.timestamp(3600)
+            )
+        sc.verify(c.data.buckets[1] == sp.record(size=3, cursor=0))
+        sc.verify(c.data.settlement_queue[(1, 2)] == (receiver.address, 2))
+
+        sc.h2("A depositor withdraws on their own")
+        c.withdraw(deposit_id=1, receiver=depositors[1]).run(
+            sender=depositors[1], now=sp.timestamp(24 * 3600 + 3600)
+        )
+        sc.verify(c.balance == sp.tez(119))
+
+        sc.h2("settle_bucket")
+        sc.h3("Failures")
+        c.settle_bucket(day=1, limit=2).run(
+            sender=admin,
+            now=sp.timestamp(2 * 24 * 3600 - 1),
+            valid=False,
+            exception="BucketNotMatured",
+        )
+        c.settle_bucket(day=1, limit=2).run(
+            sender=non_admin,
+            now=sp.timestamp(2 * 24 * 3600),
+            valid=False,
+            exception="WrongCondition: sp.sender == self.data.admin",
+        )
+        c.settle_bucket(day=2, limit=2).run(
+            sender=admin,
+            now=sp.timestamp(3 * 24 * 3600),
+            valid=False,
+            exception="NoBucket",
+        )
+        sc.h3("Valid")
+        c.settle_bucket(day=1, limit=2).run(sender=admin, now=sp.timestamp(2 * 24 * 3600))
+        sc.verify(~c.data.ledger.contains((depositors[0], 0)))
+        sc.verify(c.balance == sp.tez(108))
+        sc.verify(c.data.buckets[1] == sp.record(size=3, cursor=2))
+
+        sc.h3("Contract depositors are left to withdraw")
+        c.settle_bucket(day=1, limit=2).run(sender=admin, now=sp.timestamp(2 * 24 * 3600))
+        sc.verify(~c.data.buckets.contains(1))
+        sc.verify(c.data.ledger.contains((receiver.address, 2)))
+        sc.verify(receiver.balance == sp.tez(0))
+        c.withdraw(deposit_id=2, receiver=receiver.address).run(
+            sender=receiver.address, now=sp.timestamp(2 * 24 * 3600)
+        )
+        sc.verify(receiver.balance == sp.tez(11))
+        sc.verify(c.balance == sp.tez(97))
+
     # @sp.add_test(name="Mutation", is_default=False)
     # def test():
     #     s = sp.test_scenario()
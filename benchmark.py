@@ -0,0 +1,521 @@
+"""Gas and storage benchmarks for the GradeBlock contracts.
+
+Usage:
+    python benchmark.py [--scale quick|full] [--baseline benchmark_baseline.json]
+                        [--output bench_output.json] [--threshold 0.05]
+                        [--update-baseline] [--octez-client octez-client]
+
+Each case originates one contract in a SmartPy test scenario, drives it to the
+requested scale (courses per record, pending proposals or ledger entries) and
+then calls the measured entrypoint once. The SmartPy interpreter compiles the
+scenario to Michelson; the harness replays the compiled origination and calls
+in an octez-client mockup and reads gas consumed, storage size and paid storage
+size diff from the receipt of the measured call.
+
+Origination cases (`<contract>.origination.code_0`) originate the contract
+without calling it and report the size of its code and initial storage
+(`storage_size`) and the mutez burnt to originate it (`origination_cost`),
+next to the baseline values, so every deployment comes with a before/after
+size report.
+
+Results are written as JSON keyed by case id and compared against the stored
+baseline. The script exits with status 1 when any metric grew by more than the
+threshold (relative to the baseline), and when the baseline or one of the
+measured cases is missing from it (a new or renamed case): record the baseline
+with --update-baseline first.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import namedtuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCALES = {
+    "quick": {"courses": [1, 10], "proposals": [1, 10], "ledger": [1, 10], "code": [0]},
+    "full": {
+        "courses": [1, 10, 100, 1000],
+        "proposals": [1, 10, 100, 500],
+        "ledger": [1, 100, 1000, 10000],
+        "code": [0],
+    },
+}
+
+METRICS = ("gas", "storage_size", "paid_storage_diff", "origination_cost")
+
+# Protocol constants used to turn paid bytes into the tez burnt at origination.
+COST_PER_BYTE_MUTEZ = 250
+ORIGINATION_SIZE = 257
+
+# Bootstrap accounts of the octez-client mockup; scenario senders must match
+# them so the compiled parameters stay valid when replayed.
+BOOTSTRAP = {
+    "bootstrap1": "tz1KqTpEZ7Yob7QbPE4Hy4Wo8fHG8LhKxZSx",
+    "bootstrap2": "tz1gjaF81ZRRvdzjobyfVNsAeSC6PScjfQwN",
+    "bootstrap3": "tz1faswCTDciRzE4oJ9jn2Vm2dvjeyA9fUzU",
+    "bootstrap4": "tz1b7tUupMgCNw2cCLpKTkSD1NZzB5TkP2sv",
+    "bootstrap5": "tz1ddb9NMYHZi5UzPdzTZMYQQZoMub195zgv",
+}
+
+# A call in a benchmark scenario. `sender` is a mockup alias, `amount` is in
+# mutez and only the call flagged `measured` is reported.
+Step = namedtuple("Step", "entrypoint params sender amount measured")
+
+
+def call(entrypoint, sender="bootstrap1", amount=0, measured=False, **params):
+    return Step(entrypoint, params, sender, amount, measured)
+
+
+# A benchmark case: `build(sp, module, scale, accounts)` returns the contract
+# instance to originate and the list of steps to run against it.
+Case = namedtuple("Case", "contract entrypoint dimension build")
+
+
+def case_id(case, scale):
+    return "%s.%s.%s_%d" % (case.contract, case.entrypoint, case.dimension, scale)
+
+
+def load_contract_module(filename):
+    """Import a contract script without registering it as `__main__`."""
+    path = os.path.join(HERE, filename)
+    spec = importlib.util.spec_from_file_location("templates_" + filename[:-3], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Scenario builders ---------------------------------------------------------
+
+
+def courses_details(sp, count):
+    """A transcript of `count` courses in the compact schema (see record_schema.py)."""
+    return {100 + i: sp.record(grade=1, term=20243) for i in range(count)}
+
+
+def academic_record_case(entrypoint):
+    def build(sp, module, scale, accounts):
+        owner = accounts["bootstrap1"]
+        details = courses_details(sp, scale)
+        c = module.main.AcademicRecord(
+            student_identifier="123456", record_details=details, owner_address=owner, required_approvals=1,
+            signatories=sp.set([accounts["bootstrap2"], accounts["bootstrap3"]]),
+        )
+        if entrypoint == "change_ownership":
+            steps = [call("propose_ownership_change", new_owner_address=accounts["bootstrap2"])]
+        else:
+            steps = [call("propose_update", proposal_details=courses_details(sp, scale + 1))]
+        steps.append(call("approve_update", sender="bootstrap2", proposal_id=0))
+        if entrypoint == "propose_update":
+            steps.append(call("propose_update", measured=True, proposal_details=details))
+        elif entrypoint == "approve_update":
+            steps.append(call("approve_update", sender="bootstrap3", measured=True, proposal_id=0))
+        elif entrypoint == "execute_update":
+            steps.append(call("execute_update", measured=True, proposal_id=0))
+        elif entrypoint == "update_record":
+            steps.append(call("update_record", measured=True, new_details=courses_details(sp, scale + 1), proposal_id=0))
+        elif entrypoint == "change_ownership":
+            steps.append(call("change_ownership", measured=True, new_owner_address=accounts["bootstrap2"], proposal_id=0))
+        elif entrypoint == "cleanup_expired":
+            steps.append(call("cleanup_expired", measured=True, limit=10))
+        return c, steps
+
+    return Case("AcademicRecord", entrypoint, "courses", build)
+
+
+def registry_case(entrypoint):
+    def build(sp, module, scale, accounts):
+        c = module.main.AcademicRecordRegistry(admin_address=accounts["bootstrap1"], required_approvals=1)
+        details = courses_details(sp, scale)
+        steps = [call("register_institution", controller=accounts["bootstrap1"], signers=sp.set([accounts["bootstrap2"]]), multisig=accounts["bootstrap1"])]
+        steps.append(call("add_record", student_identifier="123456", record_details=details, institution_id=0))
+        if entrypoint == "amend_grade":
+            delta = sp.record(code=100, course=sp.some(sp.record(grade=2, term=20243)))
+            steps.append(call("propose_course_change", student_identifier="123456", delta=delta, proposal_id=0))
+        else:
+            steps.append(call("propose_update", student_identifier="123456", proposal_details=courses_details(sp, scale + 1), proposal_id=0))
+        steps.append(call("approve_update", sender="bootstrap2", student_identifier="123456", proposal_id=0))
+        if entrypoint == "add_record":
+            steps.append(call("add_record", measured=True, student_identifier="654321", record_details=details, institution_id=0))
+        elif entrypoint == "execute_update":
+            steps.append(call("execute_update", measured=True, student_identifier="123456", proposal_id=0))
+        elif entrypoint == "amend_grade":
+            steps.append(call("amend_grade", measured=True, student_identifier="123456", code=100, grade=2, proposal_id=0))
+        elif entrypoint == "batch_update_records":
+            updates = [sp.record(student_identifier="123456", new_details=courses_details(sp, scale + 1), proposal_id=0)]
+            steps.append(call("batch_update_records", measured=True, updates=updates, atomic=True))
+        return c, steps
+
+    return Case("AcademicRecordRegistry", entrypoint, "courses", build)
+
+
+def multisig_case(entrypoint):
+    def build(sp, module, scale, accounts):
+        signatories = [accounts["bootstrap1"], accounts["bootstrap2"], accounts["bootstrap3"]]
+        c = module.main.Multisig(signatories=signatories, threshold=2)
+        # Proposals are keyed by record address; any address works as long as nothing is executed
+        record = accounts["bootstrap5"]
+        # Pending proposals that every call has to coexist with
+        steps = [call("propose_change", record=record, proposal_details=sp.pack("Change %d" % i)) for i in range(scale)]
+        steps.append(call("vote_on_change", record=record, proposal_id=0))
+        steps.append(call("vote_on_change", sender="bootstrap2", record=record, proposal_id=0))
+        if entrypoint == "propose_change":
+            steps.append(call("propose_change", measured=True, record=record, proposal_details=sp.pack("Measured change")))
+        elif entrypoint == "vote_on_change":
+            steps.append(call("vote_on_change", sender="bootstrap3", measured=True, record=record, proposal_id=0))
+        elif entrypoint == "cleanup_expired":
+            steps.append(call("cleanup_expired", measured=True, record=record, limit=10))
+        elif entrypoint == "add_signatory":
+            steps.append(call("add_signatory", measured=True, signatory=accounts["bootstrap4"]))
+        elif entrypoint == "remove_signatory":
+            steps.append(call("remove_signatory", measured=True, signatory=accounts["bootstrap3"]))
+        elif entrypoint == "change_threshold":
+            steps.append(call("change_threshold", measured=True, new_threshold=3))
+        return c, steps
+
+    return Case("Multisig", entrypoint, "proposals", build)
+
+
+def baking_swap_case(entrypoint):
+    def build(sp, module, scale, accounts):
+        c = module.main.BakingSwap(accounts["bootstrap1"], 700, 0)
+        steps = [call("collateralize", amount=1000000000)]
+        # One deposit per depositor, so the ledger grows with the number of depositors
+        depositors = sorted(name for name in accounts if name.startswith("bench"))[:scale]
+        steps += [call("deposit", sender=name, amount=1000000, rate=700, duration=0) for name in depositors]
+        if entrypoint == "deposit":
+            steps.append(call("deposit", sender="bootstrap2", amount=1000000, measured=True, rate=700, duration=0))
+        elif entrypoint == "withdraw":
+            steps.append(call("withdraw", sender=depositors[0], measured=True, deposit_id=0, receiver=accounts[depositors[0]]))
+        elif entrypoint == "withdraw_all_matured":
+            steps.append(call("deposit", sender=depositors[0], amount=1000000, rate=700, duration=0))
+            steps.append(call("withdraw_all_matured", sender=depositors[0], measured=True, receiver=accounts[depositors[0]]))
+        elif entrypoint == "collateralize":
+            steps.append(call("collateralize", amount=1000000, measured=True))
+        elif entrypoint == "uncollateralize":
+            steps.append(call("uncollateralize", measured=True, amount=sp.mutez(1), receiver=accounts["bootstrap1"]))
+        elif entrypoint == "set_offer":
+            steps.append(call("set_offer", measured=True, rate=700, duration=0))
+        return c, steps
+
+    return Case("BakingSwap", entrypoint, "ledger", build)
+
+
+ORIGINATIONS = {
+    "AcademicRecord": lambda main, admin: main.AcademicRecord(
+        student_identifier="123456", record_details={}, owner_address=admin, required_approvals=1, signatories={admin}
+    ),
+    "AcademicRecordRegistry": lambda main, admin: main.AcademicRecordRegistry(admin_address=admin, required_approvals=1),
+    "Multisig": lambda main, admin: main.Multisig(signatories=[admin], threshold=1),
+    "BakingSwap": lambda main, admin: main.BakingSwap(admin, 700, 365),
+}
+
+
+def origination_case(contract):
+    def build(sp, module, scale, accounts):
+        return ORIGINATIONS[contract](module.main, accounts["bootstrap1"]), []
+
+    return Case(contract, "origination", "code", build)
+
+
+CONTRACT_FILES = {
+    "AcademicRecord": "academic_record.py",
+    "AcademicRecordRegistry": "academic_record_registry.py",
+    "Multisig": "multisig.py",
+    "BakingSwap": "baking_swap.py",
+}
+
+# AcademicRecordWithMultisig is not benchmarked: its entrypoints call into a
+# separately originated Multisig. Entrypoints that need a target contract,
+# off-chain signatures or a registered baker (execute_change, execute_batch,
+# execute_with_signatures, delegate) are not covered either, nor is
+# settle_bucket, which needs the mockup clock to pass a whole maturity day.
+CASES = (
+    [academic_record_case(ep) for ep in (
+        "propose_update", "approve_update", "execute_update", "update_record",
+        "change_ownership", "cleanup_expired",
+    )]
+    + [registry_case(ep) for ep in (
+        "add_record", "execute_update", "batch_update_records", "amend_grade",
+    )]
+    + [multisig_case(ep) for ep in (
+        "propose_change", "vote_on_change", "cleanup_expired",
+        "add_signatory", "remove_signatory", "change_threshold",
+    )]
+    + [baking_swap_case(ep) for ep in (
+        "deposit", "withdraw", "withdraw_all_matured", "collateralize", "uncollateralize", "set_offer",
+    )]
+    + [origination_case(contract) for contract in ORIGINATIONS]
+)
+
+
+def selected_cases(scale_name):
+    for case in CASES:
+        for scale in SCALES[scale_name][case.dimension]:
+            yield case, scale
+
+
+# Compilation (runs in a subprocess, see compile_cases) ---------------------
+
+
+def register_tests(scale_name, accounts, build_dir):
+    """Register one SmartPy test per case; SmartPy compiles them on exit.
+
+    The schedule of each case (entrypoint, sender, amount, measured flag of
+    every call) is written next to the compiled output so that the measuring
+    process does not need SmartPy.
+    """
+    import smartpy as sp
+
+    modules = {}
+    for case, scale in selected_cases(scale_name):
+        if case.contract not in modules:
+            modules[case.contract] = load_contract_module(CONTRACT_FILES[case.contract])
+        module = modules[case.contract]
+        addresses = {name: sp.address(address) for name, address in accounts.items()}
+
+        def test(case=case, scale=scale, module=module):
+            scenario = sp.test_scenario(module.main)
+            contract, steps = case.build(sp, module, scale, addresses)
+            scenario += contract
+            for step in steps:
+                getattr(contract, step.entrypoint)(**step.params).run(
+                    sender=addresses[step.sender], amount=sp.mutez(step.amount)
+                )
+            schedule = [
+                {"entrypoint": s.entrypoint, "sender": s.sender, "amount": s.amount, "measured": s.measured}
+                for s in steps
+            ]
+            with open(os.path.join(build_dir, case_id(case, scale) + ".steps.json"), "w") as f:
+                json.dump(schedule, f)
+
+        sp.add_test(name=case_id(case, scale))(test)
+
+
+def compile_cases(scale_name, accounts, build_dir):
+    """Run the SmartPy scenarios in a subprocess and return the build directory."""
+    with open(os.path.join(build_dir, "accounts.json"), "w") as f:
+        json.dump(accounts, f)
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--compile", build_dir, "--scale", scale_name],
+        cwd=build_dir,
+        check=True,
+    )
+    return build_dir
+
+
+def case_artifacts(build_dir, name):
+    """Return the compiled contract, initial storage and per-call parameters of a case."""
+    contract = storage = None
+    params = []
+    for root, _, files in os.walk(build_dir):
+        if os.path.basename(root) != name:
+            continue
+        for filename in sorted(files, key=step_number):
+            path = os.path.join(root, filename)
+            if filename.endswith("_cont_0_contract.tz"):
+                contract = path
+            elif filename.endswith("_cont_0_storage.tz"):
+                storage = path
+            elif filename.endswith("_cont_0_params.tz"):
+                params.append(path)
+    if contract is None or storage is None:
+        raise RuntimeError("No compiled output found for %s in %s" % (name, build_dir))
+    return contract, storage, params
+
+
+def step_number(filename):
+    match = re.match(r"step_(\d+)_", filename)
+    return int(match.group(1)) if match else -1
+
+
+# Measurement ---------------------------------------------------------------
+
+
+class Mockup:
+    """Thin wrapper around an octez-client mockup base directory."""
+
+    def __init__(self, client, base_dir):
+        self.client = client
+        self.base_dir = base_dir
+
+    def run(self, *args):
+        command = [self.client, "--base-dir", self.base_dir, "--mode", "mockup"] + list(args)
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError("%s failed:\n%s" % (" ".join(command), result.stderr))
+        return result.stdout
+
+    def create(self, extra_accounts):
+        self.run("create", "mockup")
+        accounts = dict(BOOTSTRAP)
+        for index in range(extra_accounts):
+            alias = "bench%05d" % index
+            self.run("gen", "keys", alias, "--force")
+            accounts[alias] = self.run("show", "address", alias).split("Hash:")[1].split()[0]
+            self.run("transfer", "10", "from", "bootstrap5", "to", alias, "--burn-cap", "1")
+        return accounts
+
+    def originate(self, alias, contract_file, storage_file):
+        with open(storage_file) as f:
+            initial_storage = f.read()
+        return self.run(
+            "originate", "contract", alias, "transferring", "0", "from", "bootstrap1",
+            "running", "file:" + contract_file, "--init", initial_storage, "--burn-cap", "100", "--force",
+        )
+
+    def call(self, alias, step, param_file):
+        """Replay one compiled call; `step` gives its entrypoint, sender and amount."""
+        with open(param_file) as f:
+            argument = f.read()
+        return self.run(
+            "transfer", "%.6f" % (step["amount"] / 1e6), "from", step["sender"], "to", alias,
+            "--entrypoint", step["entrypoint"], "--arg", argument, "--burn-cap", "100",
+        )
+
+
+def parse_receipt(output):
+    """Extract the metrics of the top-level call or origination from an operation receipt.
+
+    Only the operation's own result is read: the figures listed under
+    "Internal operations:" are those of the calls it emitted, each with its
+    own gas and storage.
+    """
+    own_result = output.split("Internal operations:", 1)[0]
+
+    def last(pattern):
+        values = re.findall(pattern, own_result)
+        return float(values[-1]) if values else 0.0
+
+    return {
+        "gas": last(r"Consumed gas: ([\d.]+)"),
+        "storage_size": last(r"Storage size: (\d+) bytes"),
+        "paid_storage_diff": last(r"Paid storage size diff: (\d+) bytes"),
+    }
+
+
+def measure_case(mockup, build_dir, name):
+    contract, storage, params = case_artifacts(build_dir, name)
+    with open(os.path.join(build_dir, name + ".steps.json")) as f:
+        steps = json.load(f)
+    if len(params) != len(steps):
+        raise RuntimeError("%s: expected %d compiled calls, found %d" % (name, len(steps), len(params)))
+    alias = "bench_" + re.sub(r"\W", "_", name)
+    origination = mockup.originate(alias, contract, storage)
+    result = None
+    if not any(step["measured"] for step in steps):
+        # Origination case: code plus initial storage, and the tez burnt for them
+        result = parse_receipt(origination)
+        result["origination_cost"] = (result["paid_storage_diff"] + ORIGINATION_SIZE) * COST_PER_BYTE_MUTEZ
+    for step, param_file in zip(steps, params):
+        output = mockup.call(alias, step, param_file)
+        if step["measured"]:
+            result = parse_receipt(output)
+    return result
+
+
+# Baseline comparison -------------------------------------------------------
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human readable regressions beyond `threshold`.
+
+    A case missing from the baseline is a regression: it could otherwise grow
+    without bound unnoticed.
+    """
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            regressions.append("%s: not in the baseline (run with --update-baseline)" % name)
+            continue
+        for metric in METRICS:
+            old, new = previous.get(metric, 0), metrics.get(metric, 0)
+            if old == 0:
+                grew = new > 0
+            else:
+                grew = (new - old) / old > threshold
+            if grew:
+                regressions.append("%s %s: %s -> %s" % (name, metric, old, new))
+    return regressions
+
+
+def origination_report(results, baseline):
+    """Return one line per origination case: size and cost against the baseline."""
+    lines = []
+    for name, metrics in sorted(results.items()):
+        if ".origination." not in name:
+            continue
+        previous = baseline.get(name, {})
+        lines.append("%s: %s -> %s bytes, %s -> %s mutez" % (
+            name,
+            previous.get("storage_size", "?"), metrics["storage_size"],
+            previous.get("origination_cost", "?"), metrics["origination_cost"],
+        ))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="quick")
+    parser.add_argument("--baseline", default=os.path.join(HERE, "benchmark_baseline.json"))
+    parser.add_argument("--output", default=os.path.join(HERE, "bench_output.json"))
+    parser.add_argument("--threshold", type=float, default=0.05)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--octez-client", default="octez-client")
+    parser.add_argument("--compile", metavar="BUILD_DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compile:
+        with open(os.path.join(args.compile, "accounts.json")) as f:
+            register_tests(args.scale, json.load(f), os.path.abspath(args.compile))
+        return 0
+
+    # A missing baseline fails the run before anything is measured, so CI cannot pass without one
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        parser.error("baseline %s not found; record it with --update-baseline and commit it" % args.baseline)
+    if shutil.which(args.octez_client) is None:
+        parser.error("%s not found; it is needed to measure gas and storage" % args.octez_client)
+
+    work_dir = tempfile.mkdtemp(prefix="gradeblock-bench-")
+    try:
+        mockup = Mockup(args.octez_client, os.path.join(work_dir, "mockup"))
+        accounts = mockup.create(max(SCALES[args.scale]["ledger"]))
+        build_dir = os.path.join(work_dir, "build")
+        os.makedirs(build_dir)
+        compile_cases(args.scale, accounts, build_dir)
+
+        results = {}
+        for case, scale in selected_cases(args.scale):
+            name = case_id(case, scale)
+            results[name] = measure_case(mockup, build_dir, name)
+            print("%-70s %s" % (name, results[name]))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for line in origination_report(results, baseline):
+        print("ORIGINATION " + line)
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
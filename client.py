@@ -0,0 +1,502 @@
+"""Python client for the GradeBlock contracts.
+
+Usage:
+    from client import Client, RemoteSigner
+
+    client = Client("http://localhost:8732", RemoteSigner("http://localhost:6732", "tz1..."))
+    multisig = client.contract("KT1...")
+    calls = [multisig.vote_on_change(record="KT1...", proposal_id=i) for i in range(40)]
+    client.wait(client.send(calls))
+
+    swap = client.contract("KT1...")
+    client.send([swap.deposit(rate=700, duration=365, mutez=1_000_000)])
+
+Calls to any entrypoint of AcademicRecord, AcademicRecordRegistry, Multisig
+or BakingSwap are built from the entrypoint types the node reports: keyword
+arguments fill the fields of a record parameter and a single positional
+argument is the whole parameter (`record.approve_update(3)`). `mutez=` sets
+the amount sent with the call.
+
+`send` puts as many calls as possible in one operation. Each operation is
+simulated before it is signed. Gas and storage limits and fees are set from
+the simulation. An operation over the gas, storage or size limits is split
+in halves and each half sent on its own, down to single calls, as the
+frontend does for batched votes. A call that fails for another reason raises
+SimulationError, and nothing is injected.
+
+The protocol accepts one operation per account per block, so `send` waits
+for each operation of a split batch to be included before it injects the
+next. Counters are tracked locally: they are read from the node once per
+account and resynchronized only after a failed injection. Use several
+clients (one per account) to send more than one operation per block.
+
+`wait` reads the receipts of the blocks that include the operations, and
+raises OperationFailed if one of them was included but not applied (e.g. a
+call that fails because the state changed since it was simulated).
+
+Requests to the node go through a pool of keep-alive HTTP connections, which
+is safe to share between threads. The client only needs the node RPC and a
+signer, so it runs against a sandbox node or a stub RPC server that answers
+the same paths. Operations are signed by an octez-signer compatible remote
+signer; any object with `public_key_hash`, `public_key()` and
+`sign(hex_bytes)` can be used instead.
+"""
+
+import hashlib
+import http.client
+import json
+import math
+import queue
+import threading
+import time
+import urllib.parse
+
+from indexer import base58check, decode, field_name
+
+# Node errors raised when an operation exceeds the per-operation or per-block gas, storage or size limits
+LIMIT_ERRORS = (
+    "gas_exhausted.operation",
+    "gas_exhausted.block",
+    "gas_limit_too_high",
+    "storage_exhausted.operation",
+    "oversized_operation",
+    "operation_quota_exceeded",
+)
+
+# Fees required by the default mempool filter
+MINIMAL_FEE_MUTEZ = 100
+MINIMAL_NANOTEZ_PER_GAS_UNIT = 100
+MINIMAL_NANOTEZ_PER_BYTE = 1000
+
+# Margins added to the simulated gas, storage and fee, and the storage burnt for each new contract
+GAS_MARGIN = 100
+STORAGE_MARGIN = 20
+FEE_MARGIN_MUTEZ = 20
+ORIGINATION_SIZE = 257
+
+SIGNATURE_SIZE = 64
+GENERIC_WATERMARK = "03"
+# Placeholder signature accepted by simulate_operation
+ZERO_SIGNATURE = "sigUHx32f9wesZ1n2BWpixXz4AQaZggEtchaQNHYGRCoWNAXx45WGW2ua3apUUUAGMLPwAU41QoaFCzVSL61VaessLg4YbbP"
+
+# Base58Check prefixes of signatures, stripped to get the raw 64 bytes appended to an operation
+SIGNATURE_PREFIXES = {
+    "edsig": bytes([9, 245, 205, 134, 18]),
+    "spsig1": bytes([13, 115, 101, 19, 63]),
+    "p2sig": bytes([54, 240, 44, 52]),
+    "sig": bytes([4, 130, 43]),
+}
+
+# Base58Check prefix of script expression hashes, which address big_map keys
+SCRIPT_EXPR_PREFIX = bytes([13, 44, 64, 27])
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+class RpcError(Exception):
+    """The node answered with an HTTP error."""
+
+    def __init__(self, status, body):
+        super().__init__("RPC error %d: %s" % (status, body))
+        self.status = status
+        self.body = body
+
+
+class SimulationError(Exception):
+    """A call failed in simulation; `errors` are the node's errors."""
+
+    def __init__(self, errors):
+        super().__init__("Simulation failed: %s" % json.dumps(errors))
+        self.errors = errors
+
+
+class OperationFailed(Exception):
+    """An operation was included in a block but not applied; `errors` are the errors of its receipt."""
+
+    def __init__(self, op_hash, errors):
+        super().__init__("Operation %s failed: %s" % (op_hash, json.dumps(errors)))
+        self.op_hash = op_hash
+        self.errors = errors
+
+
+def exceeds_limits(errors):
+    details = json.dumps(errors)
+    return any(error_id in details for error_id in LIMIT_ERRORS)
+
+
+def base58check_decode(value):
+    number = 0
+    for char in value:
+        number = number * 58 + BASE58_ALPHABET.index(char)
+    data = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    data = b"\x00" * (len(value) - len(value.lstrip("1"))) + data
+    payload, checksum = data[:-4], data[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError("Invalid checksum: %r" % (value,))
+    return payload
+
+
+def raw_signature(signature):
+    """Return the 64 signature bytes of a base58 signature."""
+    for prefix, prefix_bytes in SIGNATURE_PREFIXES.items():
+        if signature.startswith(prefix):
+            payload = base58check_decode(signature)
+            if payload.startswith(prefix_bytes) and len(payload) == len(prefix_bytes) + SIGNATURE_SIZE:
+                return payload[len(prefix_bytes):]
+    raise ValueError("Unknown signature format: %r" % (signature,))
+
+
+def encode(micheline_type, value):
+    """Encode a Python value as Micheline JSON of the given type.
+
+    The inverse of indexer.decode: records are dicts keyed by field name,
+    other pairs tuples, `or` values ("Left" or "Right", value), options None
+    or the value, bytes `bytes` or hex, timestamps Unix seconds or RFC 3339.
+    """
+    prim = micheline_type["prim"]
+    args = micheline_type.get("args", [])
+    if prim in ("nat", "int", "mutez"):
+        return {"int": str(int(value))}
+    if prim == "timestamp":
+        return {"int": str(value)} if isinstance(value, int) else {"string": value}
+    if prim in ("string", "address", "contract", "key", "key_hash", "signature", "chain_id"):
+        return {"string": value}
+    if prim == "bytes":
+        if isinstance(value, (bytes, bytearray)):
+            return {"bytes": value.hex()}
+        return {"bytes": value[2:] if value.startswith("0x") else value}
+    if prim == "bool":
+        return {"prim": "True" if value else "False"}
+    if prim == "unit":
+        return {"prim": "Unit"}
+    if prim == "option":
+        return {"prim": "None"} if value is None else {"prim": "Some", "args": [encode(args[0], value)]}
+    if prim == "or":
+        side, inner = value
+        return {"prim": side, "args": [encode(args[0 if side == "Left" else 1], inner)]}
+    if prim == "list":
+        return [encode(args[0], item) for item in value]
+    if prim == "set":
+        return [encode(args[0], item) for item in sorted(value)]
+    if prim in ("map", "big_map"):
+        return [{"prim": "Elt", "args": [encode(args[0], key), encode(args[1], value[key])]} for key in sorted(value)]
+    if prim == "pair":
+        return encode_pair(micheline_type, value)
+    # Lambdas and other values are passed as Micheline
+    return value
+
+
+def encode_pair(micheline_type, value):
+    args = micheline_type["args"]
+    if len(args) > 2:
+        args = [args[0], {"prim": "pair", "args": args[1:]}]
+    if isinstance(value, dict):
+        # Unannotated inner pairs are part of the same record
+        return {"prim": "Pair", "args": [
+            encode_pair(arg, value) if arg["prim"] == "pair" and field_name(arg) is None else encode(arg, value[field_name(arg)])
+            for arg in args
+        ]}
+    items = list(value)
+    if len(items) > 2:
+        items = [items[0], tuple(items[1:])]
+    return {"prim": "Pair", "args": [encode(arg, item) for arg, item in zip(args, items)]}
+
+
+class RpcPool:
+    """A pool of keep-alive HTTP connections to a node, safe to share between threads."""
+
+    def __init__(self, url, size=4, timeout=60):
+        parts = urllib.parse.urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def request(self, method, path, body=None):
+        with self.slots:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                connection = self.connection_class(self.netloc, timeout=self.timeout)
+            try:
+                status, data = self.exchange(connection, method, path, body)
+            except (http.client.HTTPException, OSError):
+                # The node may have closed an idle connection; retry once on a new one
+                connection.close()
+                connection = self.connection_class(self.netloc, timeout=self.timeout)
+                try:
+                    status, data = self.exchange(connection, method, path, body)
+                except (http.client.HTTPException, OSError):
+                    connection.close()
+                    raise
+            self.idle.put(connection)
+        if status >= 400:
+            raise RpcError(status, data.decode(errors="replace"))
+        return json.loads(data) if data else None
+
+    def exchange(self, connection, method, path, body):
+        headers = {"Connection": "keep-alive"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        connection.request(method, self.prefix + path, body=payload, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def get(self, path):
+        return self.request("GET", path)
+
+    def post(self, path, body):
+        return self.request("POST", path, body)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+class RemoteSigner:
+    """Signs through an octez-signer compatible HTTP signer."""
+
+    def __init__(self, url, public_key_hash, timeout=60):
+        self.rpc = RpcPool(url, size=1, timeout=timeout)
+        self.public_key_hash = public_key_hash
+
+    def public_key(self):
+        return self.rpc.get("/keys/%s" % self.public_key_hash)["public_key"]
+
+    def sign(self, hex_bytes):
+        return self.rpc.post("/keys/%s" % self.public_key_hash, hex_bytes)["signature"]
+
+
+class Contract:
+    """Builds calls to a contract's entrypoints; see the module docstring."""
+
+    def __init__(self, client, address):
+        self.client = client
+        self.address = address
+
+    def call(self, entrypoint, *args, mutez=0, **params):
+        parameter_type = self.client.entrypoints(self.address)[entrypoint]
+        value = args[0] if args else params
+        return {
+            "kind": "transaction",
+            "destination": self.address,
+            "amount": str(mutez),
+            "parameters": {"entrypoint": entrypoint, "value": encode(parameter_type, value)},
+        }
+
+    def __getattr__(self, entrypoint):
+        if entrypoint.startswith("_"):
+            raise AttributeError(entrypoint)
+        return lambda *args, **params: self.call(entrypoint, *args, **params)
+
+    def storage(self):
+        """Return the decoded storage; big_maps are BigMap ids, read with Client.big_map_value."""
+        return self.client.storage(self.address)
+
+
+class Client:
+    def __init__(self, url, signer, pool_size=4, timeout=60):
+        self.rpc = RpcPool(url, size=pool_size, timeout=timeout)
+        self.signer = signer
+        self.source = signer.public_key_hash
+        self.counter = None
+        self.counter_lock = threading.Lock()
+        self.entrypoint_types = {}
+        self._constants = None
+        self._chain_id = None
+
+    def contract(self, address):
+        return Contract(self, address)
+
+    def constants(self):
+        if self._constants is None:
+            self._constants = self.rpc.get("/chains/main/blocks/head/context/constants")
+        return self._constants
+
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.rpc.get("/chains/main/chain_id")
+        return self._chain_id
+
+    def entrypoints(self, address):
+        if address not in self.entrypoint_types:
+            self.entrypoint_types[address] = self.rpc.get("/chains/main/blocks/head/context/contracts/%s/entrypoints" % address)["entrypoints"]
+        return self.entrypoint_types[address]
+
+    def storage(self, address):
+        script = self.rpc.get("/chains/main/blocks/head/context/contracts/%s/script" % address)
+        storage_type = next(section["args"][0] for section in script["code"] if section["prim"] == "storage")
+        return decode(storage_type, script["storage"])
+
+    def big_map_value(self, big_map, key):
+        """Return the decoded value under `key` of a BigMap from a decoded storage, or None."""
+        body = {"data": encode(big_map["key_type"], key), "type": big_map["key_type"]}
+        expr = key_hash_of(self.rpc.post("/chains/main/blocks/head/helpers/scripts/pack_data", body)["packed"])
+        try:
+            value = self.rpc.get("/chains/main/blocks/head/context/big_maps/%d/%s" % (big_map["id"], expr))
+        except RpcError as error:
+            if error.status == 404:
+                return None
+            raise
+        return decode(big_map["value_type"], value)
+
+    def next_counters(self, count):
+        """Reserve `count` consecutive counters of the source account."""
+        with self.counter_lock:
+            if self.counter is None:
+                self.counter = int(self.rpc.get("/chains/main/blocks/head/context/contracts/%s/counter" % self.source))
+            first = self.counter + 1
+            self.counter += count
+            return list(range(first, first + count))
+
+    def reset_counter(self):
+        with self.counter_lock:
+            self.counter = None
+
+    def reveal_content(self):
+        """Return a reveal operation if the source account has not published its key yet."""
+        if self.rpc.get("/chains/main/blocks/head/context/contracts/%s/manager_key" % self.source) is not None:
+            return []
+        return [{"kind": "reveal", "public_key": self.signer.public_key()}]
+
+    def send(self, calls):
+        """Simulate, sign and inject `calls`, split over as few operations as the limits allow.
+
+        Returns the hashes of the injected operations, in order. Each operation
+        but the last is included before the next one is injected.
+        """
+        hashes = []
+        pending = [list(calls)]
+        while pending:
+            group = pending.pop(0)
+            # One operation per account per block: the previous one has to be included first
+            if hashes:
+                self.wait(hashes[-1:])
+            try:
+                operation = self.prepare(group)
+            except SimulationError as error:
+                if len(group) > 1 and exceeds_limits(error.errors):
+                    middle = (len(group) + 1) // 2
+                    pending[:0] = [group[:middle], group[middle:]]
+                    continue
+                raise
+            hashes.append(self.inject(operation))
+        return hashes
+
+    def prepare(self, calls):
+        """Simulate calls as one operation and return it forged, with limits and fees set from the simulation."""
+        constants = self.constants()
+        contents = self.reveal_content() + [dict(call) for call in calls]
+        per_operation = int(constants["hard_gas_limit_per_operation"])
+        gas_limit = min(per_operation, int(constants["hard_gas_limit_per_block"]) // len(contents))
+        storage_limit = int(constants["hard_storage_limit_per_operation"])
+        branch = self.rpc.get("/chains/main/blocks/head/hash")
+        with self.counter_lock:
+            counter = self.counter
+        counters = self.next_counters(len(contents))
+        for content, content_counter in zip(contents, counters):
+            content.update(source=self.source, fee="0", counter=str(content_counter), gas_limit=str(gas_limit), storage_limit=str(storage_limit))
+        try:
+            simulation = self.rpc.post("/chains/main/blocks/head/helpers/scripts/simulate_operation", {
+                "operation": {"branch": branch, "contents": contents, "signature": ZERO_SIGNATURE},
+                "chain_id": self.chain_id(),
+            })
+            errors = [error for result in simulation["contents"] for error in result_errors(result)]
+            if errors:
+                raise SimulationError(errors)
+            for content, result in zip(contents, simulation["contents"]):
+                gas, storage = consumed(result)
+                content.update(gas_limit=str(gas + GAS_MARGIN), storage_limit=str(storage + STORAGE_MARGIN))
+            forged = self.forge(branch, contents)
+            # Fees cover the whole signed operation; they are spread over its contents
+            size = len(forged) // 2 + SIGNATURE_SIZE
+            size_fee = math.ceil(size * MINIMAL_NANOTEZ_PER_BYTE / 1000 / len(contents))
+            for content in contents:
+                gas_fee = math.ceil(int(content["gas_limit"]) * MINIMAL_NANOTEZ_PER_GAS_UNIT / 1000)
+                content["fee"] = str(MINIMAL_FEE_MUTEZ + gas_fee + size_fee + FEE_MARGIN_MUTEZ)
+            forged = self.forge(branch, contents)
+            if len(forged) // 2 + SIGNATURE_SIZE > int(constants["max_operation_data_length"]):
+                raise SimulationError([{"id": "oversized_operation"}])
+        except Exception:
+            # The counters were not used; give them back if no other operation took later ones
+            with self.counter_lock:
+                if self.counter == counters[-1]:
+                    self.counter = counter
+            raise
+        return forged
+
+    def forge(self, branch, contents):
+        return self.rpc.post("/chains/main/blocks/head/helpers/forge/operations", {"branch": branch, "contents": contents})
+
+    def inject(self, forged):
+        signature = raw_signature(self.signer.sign(GENERIC_WATERMARK + forged))
+        try:
+            return self.rpc.post("/injection/operation?chain=main", forged + signature.hex())
+        except RpcError:
+            # A rejected operation leaves the local counter ahead of the node's
+            self.reset_counter()
+            raise
+
+    def wait(self, hashes, timeout=300, poll=2):
+        """Wait until every operation of `hashes` is included in a block.
+
+        Raises OperationFailed as soon as one of them is found included with
+        a result other than applied (failed, backtracked or skipped).
+        """
+        remaining = set(hashes)
+        level = self.rpc.get("/chains/main/blocks/head/header")["level"] - 1
+        deadline = time.monotonic() + timeout
+        while remaining:
+            head = self.rpc.get("/chains/main/blocks/head/header")["level"]
+            while level < head and remaining:
+                level += 1
+                # Manager operations, with their receipts
+                for operation in self.rpc.get("/chains/main/blocks/%d/operations/3" % level):
+                    if operation["hash"] not in remaining:
+                        continue
+                    remaining.discard(operation["hash"])
+                    errors = [error for content in operation["contents"] for error in result_errors(content)]
+                    if errors:
+                        raise OperationFailed(operation["hash"], errors)
+            if remaining:
+                if time.monotonic() > deadline:
+                    raise TimeoutError("Operations not included: %s" % ", ".join(sorted(remaining)))
+                time.sleep(poll)
+
+    def close(self):
+        self.rpc.close()
+
+
+def results_of(content_result):
+    metadata = content_result.get("metadata", {})
+    yield metadata.get("operation_result", {})
+    for internal in metadata.get("internal_operation_results", []):
+        yield internal.get("result", {})
+
+
+def result_errors(content_result):
+    errors = []
+    for result in results_of(content_result):
+        if result.get("status") not in (None, "applied"):
+            errors.extend(result.get("errors", [{"id": result.get("status")}]))
+    return errors
+
+
+def consumed(content_result):
+    """Return the gas and storage (in bytes burnt) of a simulated content, internal operations included."""
+    milligas = 0
+    storage = 0
+    for result in results_of(content_result):
+        milligas += int(result.get("consumed_milligas", 0))
+        storage += int(result.get("paid_storage_size_diff", 0))
+        storage += ORIGINATION_SIZE * (len(result.get("originated_contracts", [])) + bool(result.get("allocated_destination_contract")))
+    return math.ceil(milligas / 1000), storage
+
+
+def key_hash_of(packed):
+    """Return the script expression hash (expr...) the node uses to address a big_map key."""
+    return base58check(SCRIPT_EXPR_PREFIX + hashlib.blake2b(bytes.fromhex(packed), digest_size=32).digest())
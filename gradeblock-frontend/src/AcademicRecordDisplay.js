@@ -1,21 +1,17 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
+import { useCachedLoad, useContractCache } from './ContractCache';
 
-const AcademicRecordDisplay = ({ tezos, contractAddress }) => {
+const AcademicRecordDisplay = ({ contractAddress, studentIdentifier = 'STUDENT_ID' }) => {
+  const cache = useContractCache();
   const [record, setRecord] = useState(null);
   const [loading, setLoading] = useState(false);
 
-  useEffect(() => {
-    fetchRecord();
-  }, []);
-
   const fetchRecord = async () => {
     setLoading(true);
     try {
-      const contract = await tezos.wallet.at(contractAddress);
-      const storage = await contract.storage();
-      // Assuming 'getRecord' is a method in your contract to fetch the record
-      const recordData = await storage.getRecord('STUDENT_ID'); // Replace with actual student ID
-      setRecord(recordData);
+      // Only this student's entry of the records big_map is fetched
+      const recordData = await cache.bigMapValue(contractAddress, 'records', studentIdentifier);
+      setRecord(recordData || null);
     } catch (error) {
       console.error('Failed to fetch the academic record:', error);
     } finally {
@@ -23,6 +19,9 @@ const AcademicRecordDisplay = ({ tezos, contractAddress }) => {
     }
   };
 
+  // Reloaded from the shared cache whenever a new block touches the contract
+  useCachedLoad(contractAddress, fetchRecord, [studentIdentifier]);
+
   return (
     <div>
       {loading ? (
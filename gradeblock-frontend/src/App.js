@@ -7,25 +7,28 @@ import MultisigApproval from './MultisigApproval';
 import OwnershipTransfer from './OwnershipTransfer';
 import RecordIntegrityVerification from './RecordIntegrityVerification';
 import WalletManager from './WalletManager';
+import { ContractCacheProvider } from './ContractCache';
 import { TezosToolkit } from '@taquito/taquito';
 
 const tezos = new TezosToolkit('https://mainnet.api.tez.ie');
 
 function App() {
   return (
-    <div className="App">
-      <header className="App-header">
-        <h1>GradeBlock Frontend</h1>
-        <WalletConnection tezos={tezos} />
-        <ContractInteraction tezos={tezos} />
-        <AcademicRecordDisplay tezos={tezos} contractAddress="KT1..." /> {/* Replace with your contract address */}
-        <RecordUpdateProposal tezos={tezos} contractAddress="KT1..." /> {/* Replace with your contract address */}
-        <MultisigApproval tezos={tezos} contractAddress="KT1..." /> {/* Replace with your contract address */}
-        <OwnershipTransfer tezos={tezos} contractAddress="KT1..." /> {/* Replace with your contract address */}
-        <RecordIntegrityVerification tezos={tezos} contractAddress="KT1..." /> {/* Replace with your contract address */}
-        <RecordIntegrityVerification tezos={tezos} contractAddress="KT1..." /> {/* Replace with your contract address */}
-      </header>
-    </div>
+    <ContractCacheProvider tezos={tezos}>
+      <div className="App">
+        <header className="App-header">
+          <h1>GradeBlock Frontend</h1>
+          <WalletConnection tezos={tezos} />
+          <ContractInteraction tezos={tezos} />
+          <AcademicRecordDisplay contractAddress="KT1..." /> {/* Replace with your contract address */}
+          <RecordUpdateProposal contractAddress="KT1..." /> {/* Replace with your contract address */}
+          <MultisigApproval contractAddress="KT1..." recordAddress="KT1..." /> {/* Replace with your multisig and record addresses */}
+          <OwnershipTransfer contractAddress="KT1..." /> {/* Replace with your contract address */}
+          <RecordIntegrityVerification contractAddress="KT1..." /> {/* Replace with your contract address */}
+          <RecordIntegrityVerification contractAddress="KT1..." /> {/* Replace with your contract address */}
+        </header>
+      </div>
+    </ContractCacheProvider>
   );
 }
 
@@ -0,0 +1,122 @@
+import React, { createContext, useContext, useEffect, useState } from 'react';
+
+// Shared cache of contract abstractions, storage and big_map values.
+// A contract abstraction is loaded once per address. Storage and big_map values are kept
+// until a new block contains an operation sent to the contract, or until the app invalidates
+// them after one of its own operations. big_map values are fetched one key at a time on first use,
+// so a page never downloads more than the entries it shows.
+export class ContractCache {
+  constructor(tezos) {
+    this.tezos = tezos;
+    this.contracts = new Map(); // address -> Promise of the wallet contract abstraction
+    this.storages = new Map(); // address -> Promise of the storage
+    this.bigMapValues = new Map(); // address -> Map of 'path|key' -> Promise of the value
+    this.listeners = new Map(); // address -> Set of callbacks run after invalidation
+    this.subscriptions = new Map(); // address -> head stream subscription
+    this.pending = new Set(); // addresses with an invalidation queued for this tick
+  }
+
+  // Remember `promise` under `key`, dropping it again if it fails so the next call retries
+  remember(map, key, promise) {
+    map.set(key, promise);
+    promise.catch(() => {
+      if (map.get(key) === promise) {
+        map.delete(key);
+      }
+    });
+    return promise;
+  }
+
+  contract(address) {
+    if (!this.contracts.has(address)) {
+      this.remember(this.contracts, address, this.tezos.wallet.at(address));
+      this.watch(address);
+    }
+    return this.contracts.get(address);
+  }
+
+  storage(address) {
+    if (!this.storages.has(address)) {
+      this.remember(this.storages, address, this.contract(address).then((contract) => contract.storage()));
+    }
+    return this.storages.get(address);
+  }
+
+  // Value stored under `key` in the big_map at `path` of the storage (e.g. 'records'),
+  // or undefined when the key is absent
+  bigMapValue(address, path, key) {
+    if (!this.bigMapValues.has(address)) {
+      this.bigMapValues.set(address, new Map());
+    }
+    const values = this.bigMapValues.get(address);
+    const id = `${path}|${JSON.stringify(key)}`;
+    if (!values.has(id)) {
+      this.remember(values, id, this.storage(address).then((storage) => storage[path].get(key)));
+    }
+    return values.get(id);
+  }
+
+  // Reload storage and big_map values when a block contains an operation sent to the contract.
+  // Operations reaching the contract as internal calls of another contract are not seen by the
+  // stream filter; the app invalidates those addresses itself after its own operations.
+  watch(address) {
+    if (this.subscriptions.has(address) || !this.tezos.stream) {
+      return;
+    }
+    const subscription = this.tezos.stream.subscribeOperation({ destination: address });
+    subscription.on('data', () => this.invalidate(address));
+    subscription.on('error', (error) => console.error('Contract stream failed:', error));
+    this.subscriptions.set(address, subscription);
+  }
+
+  // Drop the cached storage and big_map values of `address` and notify its listeners.
+  // Several operations to the same contract in one block trigger a single reload.
+  invalidate(address) {
+    this.storages.delete(address);
+    this.bigMapValues.delete(address);
+    if (this.pending.has(address)) {
+      return;
+    }
+    this.pending.add(address);
+    queueMicrotask(() => {
+      this.pending.delete(address);
+      (this.listeners.get(address) || []).forEach((listener) => listener());
+    });
+  }
+
+  subscribe(address, listener) {
+    if (!this.listeners.has(address)) {
+      this.listeners.set(address, new Set());
+    }
+    this.listeners.get(address).add(listener);
+    return () => this.listeners.get(address).delete(listener);
+  }
+
+  close() {
+    this.subscriptions.forEach((subscription) => subscription.close());
+    this.subscriptions.clear();
+  }
+}
+
+const ContractCacheContext = createContext(null);
+
+export const ContractCacheProvider = ({ tezos, children }) => {
+  const [cache] = useState(() => new ContractCache(tezos));
+
+  useEffect(() => () => cache.close(), [cache]);
+
+  return <ContractCacheContext.Provider value={cache}>{children}</ContractCacheContext.Provider>;
+};
+
+export const useContractCache = () => useContext(ContractCacheContext);
+
+// Run `load` now and again whenever the cached state of `address` is invalidated
+export const useCachedLoad = (address, load, dependencies = []) => {
+  const cache = useContractCache();
+
+  useEffect(() => {
+    load();
+    return cache.subscribe(address, load);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [cache, address, ...dependencies]);
+};
@@ -1,20 +1,46 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
+import { useCachedLoad, useContractCache } from './ContractCache';
 
-const MultisigApproval = ({ tezos, contractAddress }) => {
+// Node errors raised when an operation exceeds the per-operation gas or size limits
+const LIMIT_ERRORS = [
+  'gas_exhausted.operation',
+  'gas_limit_too_high',
+  'storage_exhausted.operation',
+  'oversized_operation',
+  'operation_quota_exceeded',
+];
+
+const exceedsLimits = (error) => {
+  const details = JSON.stringify((error && (error.errors || error.message)) || error);
+  return LIMIT_ERRORS.some((id) => details.includes(id));
+};
+
+const MultisigApproval = ({ contractAddress, recordAddress }) => {
+  const cache = useContractCache();
   const [proposals, setProposals] = useState([]);
   const [loading, setLoading] = useState(false);
-
-  useEffect(() => {
-    fetchProposals();
-  }, []);
+  const [selected, setSelected] = useState(new Set());
+  const [statuses, setStatuses] = useState({}); // proposal ID -> sending, confirming, confirmed or failed
+  const [voting, setVoting] = useState(false);
 
   const fetchProposals = async () => {
     setLoading(true);
     try {
-      const contract = await tezos.wallet.at(contractAddress);
-      const storage = await contract.storage();
-      const proposalsData = await storage.proposals.getEntries(); // Adjust based on contract storage structure
-      setProposals(proposalsData);
+      // Proposal IDs of a record are monotonic, so only the entries between its oldest and next ID
+      // are read, one big_map key at a time
+      const [oldest, next] = await Promise.all([
+        cache.bigMapValue(contractAddress, 'oldest_proposal_ids', recordAddress),
+        cache.bigMapValue(contractAddress, 'next_proposal_ids', recordAddress),
+      ]);
+      const ids = [];
+      for (let id = Number(oldest || 0); id < Number(next || 0); id++) {
+        ids.push(id);
+      }
+      const entries = await Promise.all(
+        ids.map((id) => cache.bigMapValue(contractAddress, 'proposals', { 0: recordAddress, 1: String(id) }))
+      );
+      // Executed and cleaned up proposals are absent from the big_map
+      setProposals(ids.map((id, index) => entries[index] && { id, ...entries[index] }).filter(Boolean));
     } catch (error) {
       console.error('Failed to fetch proposals:', error);
     } finally {
@@ -22,39 +48,97 @@ const MultisigApproval = ({ tezos, contractAddress }) => {
     }
   };
 
-  const voteOnProposal = async (proposalId, approve) => {
-    setLoading(true);
+  const setStatus = (ids, status) =>
+    setStatuses((current) => ({ ...current, ...Object.fromEntries(ids.map((id) => [id, status])) }));
+
+  const toggleSelected = (id) =>
+    setSelected((current) => {
+      const next = new Set(current);
+      if (next.has(id)) {
+        next.delete(id);
+      } else {
+        next.add(id);
+      }
+      return next;
+    });
+
+  // Send the votes on `ids` as one batch operation, confirmed once. Limits are checked when the batch
+  // is estimated, before the wallet signs, so a batch over the gas or size limits is split in halves
+  // and each half sent on its own, down to single votes
+  const sendVotes = async (contract, ids) => {
+    setStatus(ids, 'sending');
     try {
-      const contract = await tezos.wallet.at(contractAddress);
-      const operation = approve
-        ? await contract.methods.approveProposal(proposalId).send()
-        : await contract.methods.rejectProposal(proposalId).send();
+      const batch = ids.reduce(
+        (pending, id) =>
+          pending.withContractCall(contract.methodsObject.vote_on_change({ record: recordAddress, proposal_id: id })),
+        cache.tezos.wallet.batch()
+      );
+      const operation = await batch.send();
+      setStatus(ids, 'confirming');
       await operation.confirmation();
-      alert('Vote submitted successfully!');
-      fetchProposals(); // Refresh the proposals list
+      setStatus(ids, 'confirmed');
     } catch (error) {
-      console.error('Failed to submit the vote:', error);
-      alert('Failed to submit the vote.');
+      if (ids.length > 1 && exceedsLimits(error)) {
+        const middle = Math.ceil(ids.length / 2);
+        await sendVotes(contract, ids.slice(0, middle));
+        await sendVotes(contract, ids.slice(middle));
+      } else {
+        console.error('Failed to submit the votes:', error);
+        setStatus(ids, 'failed');
+      }
+    }
+  };
+
+  const voteOnProposals = async (ids) => {
+    if (ids.length === 0) {
+      return;
+    }
+    setVoting(true);
+    try {
+      const contract = await cache.contract(contractAddress);
+      await sendVotes(contract, ids);
+      setSelected(new Set());
+      cache.invalidate(contractAddress); // Refresh the proposals list
+    } catch (error) {
+      console.error('Failed to load the multisig contract:', error);
+      setStatus(ids, 'failed');
     } finally {
-      setLoading(false);
+      setVoting(false);
     }
   };
 
+  // Reloaded from the shared cache whenever a new block touches the contract
+  useCachedLoad(contractAddress, fetchProposals, [recordAddress]);
+
   return (
     <div>
       <h3>Pending Proposals</h3>
       {loading ? (
         <p>Loading...</p>
       ) : (
-        <ul>
-          {proposals.map((proposal, index) => (
-            <li key={index}>
-              Proposal ID: {proposal.id}
-              <button onClick={() => voteOnProposal(proposal.id, true)}>Approve</button>
-              <button onClick={() => voteOnProposal(proposal.id, false)}>Reject</button>
-            </li>
-          ))}
-        </ul>
+        <div>
+          <ul>
+            {proposals.map((proposal) => (
+              <li key={proposal.id}>
+                <input
+                  type="checkbox"
+                  checked={selected.has(proposal.id)}
+                  onChange={() => toggleSelected(proposal.id)}
+                  disabled={voting}
+                />
+                Proposal ID: {proposal.id}
+                <button onClick={() => voteOnProposals([proposal.id])} disabled={voting}>Approve</button>
+                {statuses[proposal.id] && <span> {statuses[proposal.id]}</span>}
+              </li>
+            ))}
+          </ul>
+          <button onClick={() => setSelected(new Set(proposals.map((proposal) => proposal.id)))} disabled={voting}>
+            Select All
+          </button>
+          <button onClick={() => voteOnProposals([...selected])} disabled={voting || selected.size === 0}>
+            {voting ? 'Submitting...' : `Approve Selected (${selected.size})`}
+          </button>
+        </div>
       )}
     </div>
   );
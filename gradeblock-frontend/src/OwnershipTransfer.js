@@ -1,15 +1,18 @@
 import React, { useState } from 'react';
+import { useContractCache } from './ContractCache';
 
-const OwnershipTransfer = ({ tezos, contractAddress }) => {
+const OwnershipTransfer = ({ contractAddress }) => {
+  const cache = useContractCache();
   const [newOwnerAddress, setNewOwnerAddress] = useState('');
   const [loading, setLoading] = useState(false);
 
   const transferOwnership = async () => {
     setLoading(true);
     try {
-      const contract = await tezos.wallet.at(contractAddress);
+      const contract = await cache.contract(contractAddress);
       const operation = await contract.methods.changeOwnership(newOwnerAddress).send();
       await operation.confirmation();
+      cache.invalidate(contractAddress);
       alert('Ownership transfer initiated successfully!');
     } catch (error) {
       console.error('Failed to transfer ownership:', error);
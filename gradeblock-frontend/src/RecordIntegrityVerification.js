@@ -1,14 +1,15 @@
 import React, { useState } from 'react';
+import { useContractCache } from './ContractCache';
 
-const RecordIntegrityVerification = ({ tezos, contractAddress }) => {
+const RecordIntegrityVerification = ({ contractAddress }) => {
+  const cache = useContractCache();
   const [verificationResult, setVerificationResult] = useState(null);
   const [loading, setLoading] = useState(false);
 
   const verifyRecordIntegrity = async () => {
     setLoading(true);
     try {
-      const contract = await tezos.wallet.at(contractAddress);
-      const storage = await contract.storage();
+      const storage = await cache.storage(contractAddress);
       // Assuming 'verifyRecord' is a method in your contract for integrity check
       const result = await storage.verifyRecord(); // Adjust method and parameters as needed
       setVerificationResult(result);
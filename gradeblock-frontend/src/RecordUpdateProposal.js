@@ -1,15 +1,18 @@
 import React, { useState } from 'react';
+import { useContractCache } from './ContractCache';
 
-const RecordUpdateProposal = ({ tezos, contractAddress }) => {
+const RecordUpdateProposal = ({ contractAddress }) => {
+  const cache = useContractCache();
   const [newDetails, setNewDetails] = useState('');
   const [loading, setLoading] = useState(false);
 
   const submitProposal = async () => {
     setLoading(true);
     try {
-      const contract = await tezos.wallet.at(contractAddress);
+      const contract = await cache.contract(contractAddress);
       const operation = await contract.methods.proposeUpdate(newDetails).send();
       await operation.confirmation();
+      cache.invalidate(contractAddress);
       alert('Proposal submitted successfully!');
     } catch (error) {
       console.error('Failed to submit the proposal:', error);
@@ -0,0 +1,506 @@
+"""Index GradeBlock contracts into a local SQLite database.
+
+Usage:
+    python indexer.py --contract KIND:ADDRESS [--contract KIND:ADDRESS ...]
+                      (--node http://localhost:8732 | --fixture FIXTURE)
+                      [--database gradeblock.db] [--from-level LEVEL]
+                      [--to-level LEVEL] [--record FIXTURE]
+
+KIND is AcademicRecord, AcademicRecordWithMultisig, Multisig or BakingSwap.
+Blocks are read from a node RPC (e.g. a local sandbox) or from a fixture file
+recorded with --record, which holds the block, script and storage responses
+the indexer read, so a run can be replayed without a node.
+
+Each block is applied in one SQLite transaction together with its level, so
+an interrupted run loses nothing and the next run resumes from the level after
+the last one indexed. The first run starts at --from-level (the origination
+level of the contracts; entries written before it are not seen).
+
+Tables:
+    operations  every applied call to an indexed contract, internal ones included
+    records     one row per record contract: student, owner, hash, timestamps
+    proposals   AcademicRecord and Multisig proposals, with status pending,
+                executed or expired once removed from the big_map; a proposal
+                past its expires_at stays pending until cleanup_expired
+                removes it, so queries for open proposals also compare
+                expires_at with the current time
+    deposits    BakingSwap ledger positions, with status open or withdrawn
+
+Records are read from the contract storage once, when first seen, and then
+followed through their "record_updated" and "ownership_changed" events;
+proposals and deposits are updated from the big_map diffs in the receipts. A
+block therefore needs no storage read for known contracts, whatever the size
+of their big_maps. Example queries:
+
+    -- open proposals for records owned by an institution
+    SELECT p.* FROM proposals p JOIN records r ON r.address = p.record
+    WHERE r.owner = ? AND p.status = 'pending' AND p.expires_at > strftime('%s', 'now');
+    -- records updated this term
+    SELECT * FROM records WHERE updated_at >= strftime('%s', '2024-09-01');
+    -- deposits maturing next week
+    SELECT * FROM deposits WHERE status = 'open' AND due BETWEEN ? AND ?;
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import urllib.request
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+KINDS = ("AcademicRecord", "AcademicRecordWithMultisig", "Multisig", "BakingSwap")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS contracts (address TEXT PRIMARY KEY, kind TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS big_maps (
+    id INTEGER PRIMARY KEY, address TEXT NOT NULL, field TEXT NOT NULL, key_type TEXT NOT NULL, value_type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS operations (
+    level INTEGER NOT NULL, timestamp INTEGER NOT NULL, op_hash TEXT NOT NULL,
+    source TEXT, destination TEXT NOT NULL, entrypoint TEXT, parameters TEXT
+);
+CREATE INDEX IF NOT EXISTS operations_destination ON operations (destination, level);
+CREATE TABLE IF NOT EXISTS records (
+    address TEXT PRIMARY KEY, kind TEXT NOT NULL, student_identifier TEXT, owner TEXT, record_hash TEXT,
+    created_at INTEGER, updated_at INTEGER, updated_level INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_student ON records (student_identifier);
+CREATE INDEX IF NOT EXISTS records_owner ON records (owner);
+CREATE INDEX IF NOT EXISTS records_updated_at ON records (updated_at);
+CREATE TABLE IF NOT EXISTS proposals (
+    contract TEXT NOT NULL, record TEXT NOT NULL, proposal_id INTEGER NOT NULL, status TEXT NOT NULL,
+    vote_count INTEGER, expires_at INTEGER, updated_level INTEGER NOT NULL,
+    PRIMARY KEY (contract, record, proposal_id)
+);
+CREATE INDEX IF NOT EXISTS proposals_status ON proposals (status, record);
+CREATE INDEX IF NOT EXISTS proposals_record ON proposals (record);
+CREATE TABLE IF NOT EXISTS deposits (
+    contract TEXT NOT NULL, owner TEXT NOT NULL, deposit_id INTEGER NOT NULL, amount INTEGER, due INTEGER,
+    status TEXT NOT NULL, updated_level INTEGER NOT NULL,
+    PRIMARY KEY (contract, owner, deposit_id)
+);
+CREATE INDEX IF NOT EXISTS deposits_due ON deposits (status, due);
+CREATE INDEX IF NOT EXISTS deposits_owner ON deposits (owner);
+"""
+
+# Removing a proposal from its big_map through these entrypoints expires it;
+# any other removal is an execution.
+EXPIRING_ENTRYPOINTS = ("cleanup_expired",)
+
+# Base58Check prefixes of the 20-byte hashes in binary addresses
+ADDRESS_PREFIXES = {
+    b"\x00\x00": bytes([6, 161, 159]),  # tz1
+    b"\x00\x01": bytes([6, 161, 161]),  # tz2
+    b"\x00\x02": bytes([6, 161, 164]),  # tz3
+    b"\x01": bytes([2, 90, 121]),  # KT1
+}
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def base58check(payload):
+    payload += hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    number = int.from_bytes(payload, "big")
+    encoded = ""
+    while number:
+        number, digit = divmod(number, 58)
+        encoded = BASE58_ALPHABET[digit] + encoded
+    zeros = len(payload) - len(payload.lstrip(b"\x00"))
+    return "1" * zeros + encoded
+
+
+def decode_address(data):
+    """Return the base58 form of a 22-byte binary address."""
+    if data[0] == 0:
+        return base58check(ADDRESS_PREFIXES[data[:2]] + data[2:22])
+    return base58check(ADDRESS_PREFIXES[data[:1]] + data[1:21])
+
+
+def decode_timestamp(value):
+    """Return a Micheline timestamp (seconds or RFC 3339) as Unix seconds."""
+    if "int" in value:
+        return int(value["int"])
+    return int(datetime.fromisoformat(value["string"].replace("Z", "+00:00")).timestamp())
+
+
+class BigMap(dict):
+    """A big_map value in storage: its id and types, for reading its diffs."""
+
+
+def field_name(micheline_type):
+    for annot in micheline_type.get("annots", []):
+        if annot.startswith("%"):
+            return annot[1:]
+    return None
+
+
+def comb(args):
+    """Split an n-ary pair into its first element and the pair of the rest."""
+    if len(args) > 2:
+        return args[0], {"prim": "Pair", "args": args[1:]}
+    return args[0], args[1]
+
+
+def pair_items(micheline_type, value):
+    """Return (field name or None, value) for the leaves of a record or tuple."""
+    if isinstance(value, list):
+        value = {"prim": "Pair", "args": value}
+    type_args = micheline_type["args"]
+    if len(type_args) > 2:
+        type_args = [type_args[0], {"prim": "pair", "args": type_args[1:]}]
+    items = []
+    for arg_type, arg_value in zip(type_args, comb(value["args"])):
+        if arg_type["prim"] == "pair" and field_name(arg_type) is None:
+            items.extend(pair_items(arg_type, arg_value))
+        else:
+            items.append((field_name(arg_type), decode(arg_type, arg_value)))
+    return items
+
+
+def decode(micheline_type, value):
+    """Decode a Micheline JSON value of the given type into Python values.
+
+    Records (pairs with field annotations) become dicts, other pairs tuples,
+    maps dicts, big_maps in storage BigMap and timestamps Unix seconds. Both
+    readable and optimized forms (e.g. binary addresses) are accepted.
+    """
+    prim = micheline_type["prim"]
+    args = micheline_type.get("args", [])
+    if prim in ("nat", "int", "mutez"):
+        return int(value["int"])
+    if prim == "timestamp":
+        return decode_timestamp(value)
+    if prim in ("address", "contract"):
+        return value["string"] if "string" in value else decode_address(bytes.fromhex(value["bytes"]))
+    if prim in ("string", "key", "key_hash", "signature", "chain_id"):
+        return value.get("string", value.get("bytes"))
+    if prim == "bytes":
+        return value["bytes"]
+    if prim == "bool":
+        return value["prim"] == "True"
+    if prim == "unit":
+        return None
+    if prim == "option":
+        return None if value["prim"] == "None" else decode(args[0], value["args"][0])
+    if prim == "or":
+        side = 0 if value["prim"] == "Left" else 1
+        return (value["prim"], decode(args[side], value["args"][0]))
+    if prim in ("list", "set"):
+        return [decode(args[0], item) for item in value]
+    if prim == "map" or (prim == "big_map" and isinstance(value, list)):
+        return {decode(args[0], elt["args"][0]): decode(args[1], elt["args"][1]) for elt in value}
+    if prim == "big_map":
+        return BigMap(id=int(value["int"]), key_type=args[0], value_type=args[1])
+    if prim == "pair":
+        items = pair_items(micheline_type, value)
+        if all(name is None for name, _ in items):
+            return tuple(item for _, item in items)
+        return {name if name is not None else "_%d" % index: item for index, (name, item) in enumerate(items)}
+    # Lambdas, tickets and other values are kept as Micheline
+    return value
+
+
+class NodeSource:
+    """Blocks, scripts and storage read from a node RPC."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=60) as response:
+            return json.load(response)
+
+    def head(self):
+        return self.get("/chains/main/blocks/head/header")["level"]
+
+    def block(self, level):
+        return self.get("/chains/main/blocks/%d" % level)
+
+    def script(self, address):
+        return self.get("/chains/main/blocks/head/context/contracts/%s/script" % address)
+
+    def storage(self, address, level):
+        return self.get("/chains/main/blocks/%d/context/contracts/%s/storage" % (level, address))
+
+
+class FixtureSource:
+    """Blocks, scripts and storage from a fixture file written with --record."""
+
+    def __init__(self, path):
+        with open(path) as f:
+            fixture = json.load(f)
+        self.blocks = {block["header"]["level"]: block for block in fixture["blocks"]}
+        self.scripts = fixture["scripts"]
+        self.storages = fixture["storage"]
+
+    def head(self):
+        return max(self.blocks, default=0)
+
+    def block(self, level):
+        # Levels without a recorded block had no operation for the indexed contracts
+        return self.blocks.get(level, {"header": {"level": level, "timestamp": "1970-01-01T00:00:00Z"}, "operations": []})
+
+    def script(self, address):
+        return self.scripts[address]
+
+    def storage(self, address, level):
+        return self.storages["%s@%d" % (address, level)]
+
+
+class Recorder:
+    """Wraps a source and keeps what the indexer read, to save as a fixture.
+
+    Only blocks with operations for the indexed contracts are kept.
+    """
+
+    def __init__(self, source, addresses):
+        self.source = source
+        self.addresses = set(addresses)
+        self.fixture = {"blocks": [], "scripts": {}, "storage": {}}
+
+    def head(self):
+        return self.source.head()
+
+    def block(self, level):
+        block = self.source.block(level)
+        if any(results_of(block, self.addresses)):
+            self.fixture["blocks"].append(block)
+        return block
+
+    def script(self, address):
+        self.fixture["scripts"][address] = self.source.script(address)
+        return self.fixture["scripts"][address]
+
+    def storage(self, address, level):
+        storage = self.source.storage(address, level)
+        self.fixture["storage"]["%s@%d" % (address, level)] = storage
+        return storage
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.fixture, f)
+
+
+def results_of(block, addresses):
+    """Yield (op_hash, source, destination, parameters, result) of the applied
+    operations of a block that call or originate one of `addresses`, internal
+    operations included."""
+    for operations in block.get("operations", []):
+        for operation in operations:
+            for content in operation.get("contents", []):
+                metadata = content.get("metadata", {})
+                results = [(content, metadata.get("operation_result", {}))]
+                results += [(internal, internal.get("result", {})) for internal in metadata.get("internal_operation_results", [])]
+                for result_content, result in results:
+                    if result.get("status") != "applied":
+                        continue
+                    if result_content.get("kind") == "transaction" and result_content.get("destination") in addresses:
+                        destination = result_content["destination"]
+                    elif result_content.get("kind") == "origination":
+                        originated = [address for address in result.get("originated_contracts", []) if address in addresses]
+                        if not originated:
+                            continue
+                        destination = originated[0]
+                    else:
+                        continue
+                    yield operation["hash"], result_content.get("source"), destination, result_content.get("parameters"), result
+
+
+def events_of(block, addresses):
+    """Yield (source, tag, type, payload) of the applied events emitted by `addresses`."""
+    for operations in block.get("operations", []):
+        for operation in operations:
+            for content in operation.get("contents", []):
+                for internal in content.get("metadata", {}).get("internal_operation_results", []):
+                    if internal.get("kind") != "event" or internal.get("source") not in addresses:
+                        continue
+                    if internal.get("result", {}).get("status") == "applied":
+                        yield internal["source"], internal.get("tag"), internal["type"], internal["payload"]
+
+
+class Indexer:
+    def __init__(self, database, source, contracts):
+        self.db = sqlite3.connect(database)
+        self.db.executescript(SCHEMA)
+        self.source = source
+        self.contracts = contracts
+        self.storage_types = {}
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO contracts (address, kind) VALUES (?, ?)", contracts.items())
+
+    def last_level(self):
+        row = self.db.execute("SELECT value FROM state WHERE name = 'last_level'").fetchone()
+        return row[0] if row else None
+
+    def storage_type(self, address):
+        if address not in self.storage_types:
+            code = self.source.script(address)["code"]
+            self.storage_types[address] = next(section["args"][0] for section in code if section["prim"] == "storage")
+        return self.storage_types[address]
+
+    def has_big_maps(self, address):
+        return self.db.execute("SELECT 1 FROM big_maps WHERE address = ?", (address,)).fetchone() is not None
+
+    def read_storage(self, address, level):
+        """Decode the storage of a contract and remember the ids of its big_maps."""
+        storage = decode(self.storage_type(address), self.source.storage(address, level))
+        for field, value in (storage.items() if isinstance(storage, dict) else []):
+            if isinstance(value, BigMap):
+                self.db.execute(
+                    "INSERT OR REPLACE INTO big_maps (id, address, field, key_type, value_type) VALUES (?, ?, ?, ?, ?)",
+                    (value["id"], address, field, json.dumps(value["key_type"]), json.dumps(value["value_type"])),
+                )
+        return storage
+
+    def run(self, from_level, to_level=None):
+        """Index every block after the last indexed level (or from `from_level`) up to `to_level` or the head."""
+        last = self.last_level()
+        start = from_level if last is None else last + 1
+        end = self.source.head() if to_level is None else to_level
+        for level in range(start, end + 1):
+            with self.db:
+                self.index_block(self.source.block(level))
+                self.db.execute("INSERT OR REPLACE INTO state (name, value) VALUES ('last_level', ?)", (level,))
+        return max(end - start + 1, 0)
+
+    def index_block(self, block):
+        level = block["header"]["level"]
+        timestamp = decode_timestamp({"string": block["header"]["timestamp"]})
+        touched = set()
+        for op_hash, source, destination, parameters, result in results_of(block, self.contracts):
+            entrypoint = parameters.get("entrypoint") if parameters else None
+            self.db.execute(
+                "INSERT INTO operations (level, timestamp, op_hash, source, destination, entrypoint, parameters) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (level, timestamp, op_hash, source, destination, entrypoint, json.dumps(parameters["value"]) if parameters else None),
+            )
+            if destination not in touched:
+                touched.add(destination)
+                # Storage is only read the first time a contract is seen: for the big_map ids,
+                # needed before its diffs, and for the initial record row
+                if self.is_record(destination):
+                    if not self.has_record(destination):
+                        self.update_record(destination, self.read_storage(destination, level), level)
+                elif not self.has_big_maps(destination):
+                    self.read_storage(destination, level)
+            for diff in result.get("lazy_storage_diff", []):
+                if diff["kind"] == "big_map":
+                    self.apply_big_map_diff(int(diff["id"]), diff["diff"], entrypoint, level)
+        for source, tag, event_type, payload in events_of(block, self.contracts):
+            if self.is_record(source):
+                self.apply_record_event(source, tag, decode(event_type, payload), timestamp, level)
+
+    def is_record(self, address):
+        return self.contracts[address] in ("AcademicRecord", "AcademicRecordWithMultisig")
+
+    def has_record(self, address):
+        return self.db.execute("SELECT 1 FROM records WHERE address = ?", (address,)).fetchone() is not None
+
+    def apply_record_event(self, address, tag, payload, timestamp, level):
+        """Update a record row from one of its events."""
+        if tag == "record_updated":
+            self.db.execute(
+                "UPDATE records SET record_hash = ?, updated_at = ?, updated_level = ? WHERE address = ?",
+                (payload["record_hash"], timestamp, level, address),
+            )
+        elif tag == "ownership_changed":
+            # Changing the owner also restarts the record's creation timestamp
+            self.db.execute(
+                "UPDATE records SET owner = ?, created_at = ?, updated_at = ?, updated_level = ? WHERE address = ?",
+                (payload["owner"], timestamp, timestamp, level, address),
+            )
+
+    def update_record(self, address, storage, level):
+        self.db.execute(
+            "INSERT OR REPLACE INTO records (address, kind, student_identifier, owner, record_hash, created_at, updated_at, updated_level) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                address,
+                self.contracts[address],
+                storage.get("student_identifier"),
+                storage.get("owner"),
+                storage.get("record_hash"),
+                storage.get("creation_timestamp"),
+                storage.get("last_updated_timestamp"),
+                level,
+            ),
+        )
+
+    def apply_big_map_diff(self, big_map_id, diff, entrypoint, level):
+        row = self.db.execute("SELECT address, field, key_type, value_type FROM big_maps WHERE id = ?", (big_map_id,)).fetchone()
+        if row is None:
+            # Temporary big_maps and big_maps of other contracts
+            return
+        address, field, key_type, value_type = row
+        key_type, value_type = json.loads(key_type), json.loads(value_type)
+        for update in diff.get("updates", []):
+            key = decode(key_type, update["key"])
+            value = decode(value_type, update["value"]) if update.get("value") is not None else None
+            self.apply_entry(self.contracts[address], address, field, key, value, entrypoint, level)
+
+    def apply_entry(self, kind, address, field, key, value, entrypoint, level):
+        """Write one big_map entry (None when removed) to its table."""
+        if field == "proposals" and kind in ("AcademicRecord", "Multisig"):
+            record, proposal_id = (address, key) if kind == "AcademicRecord" else key
+            if value is None:
+                status = "expired" if entrypoint in EXPIRING_ENTRYPOINTS else "executed"
+                self.db.execute(
+                    "UPDATE proposals SET status = ?, updated_level = ? WHERE contract = ? AND record = ? AND proposal_id = ?",
+                    (status, level, address, record, proposal_id),
+                )
+                return
+            vote_count = len(value["approvals"]) if kind == "AcademicRecord" else value["vote_count"]
+            self.db.execute(
+                "INSERT OR REPLACE INTO proposals (contract, record, proposal_id, status, vote_count, expires_at, updated_level) VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                (address, record, proposal_id, vote_count, value["expires_at"], level),
+            )
+        elif field == "ledger" and kind == "BakingSwap":
+            owner, deposit_id = key
+            if value is None:
+                self.db.execute(
+                    "UPDATE deposits SET status = 'withdrawn', updated_level = ? WHERE contract = ? AND owner = ? AND deposit_id = ?",
+                    (level, address, owner, deposit_id),
+                )
+                return
+            self.db.execute(
+                "INSERT OR REPLACE INTO deposits (contract, owner, deposit_id, amount, due, status, updated_level) VALUES (?, ?, ?, ?, ?, 'open', ?)",
+                (address, owner, deposit_id, value["amount"], value["due"], level),
+            )
+
+
+def parse_contract(value):
+    kind, _, address = value.partition(":")
+    if kind not in KINDS or not address:
+        raise argparse.ArgumentTypeError("expected KIND:ADDRESS with KIND in %s" % ", ".join(KINDS))
+    return address, kind
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contract", type=parse_contract, action="append", required=True, metavar="KIND:ADDRESS")
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--node", help="node RPC URL, e.g. http://localhost:8732")
+    source_group.add_argument("--fixture", help="fixture file recorded with --record")
+    parser.add_argument("--database", default=os.path.join(HERE, "gradeblock.db"))
+    parser.add_argument("--from-level", type=int, default=1, help="first level of the first run")
+    parser.add_argument("--to-level", type=int, help="last level to index (default: head)")
+    parser.add_argument("--record", metavar="FIXTURE", help="save the blocks, scripts and storage read to a fixture")
+    args = parser.parse_args(argv)
+
+    contracts = dict(args.contract)
+    source = NodeSource(args.node) if args.node else FixtureSource(args.fixture)
+    if args.record:
+        source = Recorder(source, contracts)
+    indexer = Indexer(args.database, source, contracts)
+    count = indexer.run(args.from_level, args.to_level)
+    if args.record:
+        source.save(args.record)
+    print("Indexed %d blocks, last level %s" % (count, indexer.last_level()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,697 @@
+"""Randomized load and fuzz scenarios for the GradeBlock contracts.
+
+Usage:
+    python loadgen.py [--seed 0] [--shards 4] [--length 200] [--workers N]
+                      [--contracts AcademicRecord,Multisig,...] [--only SHARD]
+                      [--output loadgen_output.json] [--octez-client octez-client]
+                      [--no-gas] [--smoke]
+
+A shard is a random sequence of calls against one contract (for
+AcademicRecordWithMultisig, a record and the Multisig that governs it). It is
+drawn from a random.Random seeded with "<seed>:<contract>:<shard>", so
+rerunning with the same seed and length reproduces it exactly; --only reruns a
+single shard. Calls are both valid and invalid: the simulator.py model of each
+contract predicts the outcome of every call and the SmartPy scenario checks it
+with `valid=`; at the end of the shard, the storage of each contract is
+compared with its model. A shard where the contract disagrees with its model
+fails and is reported with its id.
+
+Shards are spread over a process pool. Each worker compiles its shard in its
+own SmartPy process and, unless --no-gas is given, replays the calls that
+succeeded in its own octez-client mockup, reading consumed gas from each
+receipt as benchmark.py does. The report gives p50/p95/max gas per entrypoint
+and the shard and call that reached the maximum.
+
+The mockup runs at its own clock, so time-dependent calls are measured at
+mockup time and settle_bucket, whose buckets are keyed by day, is not
+replayed. AcademicRecordWithMultisig is fuzzed but not measured: its calls go
+through a second contract whose address is fixed when the scenario compiles.
+
+The scenarios use the `.run(sender=..., valid=...)` test API of the SmartPy
+release the contracts are written for; current smartpy-tezos releases (0.24)
+no longer provide it. --smoke needs neither SmartPy nor octez-client: it
+generates one short shard per contract and runs it on the simulator.py models
+only, which checks that the generators and models still agree on the
+entrypoints and parameters they share. It cannot catch a contract that no
+longer compiles.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import benchmark
+import simulator
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CONTRACT_FILES = dict(benchmark.CONTRACT_FILES, AcademicRecordWithMultisig="academic_record_multisig.py")
+
+# Contract scripts each generator needs, in origination order.
+CONTRACT_MODULES = {
+    "AcademicRecord": ("AcademicRecord",),
+    "Multisig": ("Multisig",),
+    "AcademicRecordWithMultisig": ("Multisig", "AcademicRecordWithMultisig"),
+    "BakingSwap": ("BakingSwap",),
+}
+
+# Contracts whose shards are replayed in the mockup, and entrypoints left out
+# of the replay (see the module docstring).
+REPLAYED = ("AcademicRecord", "Multisig", "BakingSwap")
+NOT_REPLAYED = ("settle_bucket",)
+
+# Scenario senders; the mockup bootstrap accounts, so compiled calls replay as is.
+SENDERS = sorted(benchmark.BOOTSTRAP)
+# Signatories of the generated AcademicRecord; the other senders' approvals are rejected
+RECORD_SIGNATORIES = ("bootstrap2", "bootstrap3", "bootstrap4")
+
+# Calls in the single shard per contract of --smoke
+SMOKE_LENGTH = 50
+
+DAY = 24 * 3600
+PROPOSAL_LIFETIME = 7 * DAY
+
+# A generated call. `target` names the contract it is sent to, `params` is a
+# dict of keyword arguments or a single positional argument, `now` is the
+# scenario time in seconds and `valid` is the outcome predicted by the model.
+Op = namedtuple("Op", "target entrypoint params sender amount now valid")
+
+
+def shard_id(contract, shard):
+    return "%s.shard_%d" % (contract, shard)
+
+
+def parse_shard_id(name):
+    contract, _, shard = name.partition(".shard_")
+    if contract not in CONTRACT_MODULES or not shard.isdigit():
+        raise ValueError("Invalid shard id: %r" % (name,))
+    return contract, int(shard)
+
+
+def shard_rng(seed, contract, shard):
+    return random.Random("%s:%s:%d" % (seed, contract, shard))
+
+
+def tick(rng, now):
+    """Advance the scenario clock; long jumps let proposals expire and deposits mature."""
+    return now + rng.choice((0, 1, 60, 60, 3600, 3600, 3600, 3600, DAY, DAY, 3 * DAY))
+
+
+def pick_proposal(rng, proposals, next_id, now):
+    """Mostly an open proposal; otherwise any ID up to one that does not exist yet."""
+    open_ids = sorted(i for i, proposal in proposals.items() if now < proposal.expires_at)
+    if open_ids and rng.random() < 0.8:
+        return rng.choice(open_ids)
+    return rng.randrange(next_id + 1)
+
+
+def weighted(rng, weights):
+    names = sorted(weights)
+    return rng.choices(names, [weights[name] for name in names])[0]
+
+
+def random_courses(rng):
+    """A random transcript as {code: (grade, term)}; see record_schema.py."""
+    return {100 + rng.randrange(20): (rng.randrange(17), rng.choice((20241, 20243, 20251))) for _ in range(rng.randint(1, 5))}
+
+
+def transcript(sp, courses):
+    if sp is None:
+        return courses
+    return {code: sp.record(grade=grade, term=term) for code, (grade, term) in courses.items()}
+
+
+# Generators ----------------------------------------------------------------
+#
+# `generate(sp, modules, rng, length, accounts, scenario)` originates the
+# contracts of a shard in `scenario` and returns them by target name, the
+# simulator.py models of them by the same names, and `length` ops. Every op is
+# run on its model as it is generated, which predicts its validity, and the
+# choice of the next op reads the model's storage. In smoke mode `sp`,
+# `modules` and `scenario` are None: nothing is originated, contracts are
+# None and the ops only run on the models.
+
+
+def originate(scenario, make):
+    """Originate the contract built by `make` in `scenario`; None in smoke mode."""
+    if scenario is None:
+        return None
+    contract = make()
+    scenario += contract
+    return contract
+
+
+def pack(sp, value):
+    return value if sp is None else sp.pack(value)
+
+
+def model_op(models, target, entrypoint, model_params, params, sender, now, amount=0):
+    """Run a call on its model and return it as an Op with the predicted outcome."""
+    valid = simulator.succeeds(models[target], entrypoint, model_params, sender, now, amount)
+    return Op(target, entrypoint, params, sender, amount, now, valid)
+
+
+def academic_record_ops(sp, modules, rng, length, accounts, scenario):
+    details = random_courses(rng)
+    contract = originate(scenario, lambda: modules["AcademicRecord"].main.AcademicRecord(
+        student_identifier="123456", record_details=transcript(sp, details),
+        owner_address=accounts["bootstrap1"], required_approvals=2,
+        signatories=sp.set([accounts[alias] for alias in RECORD_SIGNATORIES]),
+    ))
+    model = simulator.AcademicRecord("123456", details, "bootstrap1", required_approvals=2, signatories=RECORD_SIGNATORIES)
+    models = {"contract": model}
+    now = 0
+    weights = {
+        "propose_update": 3, "propose_ownership_change": 1, "approve_update": 5, "execute_update": 2,
+        "update_record": 1, "change_ownership": 1, "cleanup_expired": 1,
+    }
+    ops = []
+    for _ in range(length):
+        now = tick(rng, now)
+        sender = rng.choice(SENDERS)
+        entrypoint = weighted(rng, weights)
+        proposal_id = pick_proposal(rng, model.proposals, model.next_proposal_id, now)
+        proposal = model.proposals.get(proposal_id)
+        if entrypoint == "propose_update":
+            courses = random_courses(rng)
+            op = model_op(models, "contract", entrypoint, dict(proposal_details=courses), dict(proposal_details=transcript(sp, courses)), sender, now)
+        elif entrypoint in ("approve_update", "execute_update"):
+            op = model_op(models, "contract", entrypoint, dict(proposal_id=proposal_id), dict(proposal_id=proposal_id), sender, now)
+        elif entrypoint == "propose_ownership_change":
+            new_owner = rng.choice(SENDERS)
+            op = model_op(models, "contract", entrypoint, new_owner, accounts[new_owner], sender, now)
+        elif entrypoint == "update_record":
+            # Mostly the proposed transcript; resending the current one fails with "No changes detected."
+            courses = rng.choice((model.record_details, random_courses(rng)) + ((proposal.proposed_changes,) * 2 if proposal else ()))
+            op = model_op(
+                models, "contract", entrypoint, dict(new_details=courses, proposal_id=proposal_id),
+                dict(new_details=transcript(sp, courses), proposal_id=proposal_id), sender, now,
+            )
+        elif entrypoint == "change_ownership":
+            # Mostly the proposed owner
+            proposed_owner = proposal.proposed_owner if proposal and proposal.proposed_owner else None
+            new_owner = proposed_owner if proposed_owner and rng.random() < 0.8 else rng.choice(SENDERS)
+            op = model_op(
+                models, "contract", entrypoint, dict(new_owner_address=new_owner, proposal_id=proposal_id),
+                dict(new_owner_address=accounts[new_owner], proposal_id=proposal_id), sender, now,
+            )
+        else:
+            params = dict(limit=rng.randint(1, 10))
+            op = model_op(models, "contract", entrypoint, params, params, sender, now)
+        ops.append(op)
+    return {"contract": contract}, models, ops
+
+
+def multisig_ops(sp, modules, rng, length, accounts, scenario):
+    signatories = ("bootstrap1", "bootstrap2", "bootstrap3")
+    contract = originate(scenario, lambda: modules["Multisig"].main.Multisig(signatories=[accounts[name] for name in signatories], threshold=2))
+    model = simulator.Multisig(signatories, threshold=2)
+    models = {"contract": model}
+    # Proposals are keyed by record address; the record may propose for itself
+    record = "bootstrap5"
+    now = 0
+    weights = {
+        "propose_change": 3, "vote_on_change": 6, "cleanup_expired": 1, "add_signatory": 1,
+        "remove_signatory": 1, "change_threshold": 1, "change_proposal_lifetime": 1,
+    }
+    ops = []
+    for _ in range(length):
+        now = tick(rng, now)
+        sender = rng.choice(SENDERS)
+        entrypoint = weighted(rng, weights)
+        if entrypoint == "propose_change":
+            details = "Change %d" % rng.randrange(1000)
+            op = model_op(
+                models, "contract", entrypoint, dict(record=record, proposal_details=details),
+                dict(record=accounts[record], proposal_details=pack(sp, details)), sender, now,
+            )
+        elif entrypoint == "vote_on_change":
+            proposal_id = pick_proposal(rng, model.proposals.get(record, {}), model.next_proposal_ids.get(record, 0), now)
+            op = model_op(
+                models, "contract", entrypoint, dict(record=record, proposal_id=proposal_id),
+                dict(record=accounts[record], proposal_id=proposal_id), sender, now,
+            )
+        elif entrypoint == "cleanup_expired":
+            limit = rng.randint(1, 10)
+            op = model_op(models, "contract", entrypoint, dict(record=record, limit=limit), dict(record=accounts[record], limit=limit), sender, now)
+        elif entrypoint in ("add_signatory", "remove_signatory"):
+            signatory = rng.choice(SENDERS)
+            op = model_op(models, "contract", entrypoint, dict(signatory=signatory), dict(signatory=accounts[signatory]), sender, now)
+        elif entrypoint == "change_threshold":
+            params = dict(new_threshold=rng.randint(0, len(SENDERS)))
+            op = model_op(models, "contract", entrypoint, params, params, sender, now)
+        else:
+            params = dict(new_lifetime=rng.choice((0, 3600, DAY, PROPOSAL_LIFETIME)))
+            op = model_op(models, "contract", entrypoint, params, params, sender, now)
+        ops.append(op)
+    return {"contract": contract}, models, ops
+
+
+def academic_record_multisig_ops(sp, modules, rng, length, accounts, scenario):
+    signatories = ("bootstrap1", "bootstrap2", "bootstrap3")
+    multisig = originate(scenario, lambda: modules["Multisig"].main.Multisig(signatories=[accounts[name] for name in signatories], threshold=2))
+    details = random_courses(rng)
+    record = originate(scenario, lambda: modules["AcademicRecordWithMultisig"].main.AcademicRecordWithMultisig(
+        student_identifier="123456", record_details=transcript(sp, details),
+        owner_address=accounts["bootstrap1"], multisig_address=multisig.address,
+    ))
+    # The record's address is only known to the scenario; the model names it "record"
+    record_address = "record" if record is None else record.address
+    multisig_model = simulator.Multisig(signatories, threshold=2)
+    record_model = simulator.AcademicRecordWithMultisig("record", "123456", details, "bootstrap1", multisig_model)
+    models = {"multisig": multisig_model, "record": record_model}
+    now = 0
+    weights = {"propose_update_record": 3, "vote_on_change": 5, "execute_approved_update": 2}
+    ops = []
+    for _ in range(length):
+        now = tick(rng, now)
+        sender = rng.choice(SENDERS)
+        entrypoint = weighted(rng, weights)
+        proposal_id = pick_proposal(rng, multisig_model.proposals.get("record", {}), multisig_model.next_proposal_ids.get("record", 0), now)
+        if entrypoint == "propose_update_record":
+            courses = random_courses(rng)
+            op = model_op(models, "record", entrypoint, dict(proposal_details=courses), dict(proposal_details=transcript(sp, courses)), sender, now)
+        elif entrypoint == "vote_on_change":
+            op = model_op(
+                models, "multisig", entrypoint, dict(record="record", proposal_id=proposal_id),
+                dict(record=record_address, proposal_id=proposal_id), sender, now,
+            )
+        else:
+            op = model_op(models, "record", entrypoint, dict(proposal_id=proposal_id), dict(proposal_id=proposal_id), sender, now)
+        ops.append(op)
+    return {"multisig": multisig, "record": record}, models, ops
+
+
+def baking_swap_ops(sp, modules, rng, length, accounts, scenario):
+    admin = "bootstrap1"
+    contract = originate(scenario, lambda: modules["BakingSwap"].main.BakingSwap(accounts[admin], 700, 1))
+    model = simulator.BakingSwap(admin, 700, 1)
+    models = {"contract": model}
+    ops = [model_op(models, "contract", "collateralize", None, {}, admin, 0, 1000 * 10**6)]
+    now = 0
+    weights = {
+        "deposit": 5, "withdraw": 3, "withdraw_all_matured": 2, "settle_bucket": 1,
+        "set_offer": 1, "collateralize": 1,
+    }
+    for _ in range(length - 1):
+        now = tick(rng, now)
+        sender = rng.choice(SENDERS)
+        entrypoint = weighted(rng, weights)
+        # A few calls send tez to entrypoints that refuse them
+        amount = 1 if rng.random() < 0.05 else 0
+        rate, duration = model.rate, model.duration
+        if entrypoint == "deposit":
+            amount = rng.randint(1, 50) * 10**6
+            params = dict(
+                rate=rng.choice((rate, rate, rate + 100, max(rate - 100, 0))),
+                duration=rng.choice((duration, duration, duration + 1, max(duration - 1, 0))),
+            )
+            op = model_op(models, "contract", entrypoint, params, params, sender, now, amount)
+        elif entrypoint == "withdraw":
+            deposit_id = rng.choice(sorted(model.deposits.get(sender, ())) + [rng.randrange(model.next_deposit_id + 1)])
+            op = model_op(
+                models, "contract", entrypoint, dict(deposit_id=deposit_id, receiver=sender),
+                dict(deposit_id=deposit_id, receiver=accounts[sender]), sender, now, amount,
+            )
+        elif entrypoint == "withdraw_all_matured":
+            op = model_op(models, "contract", entrypoint, sender, accounts[sender], sender, now, amount)
+        elif entrypoint == "settle_bucket":
+            params = dict(day=rng.choice(sorted(model.buckets) + [now // DAY]), limit=rng.randint(1, 5))
+            op = model_op(models, "contract", entrypoint, params, params, sender, now, amount)
+        elif entrypoint == "set_offer":
+            params = dict(rate=rng.choice((0, 500, 700, 1000)), duration=rng.choice((0, 1, 2, 7)))
+            op = model_op(models, "contract", entrypoint, params, params, sender, now, amount)
+        else:
+            op = model_op(models, "contract", entrypoint, None, {}, sender, now, rng.randint(10, 100) * 10**6)
+        ops.append(op)
+    return {"contract": contract}, models, ops
+
+
+GENERATORS = {
+    "AcademicRecord": academic_record_ops,
+    "Multisig": multisig_ops,
+    "AcademicRecordWithMultisig": academic_record_multisig_ops,
+    "BakingSwap": baking_swap_ops,
+}
+
+
+# Differential checks -------------------------------------------------------
+#
+# `verify(sp, scenario, data, model, addresses)` checks that the storage of a
+# contract equals its model once the shard has run. Big maps are compared key
+# by key over every key the shard may have written. Multisig proposal details
+# are not compared: the contract keeps them packed and the models do not.
+
+
+def verify_academic_record(sp, scenario, data, model, addresses):
+    scenario.verify(data.record_details == transcript(sp, model.record_details))
+    scenario.verify(data.record_hash == sp.bytes("0x" + model.record_hash.hex()))
+    scenario.verify(data.owner == addresses[model.owner])
+    scenario.verify(data.next_proposal_id == model.next_proposal_id)
+    scenario.verify(data.oldest_proposal_id == model.oldest_proposal_id)
+    for proposal_id in range(model.next_proposal_id):
+        proposal = model.proposals.get(proposal_id)
+        if proposal is None:
+            scenario.verify(~data.proposals.contains(proposal_id))
+            continue
+        scenario.verify(sp.len(data.proposals[proposal_id].approvals) == len(proposal.approvals))
+        for approver in sorted(proposal.approvals):
+            scenario.verify(data.proposals[proposal_id].approvals.contains(addresses[approver]))
+        scenario.verify(data.proposals[proposal_id].proposed_changes == transcript(sp, proposal.proposed_changes))
+        if proposal.proposed_owner is None:
+            scenario.verify(data.proposals[proposal_id].proposed_owner.is_none())
+        else:
+            scenario.verify(data.proposals[proposal_id].proposed_owner == sp.some(addresses[proposal.proposed_owner]))
+        scenario.verify(data.proposals[proposal_id].expires_at == sp.timestamp(proposal.expires_at))
+
+
+def verify_multisig(sp, scenario, data, model, addresses):
+    scenario.verify(data.threshold == model.threshold)
+    scenario.verify(data.signatory_count == model.signatory_count)
+    scenario.verify(data.next_signatory_index == model.next_signatory_index)
+    scenario.verify(data.signatory_mask == model.signatory_mask)
+    scenario.verify(data.proposal_lifetime == model.proposal_lifetime)
+    scenario.verify(data.nonce == model.nonce)
+    for alias in SENDERS:
+        if alias in model.signatory_indexes:
+            scenario.verify(data.signatory_indexes[addresses[alias]] == model.signatory_indexes[alias])
+        else:
+            scenario.verify(~data.signatory_indexes.contains(addresses[alias]))
+    for record, next_id in sorted(model.next_proposal_ids.items()):
+        address = addresses[record]
+        scenario.verify(data.next_proposal_ids[address] == next_id)
+        if record in model.oldest_proposal_ids:
+            scenario.verify(data.oldest_proposal_ids[address] == model.oldest_proposal_ids[record])
+        else:
+            scenario.verify(~data.oldest_proposal_ids.contains(address))
+        if record in model.cleanup_cursors:
+            scenario.verify(data.cleanup_cursors[address] == model.cleanup_cursors[record])
+        else:
+            scenario.verify(~data.cleanup_cursors.contains(address))
+        for proposal_id in range(next_id):
+            proposal = model.proposal(record, proposal_id)
+            key = (address, proposal_id)
+            if proposal is None:
+                scenario.verify(~data.proposals.contains(key))
+                continue
+            scenario.verify(data.proposals[key].votes == proposal.votes)
+            scenario.verify(data.proposals[key].vote_count == proposal.vote_count)
+            scenario.verify(data.proposals[key].expires_at == sp.timestamp(proposal.expires_at))
+
+
+def verify_academic_record_multisig(sp, scenario, data, model, addresses):
+    # The proposals are checked with the Multisig's own storage
+    scenario.verify(data.record_details == transcript(sp, model.record_details))
+    scenario.verify(data.record_hash == sp.bytes("0x" + model.record_hash.hex()))
+    scenario.verify(data.owner == addresses[model.owner])
+
+
+def verify_baking_swap(sp, scenario, data, model, addresses):
+    scenario.verify(data.collateral == sp.mutez(model.collateral))
+    scenario.verify(data.rate == model.rate)
+    scenario.verify(data.duration == model.duration)
+    scenario.verify(data.next_deposit_id == model.next_deposit_id)
+    for alias in SENDERS:
+        address = addresses[alias]
+        open_ids = model.deposits.get(alias)
+        if open_ids is None:
+            scenario.verify(~data.deposits.contains(address))
+        else:
+            scenario.verify(sp.len(data.deposits[address]) == len(open_ids))
+            for deposit_id in sorted(open_ids):
+                scenario.verify(data.deposits[address].contains(deposit_id))
+        for deposit_id in range(model.next_deposit_id):
+            entry = model.ledger.get((alias, deposit_id))
+            if entry is None:
+                scenario.verify(~data.ledger.contains((address, deposit_id)))
+                continue
+            scenario.verify(data.ledger[(address, deposit_id)].amount == sp.mutez(entry[0]))
+            scenario.verify(data.ledger[(address, deposit_id)].due == sp.timestamp(entry[1]))
+    # Deposits mature at most 7 days (the longest offer) after the last call
+    for day in range(model.now // DAY + 8):
+        if day not in model.buckets:
+            scenario.verify(~data.buckets.contains(day))
+            scenario.verify(~data.settlement_queue.contains((day, 0)))
+            continue
+        size, cursor = model.buckets[day]
+        scenario.verify(data.buckets[day].size == size)
+        scenario.verify(data.buckets[day].cursor == cursor)
+        for position in range(size):
+            if position < cursor:
+                scenario.verify(~data.settlement_queue.contains((day, position)))
+                continue
+            depositor, deposit_id = model.settlement_queue[(day, position)]
+            scenario.verify(sp.fst(data.settlement_queue[(day, position)]) == addresses[depositor])
+            scenario.verify(sp.snd(data.settlement_queue[(day, position)]) == deposit_id)
+
+
+VERIFIERS = {
+    simulator.AcademicRecord: verify_academic_record,
+    simulator.Multisig: verify_multisig,
+    simulator.AcademicRecordWithMultisig: verify_academic_record_multisig,
+    simulator.BakingSwap: verify_baking_swap,
+}
+
+
+def verify_storage(sp, scenario, contracts, models, accounts):
+    """Check the storage of every contract of a shard against its model."""
+    # Models name the shard's contracts by target, e.g. "record"
+    addresses = dict(accounts, **{target: contract.address for target, contract in contracts.items()})
+    for target, model in sorted(models.items()):
+        VERIFIERS[type(model)](sp, scenario, contracts[target].data, model, addresses)
+
+
+# Compilation ---------------------------------------------------------------
+
+
+def run_op(sp, contracts, accounts, op, valid):
+    entrypoint = getattr(contracts[op.target], op.entrypoint)
+    invocation = entrypoint(**op.params) if isinstance(op.params, dict) else entrypoint(op.params)
+    invocation.run(sender=accounts[op.sender], amount=sp.mutez(op.amount), now=sp.timestamp(op.now), valid=valid)
+
+
+def replayed(contract, ops):
+    """Indexes of the ops replayed in the mockup: the valid ones, minus NOT_REPLAYED."""
+    if contract not in REPLAYED:
+        return []
+    return [index for index, op in enumerate(ops) if op.valid and op.entrypoint not in NOT_REPLAYED]
+
+
+def register_tests(name, seed, length, build_dir):
+    """Register the SmartPy tests of one shard; SmartPy compiles them on exit.
+
+    `<shard>` runs every op, checks its predicted outcome and then checks the
+    final storage of each contract against its model. `<shard>.replay`
+    runs only the replayed ops, so that its compiled parameters line up one to
+    one with the calls made in the mockup. Dropping the other ops keeps the
+    replayed ones valid: the invalid ones change nothing and the ops left out
+    of the replay only ever remove deposits. The schedule of the replay is
+    written next to the compiled output.
+    """
+    import smartpy as sp
+
+    contract, shard = parse_shard_id(name)
+    modules = {c: benchmark.load_contract_module(CONTRACT_FILES[c]) for c in CONTRACT_MODULES[contract]}
+    accounts = {alias: sp.address(address) for alias, address in benchmark.BOOTSTRAP.items()}
+
+    def generate(scenario):
+        # A fresh generator for each test, so both tests see the same ops
+        rng = shard_rng(seed, contract, shard)
+        return GENERATORS[contract](sp, modules, rng, length, accounts, scenario)
+
+    def checked():
+        scenario = sp.test_scenario([modules[c].main for c in CONTRACT_MODULES[contract]])
+        contracts, models, ops = generate(scenario)
+        for op in ops:
+            run_op(sp, contracts, accounts, op, op.valid)
+        verify_storage(sp, scenario, contracts, models, accounts)
+        schedule = {
+            "calls": len(ops),
+            "invalid": sum(not op.valid for op in ops),
+            "replay": [
+                {"index": index, "entrypoint": ops[index].entrypoint, "sender": ops[index].sender, "amount": ops[index].amount}
+                for index in replayed(contract, ops)
+            ],
+        }
+        with open(os.path.join(build_dir, name + ".schedule.json"), "w") as f:
+            json.dump(schedule, f)
+
+    def replay():
+        scenario = sp.test_scenario([modules[c].main for c in CONTRACT_MODULES[contract]])
+        contracts, _, ops = generate(scenario)
+        for index in replayed(contract, ops):
+            run_op(sp, contracts, accounts, ops[index], True)
+
+    sp.add_test(name=name)(checked)
+    if contract in REPLAYED:
+        sp.add_test(name=name + ".replay")(replay)
+
+
+# Execution -----------------------------------------------------------------
+
+
+def replay_shard(mockup, build_dir, name, steps):
+    """Replay the compiled calls of a shard; returns gas samples per entrypoint.
+
+    Samples are [gas, op index]. Calls the mockup rejects (its clock differs
+    from the scenario's) are counted and skipped.
+    """
+    contract, storage, params = benchmark.case_artifacts(build_dir, name)
+    if len(params) != len(steps):
+        raise RuntimeError("%s: expected %d compiled calls, found %d" % (name, len(steps), len(params)))
+    alias = "load_" + name.replace(".", "_")
+    mockup.originate(alias, contract, storage)
+    gas, rejected = {}, 0
+    for step, param_file in zip(steps, params):
+        try:
+            output = mockup.call(alias, step, param_file)
+        except RuntimeError:
+            rejected += 1
+            continue
+        gas.setdefault(step["entrypoint"], []).append([benchmark.parse_receipt(output)["gas"], step["index"]])
+    return gas, rejected
+
+
+def run_shard(job):
+    """Compile, check and (optionally) measure one shard in a scratch directory."""
+    name, seed, length, client, measure = job
+    contract, _ = parse_shard_id(name)
+    work_dir = tempfile.mkdtemp(prefix="gradeblock-loadgen-")
+    try:
+        build_dir = os.path.join(work_dir, "build")
+        os.makedirs(build_dir)
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--compile", build_dir, "--only", name,
+             "--seed", str(seed), "--length", str(length)],
+            cwd=build_dir, capture_output=True, text=True,
+        )
+        # The schedule is only written once every op ran with its predicted outcome
+        schedule_file = os.path.join(build_dir, name + ".schedule.json")
+        if not os.path.exists(schedule_file):
+            return {"shard": name, "error": (result.stdout + result.stderr)[-4000:]}
+        with open(schedule_file) as f:
+            schedule = json.load(f)
+        report = {"shard": name, "error": None, "calls": schedule["calls"], "invalid": schedule["invalid"],
+                  "mockup_rejected": 0, "gas": {}}
+        if measure and contract in REPLAYED:
+            mockup = benchmark.Mockup(client, os.path.join(work_dir, "mockup"))
+            mockup.create(0)
+            report["gas"], report["mockup_rejected"] = replay_shard(mockup, build_dir, name + ".replay", schedule["replay"])
+        return report
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def smoke_shard(name, seed, length):
+    """Generate one shard on the models only; see --smoke in the module docstring."""
+    contract, shard = parse_shard_id(name)
+    report = {"shard": name, "error": None, "calls": 0, "invalid": 0, "mockup_rejected": 0, "gas": {}}
+    try:
+        _, _, ops = GENERATORS[contract](None, None, shard_rng(seed, contract, shard), length, dict(benchmark.BOOTSTRAP), None)
+    except Exception:
+        report["error"] = traceback.format_exc()
+        return report
+    report["calls"], report["invalid"] = len(ops), sum(not op.valid for op in ops)
+    # A shard the models reject entirely no longer exercises the contract
+    if report["invalid"] == report["calls"]:
+        report["error"] = "every call was predicted to fail"
+    return report
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+
+
+def aggregate(reports):
+    """Gas distribution per contract entrypoint across all shards."""
+    samples = {}
+    for report in reports:
+        contract, _ = parse_shard_id(report["shard"])
+        for entrypoint, values in report.get("gas", {}).items():
+            for gas, index in values:
+                samples.setdefault("%s.%s" % (contract, entrypoint), []).append((gas, report["shard"], index))
+    summary = {}
+    for key, values in sorted(samples.items()):
+        gas = [value[0] for value in values]
+        worst = max(values)
+        summary[key] = {
+            "count": len(gas),
+            "p50": percentile(gas, 0.50),
+            "p95": percentile(gas, 0.95),
+            "max": worst[0],
+            "worst": {"shard": worst[1], "call": worst[2]},
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", default="0")
+    parser.add_argument("--shards", type=int, default=4, help="shards per contract")
+    parser.add_argument("--length", type=int, default=200, help="calls per shard")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--contracts", default=",".join(GENERATORS))
+    parser.add_argument("--only", metavar="SHARD", help="run a single shard, e.g. Multisig.shard_3")
+    parser.add_argument("--output", default=os.path.join(HERE, "loadgen_output.json"))
+    parser.add_argument("--octez-client", default="octez-client")
+    parser.add_argument("--no-gas", action="store_true", help="check outcomes only, without the mockup")
+    parser.add_argument("--smoke", action="store_true", help="one short shard per contract on the models only, without SmartPy")
+    parser.add_argument("--compile", metavar="BUILD_DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compile:
+        register_tests(args.only, args.seed, args.length, os.path.abspath(args.compile))
+        return 0
+
+    measure = not (args.no_gas or args.smoke)
+    if measure and shutil.which(args.octez_client) is None:
+        parser.error("%s not found; it is needed to measure gas (or pass --no-gas)" % args.octez_client)
+
+    if args.only:
+        parse_shard_id(args.only)
+        names = [args.only]
+    else:
+        contracts = args.contracts.split(",")
+        for contract in contracts:
+            if contract not in GENERATORS:
+                parser.error("unknown contract %s" % contract)
+        names = [shard_id(contract, shard) for contract in contracts for shard in range(1 if args.smoke else args.shards)]
+
+    if args.smoke:
+        args.length = SMOKE_LENGTH
+        reports = [smoke_shard(name, args.seed, args.length) for name in names]
+        for report in reports:
+            print("%-40s calls=%-4d invalid=%d" % (report["shard"], report["calls"], report["invalid"]))
+    else:
+        jobs = [(name, args.seed, args.length, args.octez_client, measure) for name in names]
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            reports = list(pool.map(run_shard, jobs))
+
+    failures = [report for report in reports if report["error"]]
+    for report in failures:
+        print("FAILED %s (seed %s, length %d)\n%s" % (report["shard"], args.seed, args.length, report["error"]))
+    summary = aggregate(reports)
+    for key, metrics in summary.items():
+        print("%-55s n=%-6d p50=%-8s p95=%-8s max=%-8s worst=%s#%d" % (
+            key, metrics["count"], metrics["p50"], metrics["p95"], metrics["max"],
+            metrics["worst"]["shard"], metrics["worst"]["call"],
+        ))
+
+    with open(args.output, "w") as f:
+        json.dump({"seed": args.seed, "length": args.length, "gas": summary, "shards": reports}, f, indent=2, sort_keys=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
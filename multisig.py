@@ -3,79 +3,278 @@ import smartpy as sp
 @sp.module
 def main():
     class Multisig(sp.Contract):
-        def __init__(self, signatories, threshold):
+        def __init__(self, signatories, threshold, proposal_lifetime=7 * 24 * 3600):
             # Initialize the Multisig contract with signatories and the proposal approval threshold
             self.init(
-                # List of addresses that are authorized to propose and vote on changes
-                signatories=signatories,
+                # Addresses that are authorized to propose and vote on changes, each mapped to a small index
+                # that identifies its bit in the vote bitmasks; a big_map so only the sender's entry is loaded
+                signatory_indexes=sp.big_map({signatory: sp.nat(index) for index, signatory in enumerate(signatories)}, tkey=sp.TAddress, tvalue=sp.TNat),
+                # Number of current signatories
+                signatory_count=sp.nat(len(signatories)),
+                # Next unused signatory index; indexes are never reused, so votes already cast by a removed
+                # signatory cannot be attributed to a new one
+                next_signatory_index=sp.nat(len(signatories)),
+                # Bitmask of the indexes of the current signatories; only votes under this mask count toward the threshold
+                signatory_mask=sp.nat(2 ** len(signatories) - 1),
                 # Minimum number of votes required for a proposal to be approved
                 threshold=threshold,
-                # Mapping of proposal IDs to their respective details and votes
-                proposals=sp.map(tkey=sp.TNat, tvalue=sp.TRecord(votes=sp.TSet(sp.TAddress), details=sp.TBytes))
+                # Mapping of (record address, proposal ID) pairs to their respective details, votes and expiry;
+                # a big_map so that only the proposal touched by a call is loaded, however many are pending.
+                # One Multisig governs many records, each record only acting on proposals keyed by its own address.
+                # Votes are a bitmask over signatory indexes with a running count, so a proposal stores two integers
+                # instead of a set of addresses and threshold checks are O(1) until a voter is removed
+                proposals=sp.big_map(tkey=sp.TPair(sp.TAddress, sp.TNat), tvalue=sp.TRecord(votes=sp.TNat, vote_count=sp.TNat, details=sp.TBytes, expires_at=sp.TTimestamp)),
+                # Per-record monotonic counter for proposal IDs, never reused after a proposal is removed
+                next_proposal_ids=sp.big_map(tkey=sp.TAddress, tvalue=sp.TNat),
+                # Per-record lowest proposal ID that may still be stored
+                oldest_proposal_ids=sp.big_map(tkey=sp.TAddress, tvalue=sp.TNat),
+                # Per-record proposal ID the next cleanup_expired scan resumes from
+                cleanup_cursors=sp.big_map(tkey=sp.TAddress, tvalue=sp.TNat),
+                # Number of seconds a proposal stays open for votes and execution
+                proposal_lifetime=proposal_lifetime,
+                # Public keys registered by signatories for off-chain signed approvals
+                public_keys=sp.big_map(tkey=sp.TAddress, tvalue=sp.TKey),
+                # Counter included in every signed approval to prevent replays
+                nonce=sp.nat(0)
             )
 
         @sp.entry_point
-        def propose_change(self, proposal_details):
-            # Allows a signatory to propose a change
-            # Verifies that the sender is an authorized signatory
-            sp.verify(sp.sender in self.data.signatories, "Unauthorized: Sender is not a signatory.")
-            # Generates a new proposal ID and records the proposal details
-            proposal_id = sp.len(self.data.proposals)
-            self.data.proposals[proposal_id] = sp.record(votes=sp.set(), details=proposal_details)
+        def propose_change(self, record, proposal_details):
+            # Allows a signatory, or a record contract for itself, to propose a change to a record
+            # Verifies that the sender is an authorized signatory or the record itself
+            sp.verify(self.data.signatory_indexes.contains(sp.sender) or sp.sender == record, "Unauthorized: Sender is not a signatory.")
+            # Takes the record's next proposal ID and records the proposal details with its expiry
+            proposal_id = self.data.next_proposal_ids.get(record, default=sp.nat(0))
+            self.data.next_proposal_ids[record] = proposal_id + 1
+            self.data.proposals[(record, proposal_id)] = sp.record(votes=sp.nat(0), vote_count=sp.nat(0), details=proposal_details, expires_at=sp.add_seconds(sp.now, self.data.proposal_lifetime))
+            # Reports the new proposal ID and its expiry
+            sp.emit(sp.record(record=record, proposal_id=proposal_id, expires_at=self.data.proposals[(record, proposal_id)].expires_at), tag="proposal_created")
 
         @sp.entry_point
-        def vote_on_change(self, proposal_id):
+        def vote_on_change(self, record, proposal_id):
             # Allows signatories to vote on an existing proposal
             # Checks if the sender is a signatory and if the proposal exists
-            sp.verify(sp.sender in self.data.signatories, "Unauthorized: Sender is not a signatory.")
-            sp.verify(self.data.proposals.contains(proposal_id), "Proposal not found.")
-            # Adds the sender's vote to the proposal
-            self.data.proposals[proposal_id].votes.add(sp.sender)
+            sp.verify(self.data.signatory_indexes.contains(sp.sender), "Unauthorized: Sender is not a signatory.")
+            sp.verify(self.data.proposals.contains((record, proposal_id)), "Proposal not found.")
+            sp.verify(sp.now < self.data.proposals[(record, proposal_id)].expires_at, "Proposal expired.")
+            # Sets the sender's bit in the proposal's votes and increments the count
+            bit = sp.nat(1) << self.data.signatory_indexes[sp.sender]
+            sp.verify(self.data.proposals[(record, proposal_id)].votes & bit == 0, "Already voted.")
+            self.data.proposals[(record, proposal_id)].votes |= bit
+            self.data.proposals[(record, proposal_id)].vote_count += 1
+            # Reports the vote count, so consumers see when the proposal reaches the threshold
+            sp.emit(sp.record(record=record, proposal_id=proposal_id, vote_count=self.data.proposals[(record, proposal_id)].vote_count), tag="vote_cast")
 
         @sp.entry_point
-        def execute_change(self, proposal_id):
-            # Executes a proposal if it has reached the required number of votes
-            # Verifies the existence of the proposal and that it has enough votes
-            sp.verify(self.data.proposals.contains(proposal_id), "Proposal not found.")
-            proposal = self.data.proposals[proposal_id]
-            sp.verify(sp.len(proposal.votes) >= self.data.threshold, "Not enough votes to execute the proposal.")
-            # Execute the proposed change (implementation depends on the specific use case)
-            # Example: call update_record function of the AcademicRecord contract
-            # Once executed, the proposal is removed from the proposals mapping
-            del self.data.proposals[proposal_id]
+        def execute_change(self, record, proposal_id):
+            # Executes a proposal that has reached the required number of votes by pushing it to the record contract
+            sp.verify(self.data.proposals.contains((record, proposal_id)), "Proposal not found.")
+            proposal = self.data.proposals[(record, proposal_id)]
+            sp.verify(sp.now < proposal.expires_at, "Proposal expired.")
+            sp.verify(self.current_vote_count(proposal) >= self.data.threshold, "Not enough votes.")
+            self.execute(record, proposal_id, sp.contract(sp.TBytes, record, entry_point="update_record").open_some())
 
         @sp.entry_point
-        def execute_change(self, proposal_id, academic_record_contract):
-            # Additional implementation of execute_change with an external contract reference
-            sp.verify(self.data.proposals.contains(proposal_id), "Proposal not found.")
-            proposal = self.data.proposals[proposal_id]
-            sp.verify(sp.len(proposal.votes) >= self.data.threshold, "Not enough votes.")
+        def execute_batch(self, proposals):
+            # Executes many approved proposals in one operation (e.g., the changes approved at a senate meeting)
+            # Each item is a record(record, proposal_id). Items that are missing, expired, short of votes or whose
+            # record has no update_record entry point are skipped, so one bad item does not fail the batch;
+            # their positions are reported in a "batch_executed" event
+            executed = 0
+            skipped = []
+            index = 0
+            for item in proposals:
+                target = sp.contract(sp.TBytes, item.record, entry_point="update_record")
+                if self.is_approved((item.record, item.proposal_id)) and target.is_some():
+                    self.execute(item.record, item.proposal_id, target.open_some())
+                    executed += 1
+                else:
+                    skipped.push(index)
+                index += 1
+            # Reports the outcome of the batch to off-chain consumers
+            sp.emit(sp.record(executed=executed, skipped=skipped), tag="batch_executed")
+
+        # Utility function to push an approved proposal to its record contract and remove it
+        def execute(self, record, proposal_id, target):
             # Executes the proposed change in the AcademicRecord contract
-            sp.transfer(proposal.details, sp.mutez(0), sp.contract(sp.TBytes, academic_record_contract, entry_point="update_record").open_some())
+            sp.transfer(self.data.proposals[(record, proposal_id)].details, sp.mutez(0), target)
             # Remove the proposal post-execution
-            del self.data.proposals[proposal_id]
+            del self.data.proposals[(record, proposal_id)]
+            # Reports the executed proposal
+            sp.emit(sp.record(record=record, proposal_id=proposal_id), tag="proposal_executed")
+
+        # Utility function to check, without failing, whether a proposal exists, is still open and has reached the threshold
+        def is_approved(self, key):
+            if not self.data.proposals.contains(key):
+                return False
+            proposal = self.data.proposals[key]
+            return sp.now < proposal.expires_at and self.current_vote_count(proposal) >= self.data.threshold
+
+        # Utility function to count the votes of current signatories only, so votes cast by a signatory who
+        # has since been removed no longer count toward the threshold
+        def current_vote_count(self, proposal):
+            votes = proposal.votes & self.data.signatory_mask
+            # The running count is exact unless a voter has been removed; only then are the bits counted
+            if votes == proposal.votes:
+                return proposal.vote_count
+            count = sp.nat(0)
+            while votes > 0:
+                count += votes & 1
+                votes = votes >> 1
+            return count
+
+        @sp.entry_point
+        def consume_proposal(self, proposal_id):
+            # Allows a record contract to remove one of its own proposals once it has applied it,
+            # so the same approval cannot be executed twice
+            sp.verify(self.data.proposals.contains((sp.sender, proposal_id)), "Proposal not found.")
+            del self.data.proposals[(sp.sender, proposal_id)]
+            # Reports the proposal as executed by its record
+            sp.emit(sp.record(record=sp.sender, proposal_id=proposal_id), tag="proposal_executed")
+
+        @sp.onchain_view()
+        def is_proposal_approved(self, params):
+            # Returns whether the record's proposal exists, is still open and has reached the threshold
+            sp.result(self.is_approved((params.record, params.proposal_id)))
+
+        @sp.onchain_view()
+        def get_proposal_details(self, params):
+            # Returns the details of the record's proposal
+            sp.verify(self.data.proposals.contains((params.record, params.proposal_id)), "Proposal not found.")
+            sp.result(self.data.proposals[(params.record, params.proposal_id)].details)
+
+        @sp.entry_point
+        def register_public_key(self, public_key):
+            # Allows a signatory to register the key used to sign approvals off-chain
+            sp.verify(self.data.signatory_indexes.contains(sp.sender), "Unauthorized: Sender is not a signatory.")
+            # The key must belong to the sender's own implicit account
+            sp.verify(sp.to_address(sp.implicit_account(sp.hash_key(public_key))) == sp.sender, "Public key does not match sender.")
+            self.data.public_keys[sp.sender] = public_key
+            # Reports the registered key
+            sp.emit(sp.record(signatory=sp.sender, public_key=public_key), tag="public_key_registered")
+
+        @sp.entry_point
+        def execute_with_signatures(self, proposal_details, academic_record_contract, signatures):
+            # Executes a change approved by signatures collected off-chain, replacing the
+            # propose/vote/execute round trips with a single operation
+            # Each signature covers the packed (chain ID, this contract, nonce, details, target) so it
+            # cannot be replayed on another chain, another multisig or after the nonce has moved on
+            payload = sp.pack(sp.record(
+                chain_id=sp.chain_id,
+                multisig=sp.self_address,
+                nonce=self.data.nonce,
+                proposal_details=proposal_details,
+                academic_record_contract=academic_record_contract
+            ))
+            signers = sp.nat(0)
+            signer_count = sp.nat(0)
+            for item in signatures:
+                # Verifies that every signer is a signatory with a registered key and signs only once
+                sp.verify(self.data.signatory_indexes.contains(item.signer), "Unauthorized: Signer is not a signatory.")
+                bit = sp.nat(1) << self.data.signatory_indexes[item.signer]
+                sp.verify(signers & bit == 0, "Duplicate signer.")
+                sp.verify(self.data.public_keys.contains(item.signer), "Public key not registered.")
+                sp.verify(sp.check_signature(self.data.public_keys[item.signer], item.signature, payload), "Invalid signature.")
+                signers |= bit
+                signer_count += 1
+            sp.verify(signer_count >= self.data.threshold, "Not enough signatures.")
+            # Consume the nonce before executing the change
+            self.data.nonce += 1
+            sp.transfer(proposal_details, sp.mutez(0), sp.contract(sp.TBytes, academic_record_contract, entry_point="update_record").open_some())
+            # Reports the record the change was sent to and the nonce the next signatures must cover
+            sp.emit(sp.record(record=academic_record_contract, next_nonce=self.data.nonce), tag="signed_change_executed")
+
+        @sp.entry_point
+        def cleanup_expired(self, record, limit):
+            # Reclaims storage of a record's expired proposals, visiting at most `limit` IDs per call
+            # Proposal IDs are monotonic, so no proposal is stored below the oldest ID. Proposals that are still open
+            # are stepped over, so expired ones behind them are reclaimed too (e.g., after change_proposal_lifetime
+            # shortened the lifetime); the oldest ID is a low-water mark that only advances over IDs that are no
+            # longer stored
+            # Each scan resumes where the previous one stopped and starts over from the oldest ID once it has reached
+            # the newest, so more than `limit` open proposals at the low-water mark cannot hide the ones behind them
+            next_proposal_id = self.data.next_proposal_ids.get(record, default=sp.nat(0))
+            oldest_proposal_id = self.data.oldest_proposal_ids.get(record, default=sp.nat(0))
+            proposal_id = self.data.cleanup_cursors.get(record, default=sp.nat(0))
+            if proposal_id < oldest_proposal_id or proposal_id >= next_proposal_id:
+                proposal_id = oldest_proposal_id
+            visited = 0
+            # The low-water mark can only advance during a scan that starts at it
+            advancing = proposal_id == oldest_proposal_id
+            removed = sp.list(t=sp.TNat)
+            while visited < limit and proposal_id < next_proposal_id:
+                if self.data.proposals.contains((record, proposal_id)):
+                    if sp.now >= self.data.proposals[(record, proposal_id)].expires_at:
+                        del self.data.proposals[(record, proposal_id)]
+                        removed.push(proposal_id)
+                    else:
+                        advancing = False
+                if advancing:
+                    oldest_proposal_id = proposal_id + 1
+                proposal_id += 1
+                visited += 1
+            self.data.oldest_proposal_ids[record] = oldest_proposal_id
+            self.data.cleanup_cursors[record] = proposal_id
+            # Reports the removed proposal IDs
+            sp.emit(sp.record(record=record, removed=removed, oldest_proposal_id=oldest_proposal_id), tag="proposals_expired")
+
+        @sp.entry_point
+        def change_proposal_lifetime(self, new_lifetime):
+            # Allows signatories to change how long new proposals stay open
+            sp.verify(self.data.signatory_indexes.contains(sp.sender), "Unauthorized: Only signatories can change the proposal lifetime.")
+            sp.verify(new_lifetime > 0, "Invalid proposal lifetime.")
+            self.data.proposal_lifetime = new_lifetime
+            # Reports the new lifetime
+            sp.emit(new_lifetime, tag="proposal_lifetime_changed")
 
         @sp.entry_point
         def add_signatory(self, signatory):
             # Allows existing signatories to add a new signatory
-            sp.verify(sp.sender in self.data.signatories, "Unauthorized: Only signatories can add others.")
-            # Add the new signatory to the list of signatories
-            self.data.signatories.add(signatory)
+            sp.verify(self.data.signatory_indexes.contains(sp.sender), "Unauthorized: Only signatories can add others.")
+            sp.verify(not self.data.signatory_indexes.contains(signatory), "Already a signatory.")
+            # Add the new signatory under the next unused index
+            self.data.signatory_indexes[signatory] = self.data.next_signatory_index
+            self.data.signatory_mask |= sp.nat(1) << self.data.next_signatory_index
+            self.data.next_signatory_index += 1
+            self.data.signatory_count += 1
+            # Reports the new signatory with the index of its vote bit
+            sp.emit(sp.record(signatory=signatory, index=self.data.signatory_indexes[signatory]), tag="signatory_added")
 
         @sp.entry_point
         def remove_signatory(self, signatory):
             # Allows existing signatories to remove a signatory
-            sp.verify(sp.sender in self.data.signatories, "Unauthorized: Only signatories can remove others.")
-            # Remove the specified signatory from the list
-            self.data.signatories.remove(signatory)
+            sp.verify(self.data.signatory_indexes.contains(sp.sender), "Unauthorized: Only signatories can remove others.")
+            sp.verify(self.data.signatory_indexes.contains(signatory), "Not a signatory.")
+            # Keep enough signatories to reach the threshold
+            sp.verify(self.data.signatory_count > self.data.threshold, "Invalid threshold.")
+            # Remove the specified signatory and stop counting its votes
+            self.data.signatory_mask = self.data.signatory_mask ^ (sp.nat(1) << self.data.signatory_indexes[signatory])
+            del self.data.signatory_indexes[signatory]
+            self.data.signatory_count = sp.as_nat(self.data.signatory_count - 1)
+            # Reports the removed signatory
+            sp.emit(signatory, tag="signatory_removed")
 
         @sp.entry_point
         def change_threshold(self, new_threshold):
             # Allows signatories to change the threshold of votes required to approve a proposal
-            sp.verify(sp.sender in self.data.signatories, "Unauthorized: Only signatories can change the threshold.")
+            sp.verify(self.data.signatory_indexes.contains(sp.sender), "Unauthorized: Only signatories can change the threshold.")
             # Validate the new threshold and update it
-            sp.verify(new_threshold > 0 and new_threshold <= sp.len(self.data.signatories), "Invalid threshold.")
+            sp.verify(new_threshold > 0 and new_threshold <= self.data.signatory_count, "Invalid threshold.")
             self.data.threshold = new_threshold
+            # Reports the new threshold
+            sp.emit(new_threshold, tag="threshold_changed")
+
+
+@sp.module
+def testing():
+    class RecordReceiver(sp.Contract):
+        # Minimal stand-in for an academic record contract that accepts multisig-executed updates
+        def __init__(self):
+            self.init(last_update=sp.bytes("0x"))
+
+        @sp.entry_point
+        def update_record(self, details):
+            self.data.last_update = details
 
 
 @sp.add_test(name="Multisig Contract Test")
@@ -89,20 +288,153 @@ def test_multisig():
     signatory2 = sp.test_account("Signatory2")
 
     # Instantiate the contract
-    multisig_contract = Multisig(signatories=[admin.address, signatory1.address], threshold=2)
+    multisig_contract = Multisig(signatories=[admin.address, signatory1.address, signatory2.address], threshold=2)
     scenario += multisig_contract
 
+    # Record contract the proposals apply to
+    record_receiver = RecordReceiver()
+    scenario += record_receiver
+    record = record_receiver.address
+
     # Test proposing a change
-    multisig_contract.propose_change(proposal_details=sp.pack("Change 1")).run(sender=admin)
+    multisig_contract.propose_change(record=record, proposal_details=sp.pack("Change 1")).run(sender=admin)
 
     # Test voting on the proposed change
-    multisig_contract.vote_on_change(proposal_id=0).run(sender=signatory1)
+    multisig_contract.vote_on_change(record=record, proposal_id=0).run(sender=signatory1)
 
     # Test executing the change (this should fail due to insufficient votes)
-    multisig_contract.execute_change(proposal_id=0).run(sender=admin, valid=False)
+    multisig_contract.execute_change(record=record, proposal_id=0).run(sender=admin, valid=False)
+
+    # Test that a signatory cannot vote twice
+    multisig_contract.vote_on_change(record=record, proposal_id=0).run(sender=signatory1, valid=False)
 
     # Add another vote
-    multisig_contract.vote_on_change(proposal_id=0).run(sender=signatory2)
+    multisig_contract.vote_on_change(record=record, proposal_id=0).run(sender=signatory2)
+    # Signatory1 and Signatory2 have indexes 1 and 2
+    scenario.verify(multisig_contract.data.proposals[(record, 0)].votes == 6)
+    scenario.verify(multisig_contract.data.proposals[(record, 0)].vote_count == 2)
+
+    # Test reading the approval status through views
+    scenario.verify(multisig_contract.is_proposal_approved(sp.record(record=record, proposal_id=0)))
+    scenario.verify(multisig_contract.get_proposal_details(sp.record(record=record, proposal_id=0)) == sp.pack("Change 1"))
 
     # Test executing the change (this should succeed)
-    multisig_contract.execute_change(proposal_id=0).run(sender=admin)
+    multisig_contract.execute_change(record=record, proposal_id=0).run(sender=admin)
+    scenario.verify(record_receiver.data.last_update == sp.pack("Change 1"))
+    scenario.verify(~multisig_contract.is_proposal_approved(sp.record(record=record, proposal_id=0)))
+
+    # Test that proposal IDs stay unique after a proposal has been removed
+    multisig_contract.propose_change(record=record, proposal_details=sp.pack("Change 2")).run(sender=admin, now=sp.timestamp(0))
+    multisig_contract.propose_change(record=record, proposal_details=sp.pack("Change 3")).run(sender=admin, now=sp.timestamp(0))
+    scenario.verify(multisig_contract.data.next_proposal_ids[record] == 3)
+    scenario.verify(multisig_contract.data.proposals.contains((record, 1)) & multisig_contract.data.proposals.contains((record, 2)))
+
+    # Test that expired proposals can no longer be voted on
+    expired = sp.timestamp(7 * 24 * 3600)
+    multisig_contract.vote_on_change(record=record, proposal_id=1).run(sender=signatory1, now=expired, valid=False)
+
+    # Test cleaning up expired proposals in bounded batches
+    multisig_contract.cleanup_expired(record=record, limit=2).run(sender=signatory2, now=expired)
+    scenario.verify(multisig_contract.data.oldest_proposal_ids[record] == 2)
+    scenario.verify(~multisig_contract.data.proposals.contains((record, 1)))
+    multisig_contract.cleanup_expired(record=record, limit=2).run(sender=signatory2, now=expired)
+    scenario.verify(multisig_contract.data.oldest_proposal_ids[record] == 3)
+    scenario.verify(~multisig_contract.data.proposals.contains((record, 2)))
+
+
+    # Test adding and removing signatories: indexes are never reused
+    signatory3 = sp.test_account("Signatory3")
+    multisig_contract.add_signatory(signatory3.address).run(sender=admin)
+    multisig_contract.add_signatory(signatory3.address).run(sender=admin, valid=False)
+    scenario.verify(multisig_contract.data.signatory_indexes[signatory3.address] == 3)
+    multisig_contract.remove_signatory(signatory3.address).run(sender=admin)
+    multisig_contract.add_signatory(signatory3.address).run(sender=admin)
+    scenario.verify(multisig_contract.data.signatory_indexes[signatory3.address] == 4)
+    scenario.verify(multisig_contract.data.signatory_count == 4)
+    multisig_contract.remove_signatory(signatory3.address).run(sender=admin)
+
+    # Test executing a change with signatures collected off-chain
+    for account in [admin, signatory1, signatory2]:
+        multisig_contract.register_public_key(account.public_key).run(sender=account)
+    # A key can only be registered by its own account
+    multisig_contract.register_public_key(signatory1.public_key).run(sender=admin, valid=False)
+
+    chain_id = sp.chain_id_cst("0x9caecab9")
+    details = sp.pack("Change 4")
+    payload = sp.pack(sp.record(
+        chain_id=chain_id,
+        multisig=multisig_contract.address,
+        nonce=sp.nat(0),
+        proposal_details=details,
+        academic_record_contract=record_receiver.address
+    ))
+    signatures = [
+        sp.record(signer=admin.address, signature=sp.make_signature(admin.secret_key, payload, message_format="Raw")),
+        sp.record(signer=signatory1.address, signature=sp.make_signature(signatory1.secret_key, payload, message_format="Raw")),
+    ]
+
+    # Test that a single signature does not reach the threshold
+    multisig_contract.execute_with_signatures(proposal_details=details, academic_record_contract=record_receiver.address, signatures=signatures[:1]).run(sender=signatory2, chain_id=chain_id, valid=False)
+    # Test that the same signer cannot be counted twice
+    multisig_contract.execute_with_signatures(proposal_details=details, academic_record_contract=record_receiver.address, signatures=[signatures[0], signatures[0]]).run(sender=signatory2, chain_id=chain_id, valid=False)
+    # Test that signatures do not apply to other details
+    multisig_contract.execute_with_signatures(proposal_details=sp.pack("Change 5"), academic_record_contract=record_receiver.address, signatures=signatures).run(sender=signatory2, chain_id=chain_id, valid=False)
+
+    # Test executing with enough valid signatures (this should succeed in one operation)
+    multisig_contract.execute_with_signatures(proposal_details=details, academic_record_contract=record_receiver.address, signatures=signatures).run(sender=signatory2, chain_id=chain_id)
+    scenario.verify(record_receiver.data.last_update == details)
+    scenario.verify(multisig_contract.data.nonce == 1)
+
+    # Test that the same signatures cannot be replayed
+    multisig_contract.execute_with_signatures(proposal_details=details, academic_record_contract=record_receiver.address, signatures=signatures).run(sender=signatory2, chain_id=chain_id, valid=False)
+
+    # Test executing several approved proposals in one operation: unapproved ones are skipped and reported
+    later = sp.timestamp(8 * 24 * 3600)
+    for change in ["Change 6", "Change 7", "Change 8"]:
+        multisig_contract.propose_change(record=record, proposal_details=sp.pack(change)).run(sender=admin, now=later)
+    for proposal_id in [3, 5]:
+        multisig_contract.vote_on_change(record=record, proposal_id=proposal_id).run(sender=admin, now=later)
+        multisig_contract.vote_on_change(record=record, proposal_id=proposal_id).run(sender=signatory1, now=later)
+    batch = [sp.record(record=record, proposal_id=proposal_id) for proposal_id in [3, 4, 5]]
+    multisig_contract.execute_batch(batch).run(sender=signatory2, now=later)
+    scenario.verify(record_receiver.data.last_update == sp.pack("Change 8"))
+    scenario.verify(~multisig_contract.data.proposals.contains((record, 3)) & ~multisig_contract.data.proposals.contains((record, 5)))
+    # Proposal 4 only lacked votes and stays pending
+    scenario.verify(multisig_contract.data.proposals.contains((record, 4)))
+    # Executed proposals are not executed again by a later batch
+    multisig_contract.execute_batch(batch).run(sender=signatory2, now=later)
+    scenario.verify(multisig_contract.data.proposals.contains((record, 4)))
+
+    # Test that a proposal expired early by a shorter lifetime is reclaimed behind an older open one
+    multisig_contract.propose_change(record=record, proposal_details=sp.pack("Change 9")).run(sender=admin, now=later)
+    multisig_contract.change_proposal_lifetime(3600).run(sender=admin, now=later)
+    multisig_contract.propose_change(record=record, proposal_details=sp.pack("Change 10")).run(sender=admin, now=later)
+    multisig_contract.cleanup_expired(record=record, limit=10).run(sender=signatory2, now=sp.add_seconds(later, 3600))
+    scenario.verify(multisig_contract.data.proposals.contains((record, 6)))
+    scenario.verify(~multisig_contract.data.proposals.contains((record, 7)))
+    # The low-water mark stops at the oldest proposal still stored
+    scenario.verify(multisig_contract.data.oldest_proposal_ids[record] == 4)
+
+    # Test that a removed signatory's vote no longer counts toward the threshold
+    multisig_contract.add_signatory(signatory3.address).run(sender=admin, now=later)
+    multisig_contract.propose_change(record=record, proposal_details=sp.pack("Change 11")).run(sender=admin, now=later)
+    multisig_contract.vote_on_change(record=record, proposal_id=8).run(sender=signatory3, now=later)
+    multisig_contract.vote_on_change(record=record, proposal_id=8).run(sender=signatory1, now=later)
+    multisig_contract.remove_signatory(signatory3.address).run(sender=admin, now=later)
+    multisig_contract.execute_change(record=record, proposal_id=8).run(sender=admin, now=later, valid=False)
+    # A vote by a current signatory makes up for it
+    multisig_contract.vote_on_change(record=record, proposal_id=8).run(sender=admin, now=later)
+    multisig_contract.execute_change(record=record, proposal_id=8).run(sender=admin, now=later)
+    scenario.verify(record_receiver.data.last_update == sp.pack("Change 11"))
+
+    # Test that cleanup_expired resumes after the open proposals at the low-water mark
+    for change in ["Change 12", "Change 13"]:
+        multisig_contract.propose_change(record=record, proposal_details=sp.pack(change)).run(sender=admin, now=later)
+    # Proposals 4 and 6 are still open; the scans resume at 8, where the previous one stopped
+    multisig_contract.cleanup_expired(record=record, limit=2).run(sender=signatory2, now=sp.add_seconds(later, 3600))
+    multisig_contract.cleanup_expired(record=record, limit=2).run(sender=signatory2, now=sp.add_seconds(later, 3600))
+    scenario.verify(~multisig_contract.data.proposals.contains((record, 9)) & ~multisig_contract.data.proposals.contains((record, 10)))
+    scenario.verify(multisig_contract.data.oldest_proposal_ids[record] == 4)
+    # Once it has reached the newest ID, the next scan starts over from the low-water mark
+    multisig_contract.cleanup_expired(record=record, limit=2).run(sender=signatory2, now=sp.add_seconds(later, 3600))
+    scenario.verify(multisig_contract.data.cleanup_cursors[record] == 6)
@@ -0,0 +1,91 @@
+"""Off-chain helpers for the compact academic record schema.
+
+On-chain a transcript is a map from course code (nat) to a record of grade
+(nat) and term (nat):
+
+    {101: {"grade": 1, "term": 20243}}
+
+Course codes come from the institution's course catalog, grades are indexes
+into GRADES and a term is encoded as ``year * 10 + season`` with seasons
+numbered as in SEASONS (so "2024 Fall" is 20243). This keeps ``sp.pack`` of a
+transcript, and therefore storage and the blake2b input, small.
+
+The helpers below translate between that form and the human-readable form
+used by registrars:
+
+    {"courses": [{"code": 101, "name": "Math", "grade": "A", "term": "2024 Fall"}]}
+"""
+
+GRADES = ["A+", "A", "A-", "B+", "B", "B-", "C+", "C", "C-", "D+", "D", "D-", "F", "P", "NP", "W", "I"]
+
+SEASONS = {"Spring": 1, "Summer": 2, "Fall": 3, "Winter": 4}
+
+
+def encode_grade(grade):
+    """Return the on-chain nat of a letter grade."""
+    try:
+        return GRADES.index(grade)
+    except ValueError:
+        raise ValueError("Unknown grade: %r" % (grade,))
+
+
+def decode_grade(value):
+    """Return the letter grade of an on-chain nat."""
+    if not 0 <= value < len(GRADES):
+        raise ValueError("Unknown grade code: %r" % (value,))
+    return GRADES[value]
+
+
+def encode_term(term):
+    """Encode a term such as "2024 Fall" as a nat (20243)."""
+    year, _, season = term.partition(" ")
+    if season not in SEASONS or not year.isdigit():
+        raise ValueError("Invalid term: %r" % (term,))
+    return int(year) * 10 + SEASONS[season]
+
+
+def decode_term(value):
+    """Decode a nat term (20243) as "2024 Fall"."""
+    year, season = divmod(value, 10)
+    for name, number in SEASONS.items():
+        if number == season:
+            return "%d %s" % (year, name)
+    raise ValueError("Invalid term code: %r" % (value,))
+
+
+def encode_transcript(record, catalog):
+    """Encode a human-readable record as the on-chain transcript map.
+
+    Args:
+        record (dict): {"courses": [{"name" or "code", "grade", "term"}]}.
+        catalog (dict): course code (int) to course name.
+    """
+    codes = {name: code for code, name in catalog.items()}
+    transcript = {}
+    for course in record["courses"]:
+        code = course["code"] if "code" in course else codes.get(course["name"])
+        if code not in catalog:
+            raise ValueError("Course not in catalog: %r" % (course,))
+        if code in transcript:
+            raise ValueError("Duplicate course: %r" % (course,))
+        transcript[code] = {"grade": encode_grade(course["grade"]), "term": encode_term(course["term"])}
+    return transcript
+
+
+def decode_transcript(transcript, catalog):
+    """Decode an on-chain transcript map into the human-readable form.
+
+    Args:
+        transcript (dict): course code to {"grade": nat, "term": nat}.
+        catalog (dict): course code (int) to course name.
+    """
+    courses = []
+    for code in sorted(transcript):
+        entry = transcript[code]
+        courses.append({
+            "code": code,
+            "name": catalog.get(code, str(code)),
+            "grade": decode_grade(entry["grade"]),
+            "term": decode_term(entry["term"]),
+        })
+    return {"courses": courses}
@@ -0,0 +1,657 @@
+"""Pure-Python models of the GradeBlock contracts, for large what-if simulations.
+
+Usage:
+    python simulator.py [--seed 0] baking-swap [--depositors 10000] [--rate 700]
+                        [--duration 1] [--collateral 1000] [--deposit 10]
+                        [--interval 60] [--settle-limit 100]
+    python simulator.py [--seed 0] multisig [--signatories 40] [--threshold 3]
+                        [--steps 1000000] [--votes 1.0] [--cleanup-limit 10]
+
+Each model keeps the storage of its contract in plain Python values and
+implements its entry points with the same checks, in the same order, and the
+same effects, so a million calls run in well under a minute instead of going
+through the SmartPy interpreter; the time depends on the machine and on how
+much each call scans, and each subcommand prints it.
+`model.call(entrypoint, params, sender, now, amount)` runs one call: it
+returns the operations the contract would emit
+(("transfer", receiver, mutez) and ("call", target, entrypoint, argument)) or
+raises Failure, with the contract's error message when it sets one, leaving
+the model unchanged.
+
+Addresses are any hashable values (mockup aliases or tz1 strings; those
+starting with KT1 are taken to be contracts), times are seconds from the
+epoch and amounts are mutez. Transcripts are {code: (grade, term)} maps;
+record hashes are computed as verify_transcripts.py does, so they match the
+contracts byte for byte. Left out: the timestamps the records
+take from the clock of the machine compiling them, events, code upgrades,
+delegation and the signature checks of Multisig.
+
+loadgen.py replays its random call sequences through both these models and
+SmartPy, and checks that every call has the same outcome and that the
+storage matches.
+
+The subcommands are what-if simulations:
+
+    baking-swap  depositors join one every --interval seconds at the current
+                 offer while the admin settles the matured buckets; reports
+                 how the collateral runs down and how many deposits it
+                 refused.
+    multisig     every step a random signatory proposes a change or votes on
+                 one of the open proposals (--votes votes per proposal on
+                 average), and expired proposals are cleaned up; reports how
+                 many proposals pile up.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import verify_transcripts
+
+DAY = 24 * 3600
+PROPOSAL_LIFETIME = 7 * DAY
+
+
+class Failure(Exception):
+    """A call the contract rejects; `message` is its error, or None for a bare assertion."""
+
+    def __init__(self, message=None):
+        super().__init__(message)
+        self.message = message
+
+
+def require(condition, message=None):
+    if not condition:
+        raise Failure(message)
+
+
+def is_implicit(address):
+    """Whether an address is an implicit account: contracts are the KT1 addresses (or aliases)."""
+    return not str(address).startswith("KT1")
+
+
+def record_hash(details):
+    """The `generate_hash` of a {code: (grade, term)} transcript."""
+    return verify_transcripts.transcript_hash({code: {"grade": grade, "term": term} for code, (grade, term) in details.items()})
+
+
+class Model:
+    """Base of the contract models: the context of the call being run and its dispatch."""
+
+    __slots__ = ("sender", "now", "amount")
+
+    # Entry points the model implements
+    ENTRYPOINTS = ()
+
+    def call(self, entrypoint, params=None, sender=None, now=0, amount=0):
+        """Run an entry point and return the operations it emits.
+
+        `params` is a dict of keyword arguments, a single positional argument
+        or None. Raises Failure if the contract rejects the call, in which case
+        the storage is left as it was.
+        """
+        if entrypoint not in self.ENTRYPOINTS:
+            raise ValueError("%s does not model %s" % (type(self).__name__, entrypoint))
+        self.sender, self.now, self.amount = sender, now, amount
+        method = getattr(self, entrypoint)
+        if params is None:
+            return method()
+        return method(**params) if isinstance(params, dict) else method(params)
+
+
+def succeeds(model, entrypoint, params=None, sender=None, now=0, amount=0):
+    """Run a call on the model; return whether the contract accepts it."""
+    try:
+        model.call(entrypoint, params, sender, now, amount)
+    except Failure:
+        return False
+    return True
+
+
+# AcademicRecord ------------------------------------------------------------
+
+
+class RecordProposal:
+    __slots__ = ("approvals", "proposed_changes", "expires_at", "code_hash", "proposed_owner")
+
+    def __init__(self, proposed_changes, expires_at, code_hash=None, proposed_owner=None):
+        self.approvals = set()
+        self.proposed_changes = proposed_changes
+        self.expires_at = expires_at
+        self.code_hash = code_hash
+        self.proposed_owner = proposed_owner
+
+
+class AcademicRecord(Model):
+    """Model of academic_record.py."""
+
+    __slots__ = (
+        "student_identifier", "record_details", "record_hash", "owner", "proposals",
+        "next_proposal_id", "oldest_proposal_id", "proposal_lifetime", "required_approvals", "signatories",
+    )
+
+    ENTRYPOINTS = (
+        "update_record", "change_ownership", "propose_update", "propose_ownership_change",
+        "propose_upgrade", "approve_update", "cleanup_expired", "execute_update",
+    )
+
+    def __init__(self, student_identifier, record_details, owner_address, required_approvals, signatories, proposal_lifetime=PROPOSAL_LIFETIME):
+        self.student_identifier = student_identifier
+        self.record_details = record_details
+        self.record_hash = record_hash(record_details)
+        self.owner = owner_address
+        self.proposals = {}
+        self.next_proposal_id = 0
+        self.oldest_proposal_id = 0
+        self.proposal_lifetime = proposal_lifetime
+        self.required_approvals = required_approvals
+        self.signatories = set(signatories)
+
+    def update_record(self, new_details, proposal_id):
+        proposal = self.verify_update(proposal_id)
+        require(new_details == proposal.proposed_changes, "Change does not match the proposal.")
+        new_hash = record_hash(new_details)
+        require(new_hash != self.record_hash, "No changes detected.")
+        self.record_details = new_details
+        self.record_hash = new_hash
+        del self.proposals[proposal_id]
+        return []
+
+    def change_ownership(self, new_owner_address, proposal_id):
+        proposal = self.verify_multisig(proposal_id)
+        require(proposal.proposed_owner is not None, "Proposal is not an ownership change.")
+        require(new_owner_address == proposal.proposed_owner, "Change does not match the proposal.")
+        self.owner = new_owner_address
+        del self.proposals[proposal_id]
+        return []
+
+    def propose_update(self, proposal_details):
+        require(self.sender == self.owner, "Unauthorized: Only the owner can propose updates.")
+        self.add_proposal(RecordProposal(proposal_details, self.now + self.proposal_lifetime))
+        return []
+
+    def propose_ownership_change(self, new_owner_address):
+        require(self.sender == self.owner, "Unauthorized: Only the owner can propose updates.")
+        self.add_proposal(RecordProposal({}, self.now + self.proposal_lifetime, proposed_owner=new_owner_address))
+        return []
+
+    def propose_upgrade(self, code_hash):
+        require(self.sender == self.owner, "Unauthorized: Only the owner can propose updates.")
+        self.add_proposal(RecordProposal({}, self.now + self.proposal_lifetime, code_hash))
+        return []
+
+    def approve_update(self, proposal_id):
+        proposal = self.proposals.get(proposal_id)
+        require(proposal is not None, "Proposal not found.")
+        require(self.now < proposal.expires_at, "Proposal expired.")
+        require(self.sender in self.signatories, "Unauthorized: Only signatories can approve.")
+        proposal.approvals.add(self.sender)
+        return []
+
+    def cleanup_expired(self, limit):
+        self.oldest_proposal_id, _ = cleanup(self.proposals, self.oldest_proposal_id, self.next_proposal_id, limit, self.now)
+        return []
+
+    def execute_update(self, proposal_id):
+        proposal = self.verify_update(proposal_id)
+        self.record_details = proposal.proposed_changes
+        self.record_hash = record_hash(proposal.proposed_changes)
+        del self.proposals[proposal_id]
+        return []
+
+    def add_proposal(self, proposal):
+        self.proposals[self.next_proposal_id] = proposal
+        self.next_proposal_id += 1
+
+    def verify_multisig(self, proposal_id):
+        proposal = self.proposals.get(proposal_id)
+        require(proposal is not None, "Proposal not found.")
+        require(self.now < proposal.expires_at, "Proposal expired.")
+        require(len(proposal.approvals) >= self.required_approvals, "Insufficient approvals for the proposal.")
+        require(proposal.code_hash is None, "Proposal is an upgrade.")
+        return proposal
+
+    def verify_update(self, proposal_id):
+        proposal = self.verify_multisig(proposal_id)
+        require(proposal.proposed_owner is None, "Proposal is an ownership change.")
+        return proposal
+
+
+def cleanup(proposals, oldest, next_id, limit, now, cursor=None):
+    """The scan of cleanup_expired; returns the new low-water mark and scan cursor.
+
+    The scan starts at `cursor` (the low-water mark when None), or over from
+    the low-water mark once the cursor has reached `next_id`.
+    """
+    if cursor is None or not oldest <= cursor < next_id:
+        cursor = oldest
+    advancing = cursor == oldest
+    end = min(next_id, cursor + limit)
+    for proposal_id in range(cursor, end):
+        proposal = proposals.get(proposal_id)
+        if proposal is not None:
+            if now < proposal.expires_at:
+                advancing = False
+                continue
+            del proposals[proposal_id]
+        if advancing:
+            oldest = proposal_id + 1
+    return oldest, max(cursor, end)
+
+
+# Multisig ------------------------------------------------------------------
+
+
+class MultisigProposal:
+    __slots__ = ("votes", "vote_count", "details", "expires_at")
+
+    def __init__(self, details, expires_at):
+        self.votes = 0
+        self.vote_count = 0
+        self.details = details
+        self.expires_at = expires_at
+
+
+class Multisig(Model):
+    """Model of multisig.py.
+
+    Proposals are grouped by record, which is equivalent to the contract's
+    (record, proposal ID) keys and lets cleanup_expired scan one record's IDs.
+    `has_update_record(address)` tells whether an address has an
+    update_record entry point; by default every address has one.
+    """
+
+    __slots__ = (
+        "signatory_indexes", "signatory_count", "next_signatory_index", "signatory_mask", "threshold", "proposals",
+        "next_proposal_ids", "oldest_proposal_ids", "cleanup_cursors", "proposal_lifetime", "public_keys", "nonce",
+        "has_update_record",
+    )
+
+    ENTRYPOINTS = (
+        "propose_change", "vote_on_change", "execute_change", "execute_batch", "consume_proposal",
+        "register_public_key", "cleanup_expired", "change_proposal_lifetime", "add_signatory",
+        "remove_signatory", "change_threshold",
+    )
+
+    def __init__(self, signatories, threshold, proposal_lifetime=PROPOSAL_LIFETIME, has_update_record=lambda address: True):
+        self.signatory_indexes = {signatory: index for index, signatory in enumerate(signatories)}
+        self.signatory_count = len(signatories)
+        self.next_signatory_index = len(signatories)
+        self.signatory_mask = 2 ** len(signatories) - 1
+        self.threshold = threshold
+        self.proposals = {}
+        self.next_proposal_ids = {}
+        self.oldest_proposal_ids = {}
+        self.cleanup_cursors = {}
+        self.proposal_lifetime = proposal_lifetime
+        self.public_keys = {}
+        self.nonce = 0
+        self.has_update_record = has_update_record
+
+    def proposal(self, record, proposal_id):
+        """The stored proposal, or None."""
+        proposals = self.proposals.get(record)
+        return None if proposals is None else proposals.get(proposal_id)
+
+    def pending(self):
+        """Number of stored proposals over all records."""
+        return sum(len(proposals) for proposals in self.proposals.values())
+
+    def propose_change(self, record, proposal_details):
+        require(self.sender in self.signatory_indexes or self.sender == record, "Unauthorized: Sender is not a signatory.")
+        proposal_id = self.next_proposal_ids.get(record, 0)
+        self.next_proposal_ids[record] = proposal_id + 1
+        self.proposals.setdefault(record, {})[proposal_id] = MultisigProposal(proposal_details, self.now + self.proposal_lifetime)
+        return []
+
+    def vote_on_change(self, record, proposal_id):
+        index = self.signatory_indexes.get(self.sender)
+        require(index is not None, "Unauthorized: Sender is not a signatory.")
+        proposal = self.proposal(record, proposal_id)
+        require(proposal is not None, "Proposal not found.")
+        require(self.now < proposal.expires_at, "Proposal expired.")
+        bit = 1 << index
+        require(proposal.votes & bit == 0, "Already voted.")
+        proposal.votes |= bit
+        proposal.vote_count += 1
+        return []
+
+    def execute_change(self, record, proposal_id):
+        proposal = self.proposal(record, proposal_id)
+        require(proposal is not None, "Proposal not found.")
+        require(self.now < proposal.expires_at, "Proposal expired.")
+        require(self.current_vote_count(proposal) >= self.threshold, "Not enough votes.")
+        require(self.has_update_record(record))
+        return [self.execute(record, proposal_id)]
+
+    def execute_batch(self, proposals):
+        """`proposals` is a list of (record, proposal ID) pairs."""
+        operations = []
+        for record, proposal_id in proposals:
+            if self.is_approved(record, proposal_id, self.now) and self.has_update_record(record):
+                operations.append(self.execute(record, proposal_id))
+        return operations
+
+    def execute(self, record, proposal_id):
+        proposal = self.proposals[record].pop(proposal_id)
+        return ("call", record, "update_record", proposal.details)
+
+    def is_approved(self, record, proposal_id, now):
+        """The `is_proposal_approved` view at time `now`."""
+        proposal = self.proposal(record, proposal_id)
+        return proposal is not None and now < proposal.expires_at and self.current_vote_count(proposal) >= self.threshold
+
+    def current_vote_count(self, proposal):
+        """Number of votes cast by current signatories."""
+        return bin(proposal.votes & self.signatory_mask).count("1")
+
+    def consume_proposal(self, proposal_id):
+        require(self.proposal(self.sender, proposal_id) is not None, "Proposal not found.")
+        del self.proposals[self.sender][proposal_id]
+        return []
+
+    def register_public_key(self, public_key):
+        # The check that the key hashes to the sender is not modeled
+        require(self.sender in self.signatory_indexes, "Unauthorized: Sender is not a signatory.")
+        self.public_keys[self.sender] = public_key
+        return []
+
+    def cleanup_expired(self, record, limit):
+        next_id = self.next_proposal_ids.get(record, 0)
+        oldest = self.oldest_proposal_ids.get(record, 0)
+        cursor = self.cleanup_cursors.get(record, 0)
+        self.oldest_proposal_ids[record], self.cleanup_cursors[record] = cleanup(self.proposals.get(record, {}), oldest, next_id, limit, self.now, cursor)
+        return []
+
+    def change_proposal_lifetime(self, new_lifetime):
+        require(self.sender in self.signatory_indexes, "Unauthorized: Only signatories can change the proposal lifetime.")
+        require(new_lifetime > 0, "Invalid proposal lifetime.")
+        self.proposal_lifetime = new_lifetime
+        return []
+
+    def add_signatory(self, signatory):
+        require(self.sender in self.signatory_indexes, "Unauthorized: Only signatories can add others.")
+        require(signatory not in self.signatory_indexes, "Already a signatory.")
+        self.signatory_indexes[signatory] = self.next_signatory_index
+        self.signatory_mask |= 1 << self.next_signatory_index
+        self.next_signatory_index += 1
+        self.signatory_count += 1
+        return []
+
+    def remove_signatory(self, signatory):
+        require(self.sender in self.signatory_indexes, "Unauthorized: Only signatories can remove others.")
+        require(signatory in self.signatory_indexes, "Not a signatory.")
+        require(self.signatory_count > self.threshold, "Invalid threshold.")
+        self.signatory_mask ^= 1 << self.signatory_indexes.pop(signatory)
+        self.signatory_count -= 1
+        return []
+
+    def change_threshold(self, new_threshold):
+        require(self.sender in self.signatory_indexes, "Unauthorized: Only signatories can change the threshold.")
+        require(0 < new_threshold <= self.signatory_count, "Invalid threshold.")
+        self.threshold = new_threshold
+        return []
+
+
+# AcademicRecordWithMultisig ------------------------------------------------
+
+
+class AcademicRecordWithMultisig(Model):
+    """Model of academic_record_multisig.py, bound to a Multisig model.
+
+    `address` is the record's own address, the key of its proposals in the
+    Multisig. Proposal details are kept as transcripts rather than packed.
+    """
+
+    __slots__ = ("address", "student_identifier", "record_details", "record_hash", "owner", "multisig")
+
+    ENTRYPOINTS = ("propose_update_record", "execute_approved_update", "update_record")
+
+    def __init__(self, address, student_identifier, record_details, owner_address, multisig):
+        self.address = address
+        self.student_identifier = student_identifier
+        self.record_details = record_details
+        self.record_hash = record_hash(record_details)
+        self.owner = owner_address
+        self.multisig = multisig
+
+    def propose_update_record(self, proposal_details):
+        require(self.sender == self.owner, "Unauthorized: Only the owner can propose updates.")
+        # The Multisig call runs after this one and cannot fail: the record proposes for itself
+        self.multisig.call("propose_change", dict(record=self.address, proposal_details=proposal_details), self.address, self.now)
+        return []
+
+    def execute_approved_update(self, proposal_id):
+        require(self.multisig.is_approved(self.address, proposal_id, self.now), "Proposal not yet approved.")
+        new_details = self.multisig.proposal(self.address, proposal_id).details
+        self.record_details = new_details
+        self.record_hash = record_hash(new_details)
+        self.multisig.call("consume_proposal", proposal_id, self.address, self.now)
+        return []
+
+    def update_record(self, proposal_details):
+        # The sender of the Multisig's ("call", record, "update_record", details) operations is the Multisig model
+        require(self.sender is self.multisig, "Unauthorized: Only the Multisig can update the record.")
+        self.record_details = proposal_details
+        self.record_hash = record_hash(proposal_details)
+        return []
+
+
+# BakingSwap ----------------------------------------------------------------
+
+
+class BakingSwap(Model):
+    """Model of baking_swap.py.
+
+    Ledger entries are (amount, due) pairs and buckets (size, cursor) pairs.
+    `balance` follows the tez held by the contract, which is not in its
+    storage.
+    """
+
+    __slots__ = (
+        "admin", "collateral", "ledger", "deposits", "next_deposit_id", "settlement_queue",
+        "buckets", "rate", "duration", "balance",
+    )
+
+    ENTRYPOINTS = (
+        "collateralize", "uncollateralize", "set_offer", "settle_bucket", "deposit",
+        "withdraw", "withdraw_all_matured",
+    )
+
+    def __init__(self, admin, initialRate, initialDuration):
+        self.admin = admin
+        self.collateral = 0
+        self.ledger = {}
+        self.deposits = {}
+        self.next_deposit_id = 0
+        self.settlement_queue = {}
+        self.buckets = {}
+        self.rate = initialRate
+        self.duration = initialDuration
+        self.balance = 0
+
+    def call(self, entrypoint, params=None, sender=None, now=0, amount=0):
+        operations = Model.call(self, entrypoint, params, sender, now, amount)
+        self.balance += amount - sum(operation[2] for operation in operations)
+        return operations
+
+    def collateralize(self):
+        require(self.sender == self.admin)
+        self.collateral += self.amount
+        return []
+
+    def uncollateralize(self, amount, receiver):
+        require(self.sender == self.admin)
+        require(amount <= self.collateral, "insufficient collateral")
+        self.collateral -= amount
+        return [("transfer", receiver, amount)]
+
+    def set_offer(self, rate, duration):
+        require(self.sender == self.admin)
+        require(self.amount == 0)
+        self.rate = rate
+        self.duration = duration
+        return []
+
+    def settle_bucket(self, day, limit):
+        require(self.sender == self.admin)
+        require(self.amount == 0)
+        require(self.now >= (day + 1) * DAY, "BucketNotMatured")
+        bucket = self.buckets.get(day)
+        require(bucket is not None, "NoBucket")
+        size, cursor = bucket
+        end = min(size, cursor + limit)
+        operations = []
+        while cursor < end:
+            key = self.settlement_queue.pop((day, cursor))
+            # Deposits already withdrawn by their owner are skipped, and those of contracts left to withdraw
+            entry = self.ledger.get(key)
+            if entry is not None and is_implicit(key[0]):
+                del self.ledger[key]
+                self.deposits[key[0]].remove(key[1])
+                if entry[0] > 0:
+                    operations.append(("transfer", key[0], entry[0]))
+            cursor += 1
+        if cursor == size:
+            del self.buckets[day]
+        else:
+            self.buckets[day] = (size, cursor)
+        return operations
+
+    def deposit(self, rate, duration):
+        require(self.rate >= rate)
+        require(self.duration <= duration)
+        interest = self.amount * self.rate // 10000
+        # Subtracting more mutez than the collateral holds fails
+        require(interest <= self.collateral)
+        self.collateral -= interest
+        deposit_id = self.next_deposit_id
+        self.next_deposit_id += 1
+        self.ledger[(self.sender, deposit_id)] = (self.amount + interest, self.now + self.duration * DAY)
+        self.deposits.setdefault(self.sender, set()).add(deposit_id)
+        day = self.now // DAY + self.duration
+        size, cursor = self.buckets.get(day, (0, 0))
+        self.settlement_queue[(day, size)] = (self.sender, deposit_id)
+        self.buckets[day] = (size + 1, cursor)
+        return []
+
+    def withdraw(self, deposit_id, receiver):
+        require(self.amount == 0)
+        entry = self.ledger.get((self.sender, deposit_id))
+        require(entry is not None, "NoDeposit")
+        require(self.now >= entry[1])
+        del self.ledger[(self.sender, deposit_id)]
+        self.deposits[self.sender].remove(deposit_id)
+        return [("transfer", receiver, entry[0])]
+
+    def withdraw_all_matured(self, receiver):
+        require(self.amount == 0)
+        open_ids = self.deposits.get(self.sender)
+        require(open_ids is not None, "NoDeposit")
+        matured = [deposit_id for deposit_id in sorted(open_ids) if self.now >= self.ledger[(self.sender, deposit_id)][1]]
+        total = sum(self.ledger[(self.sender, deposit_id)][0] for deposit_id in matured)
+        require(total > 0, "NoMaturedDeposit")
+        for deposit_id in matured:
+            del self.ledger[(self.sender, deposit_id)]
+            open_ids.remove(deposit_id)
+        return [("transfer", receiver, total)]
+
+
+# What-if simulations -------------------------------------------------------
+
+
+def simulate_baking_swap(depositors, rate, duration, collateral, deposit, interval, settle_limit, rng):
+    """Depositors join one per `interval` seconds; the admin settles matured buckets every day."""
+    swap = BakingSwap("admin", rate, duration)
+    swap.call("collateralize", sender="admin", amount=collateral)
+    refused, lowest, settled_day = 0, collateral, 0
+    for index in range(depositors):
+        now = index * interval
+        # Settle the buckets that matured since the last deposit
+        while (settled_day + 1) * DAY <= now:
+            while settled_day in swap.buckets:
+                swap.call("settle_bucket", dict(day=settled_day, limit=settle_limit), "admin", now)
+            settled_day += 1
+        amount = rng.randint(1, 2 * deposit)
+        if not succeeds(swap, "deposit", dict(rate=rate, duration=duration), "depositor_%d" % index, now, amount):
+            refused += 1
+        lowest = min(lowest, swap.collateral)
+    return {
+        "deposits": swap.next_deposit_id,
+        "refused": refused,
+        "collateral": swap.collateral,
+        "lowest_collateral": lowest,
+        "open_deposits": len(swap.ledger),
+        "owed": sum(amount for amount, _ in swap.ledger.values()),
+        "balance": swap.balance,
+    }
+
+
+def simulate_multisig(signatories, threshold, steps, votes, cleanup_limit, rng):
+    """Random signatories propose, vote and clean up one record's proposals, one step per minute."""
+    names = ["signatory_%d" % index for index in range(signatories)]
+    multisig = Multisig(names, threshold)
+    record = "record"
+    # A proposal gets `votes` votes on average: a step proposes with probability 1 / (1 + votes)
+    propose = 1 / (1 + votes)
+    peak, executed = 0, 0
+    for step in range(steps):
+        now = step * 60
+        sender = rng.choice(names)
+        open_ids = multisig.proposals.get(record, {})
+        if not open_ids or rng.random() < propose:
+            multisig.call("propose_change", dict(record=record, proposal_details=step), sender, now)
+        else:
+            proposal_id = rng.randrange(multisig.oldest_proposal_ids.get(record, 0), multisig.next_proposal_ids[record])
+            if succeeds(multisig, "vote_on_change", dict(record=record, proposal_id=proposal_id), sender, now) \
+                    and multisig.is_approved(record, proposal_id, now):
+                multisig.call("execute_change", dict(record=record, proposal_id=proposal_id), sender, now)
+                executed += 1
+        multisig.call("cleanup_expired", dict(record=record, limit=cleanup_limit), sender, now)
+        peak = max(peak, len(multisig.proposals[record]))
+    return {
+        "proposals": multisig.next_proposal_ids.get(record, 0),
+        "executed": executed,
+        "pending": len(multisig.proposals.get(record, {})),
+        "peak_pending": peak,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", default="0")
+    commands = parser.add_subparsers(dest="command", required=True)
+    swap = commands.add_parser("baking-swap")
+    swap.add_argument("--depositors", type=int, default=10000)
+    swap.add_argument("--rate", type=int, default=700, help="interest in basis points")
+    swap.add_argument("--duration", type=int, default=1, help="days before a deposit matures")
+    swap.add_argument("--collateral", type=int, default=1000, help="initial collateral in tez")
+    swap.add_argument("--deposit", type=int, default=10, help="average deposit in tez")
+    swap.add_argument("--interval", type=int, default=60, help="seconds between depositors")
+    swap.add_argument("--settle-limit", type=int, default=100)
+    multisig = commands.add_parser("multisig")
+    multisig.add_argument("--signatories", type=int, default=40)
+    multisig.add_argument("--threshold", type=int, default=3)
+    multisig.add_argument("--steps", type=int, default=1000000)
+    multisig.add_argument("--votes", type=float, default=1.0, help="average votes cast per proposal")
+    multisig.add_argument("--cleanup-limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    if args.command == "baking-swap":
+        result = simulate_baking_swap(
+            args.depositors, args.rate, args.duration, args.collateral * 10**6, args.deposit * 10**6,
+            args.interval, args.settle_limit, rng,
+        )
+    else:
+        result = simulate_multisig(args.signatories, args.threshold, args.steps, args.votes, args.cleanup_limit, rng)
+    for key, value in result.items():
+        print("%-20s %s" % (key, value))
+    print("%-20s %.1fs" % ("elapsed", time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Check that benchmark.parse_receipt reads the top-level operation's own result.
+
+RECEIPT is an octez-client receipt, shortened, of a Multisig execute_change
+call that emits an internal call to a record's update_record.
+"""
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import benchmark  # noqa: E402
+
+RECEIPT = """
+Operation successfully injected in the node.
+Manager signed operations:
+  From: tz1KqTpEZ7Yob7QbPE4Hy4Wo8fHG8LhKxZSx
+  Fee to the baker: ꜩ0.001027
+  Gas limit: 6432
+  Storage limit: 0 bytes
+  Transaction:
+    Amount: ꜩ0
+    From: tz1KqTpEZ7Yob7QbPE4Hy4Wo8fHG8LhKxZSx
+    To: KT1A91VqdhR8Xg6bRWDaC4h8MK9KfYo9o4Vi
+    Entrypoint: execute_change
+    This transaction was successfully applied
+    Updated storage: 0
+    Storage size: 4120 bytes
+    Paid storage size diff: 12 bytes
+    Consumed gas: 4101.254
+    Internal operations:
+      Internal Transaction:
+        Amount: ꜩ0
+        From: KT1A91VqdhR8Xg6bRWDaC4h8MK9KfYo9o4Vi
+        To: KT1BhFRuvKL9E8ggxycsHDf8qS42HLvCrXYr
+        Entrypoint: update_record
+        This transaction was successfully applied
+        Updated storage: 0
+        Storage size: 2033 bytes
+        Paid storage size diff: 40 bytes
+        Consumed gas: 2230.101
+"""
+
+
+class ParseReceiptTest(unittest.TestCase):
+    def test_internal_operations_are_not_measured(self):
+        self.assertEqual(benchmark.parse_receipt(RECEIPT), {"gas": 4101.254, "storage_size": 4120.0, "paid_storage_diff": 12.0})
+
+    def test_receipt_without_internal_operations(self):
+        receipt = RECEIPT.split("    Internal operations:")[0]
+        self.assertEqual(benchmark.parse_receipt(receipt)["gas"], 4101.254)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""Check Client.send and Client.wait against a stub node RPC.
+
+The stub answers the paths the client uses. Its simulation rejects any
+operation with more than MAX_CONTENTS contents as over the gas limit, and
+rejects calls with parameter FAILING outright. Every injected operation is
+included in a new block at once, and its receipt is failed when its
+parameter is FAILING_ON_CHAIN.
+"""
+
+import http.server
+import json
+import os
+import sys
+import threading
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import client  # noqa: E402
+from indexer import base58check  # noqa: E402
+
+SOURCE = "tz1KqTpEZ7Yob7QbPE4Hy4Wo8fHG8LhKxZSx"
+CONTRACT = "KT1A91VqdhR8Xg6bRWDaC4h8MK9KfYo9o4Vi"
+MAX_CONTENTS = 2
+FAILING = 99
+FAILING_ON_CHAIN = 98
+# Counter of the source account on the node
+NODE_COUNTER = 10
+
+
+class StubNode:
+    """Node state: the blocks, each holding the operation injected at its level."""
+
+    def __init__(self):
+        self.blocks = []
+        self.lock = threading.Lock()
+
+    def parameters(self, contents):
+        return [int(content["parameters"]["value"]["int"]) for content in contents if content["kind"] == "transaction"]
+
+    def simulate(self, contents):
+        if len(contents) > MAX_CONTENTS:
+            status, errors = "failed", [{"kind": "temporary", "id": "proto.alpha.gas_exhausted.operation"}]
+        elif FAILING in self.parameters(contents):
+            status, errors = "failed", [{"kind": "temporary", "id": "proto.alpha.michelson_v1.script_rejected"}]
+        else:
+            status, errors = "applied", []
+        result = {"status": status, "consumed_milligas": "1500000"}
+        if errors:
+            result["errors"] = errors
+        return {"contents": [dict(content, metadata={"operation_result": result}) for content in contents]}
+
+    def inject(self, signed):
+        # The stub forges operations as hex JSON; strip the 64-byte signature
+        contents = json.loads(bytes.fromhex(signed[:-2 * client.SIGNATURE_SIZE]))["contents"]
+        with self.lock:
+            op_hash = "oo%d" % len(self.blocks)
+            failed = FAILING_ON_CHAIN in self.parameters(contents)
+            result = {"status": "failed", "errors": [{"id": "proto.alpha.michelson_v1.script_rejected"}]} if failed else {"status": "applied"}
+            self.blocks.append({"hash": op_hash, "contents": [dict(content, metadata={"operation_result": result}) for content in contents]})
+        return op_hash
+
+    def handle(self, method, path, body):
+        if path == "/chains/main/blocks/head/context/constants":
+            return {
+                "hard_gas_limit_per_operation": "1040000",
+                "hard_gas_limit_per_block": "2600000",
+                "hard_storage_limit_per_operation": "60000",
+                "max_operation_data_length": "32768",
+            }
+        if path == "/chains/main/chain_id":
+            return "NetXdQprcVkpaWU"
+        if path == "/chains/main/blocks/head/hash":
+            return "BLockGenesisGenesisGenesisGenesisGenesisf79b5d1CoW2"
+        if path == "/chains/main/blocks/head/context/contracts/%s/entrypoints" % CONTRACT:
+            return {"entrypoints": {"vote": {"prim": "nat"}}}
+        if path == "/chains/main/blocks/head/context/contracts/%s/counter" % SOURCE:
+            return str(NODE_COUNTER)
+        if path == "/chains/main/blocks/head/context/contracts/%s/manager_key" % SOURCE:
+            return "edpkuBknW28nW72KG6RoHtYW7p12T6GKc7nAbwYX5m8Wd9sDVC9yav"
+        if path == "/chains/main/blocks/head/helpers/scripts/simulate_operation":
+            return self.simulate(body["operation"]["contents"])
+        if path == "/chains/main/blocks/head/helpers/forge/operations":
+            return json.dumps(body).encode().hex()
+        if path == "/injection/operation?chain=main":
+            return self.inject(body)
+        if path == "/chains/main/blocks/head/header":
+            return {"level": len(self.blocks)}
+        if path.startswith("/chains/main/blocks/") and path.endswith("/operations/3"):
+            level = int(path.split("/")[4])
+            return [self.blocks[level - 1]] if 0 < level <= len(self.blocks) else []
+        return None
+
+    def injected(self):
+        """Return the (counter, parameter) pairs of each injected operation."""
+        return [[(int(content["counter"]), int(content["parameters"]["value"]["int"])) for content in block["contents"]] for block in self.blocks]
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.answer(None)
+
+    def do_POST(self):
+        self.answer(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+
+    def answer(self, body):
+        result = self.server.node.handle(self.command, self.path, body)
+        data = json.dumps(result).encode()
+        self.send_response(404 if result is None else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubSigner:
+    public_key_hash = SOURCE
+
+    def public_key(self):
+        return "edpkuBknW28nW72KG6RoHtYW7p12T6GKc7nAbwYX5m8Wd9sDVC9yav"
+
+    def sign(self, hex_bytes):
+        return base58check(client.SIGNATURE_PREFIXES["edsig"] + bytes(client.SIGNATURE_SIZE))
+
+
+class ClientTest(unittest.TestCase):
+    def setUp(self):
+        self.node = StubNode()
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.node = self.node
+        # Handlers of keep-alive connections are not waited for on close
+        server.daemon_threads = True
+        server.block_on_close = False
+        thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.client = client.Client("http://127.0.0.1:%d" % server.server_port, StubSigner())
+        self.addCleanup(self.client.close)
+        self.contract = self.client.contract(CONTRACT)
+
+    def test_send_splits_batches_over_the_limits(self):
+        hashes = self.client.send([self.contract.vote(value) for value in range(5)])
+        # 5 calls are split in halves until each operation fits: 3 (2 + 1) and 2
+        self.assertEqual(hashes, ["oo0", "oo1", "oo2"])
+        self.assertEqual(self.node.injected(), [[(11, 0), (12, 1)], [(13, 2)], [(14, 3), (15, 4)]])
+
+    def test_failed_simulation_gives_back_the_counters(self):
+        self.client.send([self.contract.vote(0)])
+        with self.assertRaises(client.SimulationError):
+            self.client.send([self.contract.vote(1), self.contract.vote(FAILING)])
+        self.assertEqual(self.client.counter, 11)
+        self.client.send([self.contract.vote(2)])
+        self.assertEqual(self.node.injected(), [[(11, 0)], [(12, 2)]])
+
+    def test_wait_raises_on_a_failed_receipt(self):
+        applied = self.client.send([self.contract.vote(0)])
+        self.client.wait(applied)
+        failed = self.client.send([self.contract.vote(FAILING_ON_CHAIN)])
+        with self.assertRaises(client.OperationFailed) as raised:
+            self.client.wait(applied + failed)
+        self.assertEqual(raised.exception.op_hash, failed[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
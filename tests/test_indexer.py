@@ -0,0 +1,90 @@
+"""Index the blocks of tests/fixtures/indexer_blocks.json and check the tables.
+
+The fixture is in the format written by `indexer.py --record`: an
+AcademicRecord whose owner approves and executes one of two proposals (the
+other expires without being cleaned up) and changes owner, and a BakingSwap
+with two deposits, one of them withdrawn.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import indexer  # noqa: E402
+
+FIXTURE = os.path.join(HERE, "fixtures", "indexer_blocks.json")
+RECORD = "KT1A91VqdhR8Xg6bRWDaC4h8MK9KfYo9o4Vi"
+SWAP = "KT1BhFRuvKL9E8ggxycsHDf8qS42HLvCrXYr"
+OWNER = "tz1KqTpEZ7Yob7QbPE4Hy4Wo8fHG8LhKxZSx"
+SIGNER = "tz1gjaF81ZRRvdzjobyfVNsAeSC6PScjfQwN"
+DEPOSITOR = "tz1faswCTDciRzE4oJ9jn2Vm2dvjeyA9fUzU"
+CONTRACTS = {RECORD: "AcademicRecord", SWAP: "BakingSwap"}
+# Time of the last fixture block
+NOW = 1700093040
+
+OPEN_PROPOSALS = """
+    SELECT p.proposal_id FROM proposals p JOIN records r ON r.address = p.record
+    WHERE r.owner = ? AND p.status = 'pending' AND p.expires_at > ?
+    ORDER BY p.proposal_id
+"""
+
+
+class IndexerFixtureTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = os.path.join(directory.name, "gradeblock.db")
+
+    def index(self, to_level=None):
+        run = indexer.Indexer(self.database, indexer.FixtureSource(FIXTURE), CONTRACTS)
+        self.addCleanup(run.db.close)
+        run.run(10, to_level)
+        return run.db
+
+    def test_tables(self):
+        db = self.index()
+        self.assertEqual(db.execute("SELECT value FROM state WHERE name = 'last_level'").fetchone(), (14,))
+        # The failed approval is left out
+        self.assertEqual(
+            db.execute("SELECT level, entrypoint FROM operations ORDER BY level, op_hash").fetchall(),
+            [
+                (10, "propose_update"), (10, "propose_update"), (11, "approve_update"), (12, "execute_update"),
+                (13, "deposit"), (13, "deposit"), (14, "withdraw"), (14, "change_ownership"),
+            ],
+        )
+        # Read from storage at level 10 (with the owner in binary form), then followed through events
+        self.assertEqual(
+            db.execute("SELECT student_identifier, owner, record_hash, created_at, updated_level FROM records").fetchall(),
+            [("123456", SIGNER, "a1" * 32, NOW, 14)],
+        )
+        self.assertEqual(
+            db.execute("SELECT proposal_id, status, vote_count, expires_at FROM proposals ORDER BY proposal_id").fetchall(),
+            [(0, "executed", 1, 1700604800), (1, "pending", 0, 1700090000)],
+        )
+        self.assertEqual(
+            db.execute("SELECT owner, deposit_id, amount, due, status FROM deposits ORDER BY deposit_id").fetchall(),
+            [(DEPOSITOR, 0, 10700000, 1700096580, "withdrawn"), (DEPOSITOR, 1, 21400000, 1700096580, "open")],
+        )
+
+    def test_expired_proposals_are_not_open(self):
+        db = self.index(to_level=11)
+        # Both proposals are pending; proposal 1 is only open until it expires
+        self.assertEqual(db.execute(OPEN_PROPOSALS, (OWNER, 1700006460)).fetchall(), [(0,), (1,)])
+        self.assertEqual(db.execute(OPEN_PROPOSALS, (OWNER, 1700090000)).fetchall(), [(0,)])
+
+    def test_resume(self):
+        self.index(to_level=12)
+        self.index()
+        db = sqlite3.connect(self.database)
+        self.addCleanup(db.close)
+        self.assertEqual(db.execute("SELECT COUNT(*) FROM operations").fetchone(), (8,))
+        self.assertEqual(db.execute("SELECT status FROM deposits WHERE deposit_id = 0").fetchone(), ("withdrawn",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Run loadgen.py --smoke: one short shard per contract on the simulator models."""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import loadgen  # noqa: E402
+
+
+class LoadgenSmokeTest(unittest.TestCase):
+    def test_smoke(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "loadgen_output.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                status = loadgen.main(["--smoke", "--output", output])
+            with open(output) as f:
+                reports = json.load(f)["shards"]
+        self.assertEqual(status, 0)
+        self.assertEqual([report["shard"] for report in reports], [loadgen.shard_id(contract, 0) for contract in loadgen.GENERATORS])
+        for report in reports:
+            self.assertIsNone(report["error"])
+            self.assertEqual(report["calls"], loadgen.SMOKE_LENGTH)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Round-trip transcripts through record_schema and check its rejections."""
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import record_schema  # noqa: E402
+
+CATALOG = {101: "Math", 202: "Physics", 303: "History"}
+RECORD = {"courses": [
+    {"code": 101, "name": "Math", "grade": "A+", "term": "2024 Fall"},
+    {"code": 202, "name": "Physics", "grade": "I", "term": "2023 Spring"},
+    {"code": 303, "name": "History", "grade": "NP", "term": "2025 Winter"},
+]}
+
+
+class RecordSchemaTest(unittest.TestCase):
+    def test_transcript_round_trip(self):
+        transcript = record_schema.encode_transcript(RECORD, CATALOG)
+        # Grades are indexes into GRADES, from the first to the last
+        self.assertEqual(transcript, {
+            101: {"grade": 0, "term": 20243},
+            202: {"grade": 16, "term": 20231},
+            303: {"grade": 14, "term": 20254},
+        })
+        self.assertEqual(record_schema.decode_transcript(transcript, CATALOG), RECORD)
+
+    def test_courses_by_name(self):
+        record = {"courses": [{"name": "Physics", "grade": "B-", "term": "2024 Summer"}]}
+        self.assertEqual(record_schema.encode_transcript(record, CATALOG), {202: {"grade": 5, "term": 20242}})
+
+    def test_term_encoding(self):
+        for season, number in record_schema.SEASONS.items():
+            term = "1999 %s" % season
+            self.assertEqual(record_schema.encode_term(term), 19990 + number)
+            self.assertEqual(record_schema.decode_term(19990 + number), term)
+
+    def test_out_of_range_grades_are_rejected(self):
+        for grade in ["E", "a", ""]:
+            with self.assertRaises(ValueError):
+                record_schema.encode_grade(grade)
+        for value in [-1, len(record_schema.GRADES)]:
+            with self.assertRaises(ValueError):
+                record_schema.decode_grade(value)
+
+    def test_out_of_range_seasons_are_rejected(self):
+        for term in ["2024 Autumn", "2024", "Fall 2024", "-2024 Fall"]:
+            with self.assertRaises(ValueError):
+                record_schema.encode_term(term)
+        for value in [20240, 20245, 20249]:
+            with self.assertRaises(ValueError):
+                record_schema.decode_term(value)
+
+    def test_unknown_and_duplicate_courses_are_rejected(self):
+        for courses in [
+            [{"name": "Chemistry", "grade": "A", "term": "2024 Fall"}],
+            [{"code": 101, "grade": "A", "term": "2024 Fall"}, {"name": "Math", "grade": "B", "term": "2024 Fall"}],
+        ]:
+            with self.assertRaises(ValueError):
+                record_schema.encode_transcript({"courses": courses}, CATALOG)
+
+
+if __name__ == "__main__":
+    unittest.main()
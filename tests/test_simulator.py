@@ -0,0 +1,84 @@
+"""Replay fixed seeds through the simulator.py models and check where they end.
+
+The call sequences are loadgen.py's shards, generated on the models only (as
+with --smoke), so they mix valid and invalid calls to every entry point the
+generators use. The expected states were recorded from the models; a change
+to a model's checks or effects shows up here as a changed outcome.
+"""
+
+import os
+import random
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import benchmark  # noqa: E402
+import loadgen  # noqa: E402
+import simulator  # noqa: E402
+
+LENGTH = 300
+
+
+def replay(contract):
+    """Run shard 0 of seed "0" on the models; return them and the number of valid calls."""
+    rng = loadgen.shard_rng("0", contract, 0)
+    _, models, ops = loadgen.GENERATORS[contract](None, None, rng, LENGTH, dict(benchmark.BOOTSTRAP), None)
+    return models, sum(op.valid for op in ops)
+
+
+class ReplayTest(unittest.TestCase):
+    def test_academic_record(self):
+        models, valid = replay("AcademicRecord")
+        model = models["contract"]
+        self.assertEqual(valid, 78)
+        self.assertEqual(model.record_hash.hex()[:16], "24d27293c2deab3f")
+        self.assertEqual(model.owner, "bootstrap3")
+        self.assertEqual((model.next_proposal_id, model.oldest_proposal_id, sorted(model.proposals)), (17, 17, []))
+
+    def test_multisig(self):
+        models, valid = replay("Multisig")
+        model = models["contract"]
+        self.assertEqual(valid, 76)
+        self.assertEqual((model.threshold, model.signatory_count, model.signatory_mask), (1, 1, 16))
+        self.assertEqual(model.next_proposal_ids, {"bootstrap5": 34})
+        self.assertEqual(model.oldest_proposal_ids, {"bootstrap5": 33})
+        self.assertEqual(model.cleanup_cursors, {"bootstrap5": 34})
+        self.assertEqual(sorted(model.proposals["bootstrap5"]), [33])
+
+    def test_academic_record_with_multisig(self):
+        models, valid = replay("AcademicRecordWithMultisig")
+        multisig, record = models["multisig"], models["record"]
+        self.assertEqual(valid, 42)
+        self.assertEqual(record.record_hash.hex()[:16], "28e110b33d93e6bc")
+        self.assertEqual(record.owner, "bootstrap1")
+        self.assertEqual(multisig.next_proposal_ids, {"record": 16})
+        self.assertEqual(sorted(multisig.proposals["record"]), [0, 2, 3, 4, 5, 7, 10, 11, 13, 14, 15])
+
+    def test_baking_swap(self):
+        models, valid = replay("BakingSwap")
+        model = models["contract"]
+        self.assertEqual(valid, 109)
+        self.assertEqual((model.collateral, model.balance), (1180220000, 1270220000))
+        self.assertEqual((model.rate, model.duration, model.next_deposit_id), (0, 2, 59))
+        self.assertEqual(sorted(model.ledger)[:4], [("bootstrap2", 55), ("bootstrap2", 58), ("bootstrap4", 50), ("bootstrap5", 43)])
+        self.assertEqual(len(model.ledger), 4)
+        self.assertEqual((len(model.buckets), sum(size for size, _ in model.buckets.values())), (40, 54))
+
+
+class SimulationTest(unittest.TestCase):
+    def test_baking_swap(self):
+        result = simulator.simulate_baking_swap(2000, 700, 1, 1000 * 10**6, 10 * 10**6, 60, 100, random.Random("0"))
+        self.assertEqual(result, {
+            "deposits": 1437, "refused": 563, "collateral": 2381, "lowest_collateral": 2381,
+            "open_deposits": 1437, "owed": 15285688053, "balance": 15285690434,
+        })
+
+    def test_multisig(self):
+        result = simulator.simulate_multisig(10, 3, 20000, 1.0, 10, random.Random("0"))
+        self.assertEqual(result, {"proposals": 9979, "executed": 908, "pending": 5110, "peak_pending": 5194})
+
+
+if __name__ == "__main__":
+    unittest.main()
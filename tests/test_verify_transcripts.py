@@ -0,0 +1,98 @@
+"""Check verify_transcripts.py: the packed bytes, the reports and the pool run.
+
+PACKED is `sp.pack` of TRANSCRIPT as computed by SmartPy.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import verify_transcripts  # noqa: E402
+
+TRANSCRIPT = {101: {"grade": 1, "term": 20243}, 7: {"grade": 16, "term": 19994}}
+PACKED = bytes.fromhex("0502000000190704000707070010009ab802070400a501070700010093bc02")
+CATALOG = {7: "Latin", 101: "Math"}
+
+
+def record(record_id, details=TRANSCRIPT, digest=None):
+    digest = hashlib.blake2b(PACKED, digest_size=32).digest() if digest is None else digest
+    return {"id": record_id, "record_details": details, "record_hash": "0x" + digest.hex()}
+
+
+class PackTest(unittest.TestCase):
+    def test_golden_value(self):
+        self.assertEqual(verify_transcripts.pack_transcript(TRANSCRIPT), PACKED)
+        self.assertEqual(verify_transcripts.transcript_hash(TRANSCRIPT), hashlib.blake2b(PACKED, digest_size=32).digest())
+
+    def test_json_and_human_readable_forms(self):
+        as_json = json.loads(json.dumps(TRANSCRIPT))
+        self.assertEqual(verify_transcripts.normalize_transcript(as_json), TRANSCRIPT)
+        readable = {"courses": [
+            {"code": 101, "grade": "A", "term": "2024 Fall"},
+            {"name": "Latin", "grade": "I", "term": "1999 Winter"},
+        ]}
+        self.assertEqual(verify_transcripts.normalize_transcript(readable, CATALOG), TRANSCRIPT)
+
+
+class VerifyRecordTest(unittest.TestCase):
+    def test_reports(self):
+        self.assertIsNone(verify_transcripts.verify_record(record("a")))
+        self.assertEqual(verify_transcripts.verify_record(record("b", digest=bytes(32)))["status"], "mismatch")
+        self.assertEqual(verify_transcripts.verify_record({"id": "c", "record_details": TRANSCRIPT}), {"id": "c", "status": "missing hash"})
+
+    def test_malformed_records_are_invalid(self):
+        for entry in [
+            [1, 2],
+            record("d", details=[1, 2]),
+            record("e", details={"101": [1, 20243]}),
+            record("f", details={"101": {"grade": -1, "term": 20243}}),
+            dict(record("g"), record_hash=12),
+        ]:
+            self.assertEqual(verify_transcripts.verify_record(entry)["status"], "invalid", entry)
+
+
+class MainTest(unittest.TestCase):
+    def run_main(self, lines, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "records.jsonl")
+            output = os.path.join(directory, "failures.jsonl")
+            with open(path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            with contextlib.redirect_stderr(io.StringIO()):
+                status = verify_transcripts.main([path, "--stream", "--output", output] + list(args))
+            with open(output) as f:
+                return status, [json.loads(line) for line in f]
+
+    def test_malformed_line_is_reported(self):
+        lines = [json.dumps(record("a")), '{"id": "b", "record_details": ', json.dumps(record("c"))]
+        status, failures = self.run_main(lines, "--workers", "1")
+        self.assertEqual(status, 1)
+        self.assertEqual([(failure["line"], failure["status"]) for failure in failures], [(2, "invalid")])
+
+    def test_parallel_run_keeps_input_order(self):
+        lines = []
+        for index in range(40):
+            digest = bytes(32) if index % 7 == 3 else None
+            lines.append(json.dumps(record("r%d" % index, digest=digest) if index != 20 else ["not", "a", "record"]))
+        status, failures = self.run_main(lines, "--workers", "2", "--chunk-size", "3")
+        self.assertEqual(status, 1)
+        self.assertEqual(
+            [(failure["id"], failure["status"]) for failure in failures],
+            [("r3", "mismatch"), ("r10", "mismatch"), ("r17", "mismatch"), (None, "invalid"), ("r24", "mismatch"), ("r31", "mismatch"), ("r38", "mismatch")],
+        )
+
+    def test_all_valid(self):
+        status, failures = self.run_main([json.dumps(record("r%d" % index)) for index in range(5)], "--workers", "2")
+        self.assertEqual((status, failures), (0, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
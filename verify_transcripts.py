@@ -0,0 +1,264 @@
+"""Bulk off-chain verification of transcripts against their on-chain hashes.
+
+Usage:
+    python verify_transcripts.py RECORDS [--hashes HASHES] [--catalog CATALOG]
+                                 [--stream] [--workers N] [--chunk-size 1000]
+                                 [--output -]
+
+AcademicRecord and AcademicRecordWithMultisig store
+`record_hash = blake2b(pack(record_details))`, computed by `generate_hash`.
+This tool computes the same bytes without a node: transcripts are packed the
+way Michelson packs a `map nat (pair nat nat)` value and hashed with a 32-byte
+blake2b, so employers can check any number of exported records against hashes
+read once from the chain.
+
+RECORDS is a JSON list of records, or with --stream a JSON Lines file read one
+line at a time ("-" reads standard input), so memory does not grow with the
+number of records. Each record is:
+
+    {"id": "KT1...", "record_details": {"101": {"grade": 1, "term": 20243}}}
+
+`record_details` is either the on-chain form above or the human-readable form
+of record_schema.py ({"courses": [...]}, which needs --catalog). The expected
+hash comes from the record's own "record_hash" or from HASHES, a JSON object
+from record id to hash. A hash is a hex string ("0x" optional) or a Micheline
+bytes node ({"bytes": "..."}) as returned by the node RPC, e.g. when running
+the `get_record_hash` view.
+
+Records are checked in chunks of --chunk-size over a process pool, with a
+bounded number of chunks in flight. Every record that does not match (wrong
+hash, no hash, or details that are not a valid transcript) is written as a JSON
+line to --output, in input order, and a summary is printed to standard error.
+Entries that are not record objects, and with --stream lines that are not
+valid JSON, are reported as invalid too (with their line number) rather than
+stopping the run.
+The script exits with status 1 when any record fails.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import record_schema
+
+# Micheline binary encoding (the format of PACK, after its 0x05 prefix)
+PACK_PREFIX = b"\x05"
+INT_TAG = b"\x00"
+SEQUENCE_TAG = b"\x02"
+PRIM_2_ARGS_TAG = b"\x07"
+ELT = b"\x04"
+PAIR = b"\x07"
+
+HASH_SIZE = 32
+
+# Catalog of the worker process, set by the pool initializer
+catalog = None
+
+# A --stream line that is not valid JSON, reported as an invalid record
+MalformedLine = namedtuple("MalformedLine", "line error")
+
+
+def encode_nat(value):
+    """Encode a nat as a Micheline int node (zarith, sign bit clear)."""
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError("Not a nat: %r" % (value,))
+    out = bytearray([value & 0x3F])
+    value >>= 6
+    while value:
+        out[-1] |= 0x80
+        out.append(value & 0x7F)
+        value >>= 7
+    return INT_TAG + bytes(out)
+
+
+def encode_sequence(items):
+    """Encode a Micheline sequence: 4-byte big-endian length, then its items."""
+    body = b"".join(items)
+    return SEQUENCE_TAG + len(body).to_bytes(4, "big") + body
+
+
+def encode_course(course):
+    """Encode a course record (grade, term) as `Pair grade term`."""
+    return PRIM_2_ARGS_TAG + PAIR + encode_nat(course["grade"]) + encode_nat(course["term"])
+
+
+def pack_transcript(transcript):
+    """Return `sp.pack` of an on-chain transcript (course code to course).
+
+    Map entries are `Elt key value` nodes sorted by key, as in Michelson.
+    """
+    return PACK_PREFIX + encode_sequence(
+        PRIM_2_ARGS_TAG + ELT + encode_nat(code) + encode_course(transcript[code]) for code in sorted(transcript)
+    )
+
+
+def transcript_hash(transcript):
+    """Return the hash `generate_hash` computes for a transcript."""
+    return hashlib.blake2b(pack_transcript(transcript), digest_size=HASH_SIZE).digest()
+
+
+def normalize_transcript(details, catalog=None):
+    """Return record details in the on-chain form with int keys.
+
+    Args:
+        details (dict): on-chain form (course codes may be strings, as in JSON)
+            or the human-readable form of record_schema.py.
+        catalog (dict): course code (int) to course name, for the human-readable form.
+    """
+    if not isinstance(details, dict):
+        raise ValueError("Record details are not an object: %r" % (details,))
+    if "courses" in details:
+        if catalog is None:
+            raise ValueError("Human-readable record needs a catalog")
+        return record_schema.encode_transcript(details, catalog)
+    transcript = {}
+    for code, course in details.items():
+        if not isinstance(course, dict):
+            raise ValueError("Course %s is not an object: %r" % (code, course))
+        transcript[int(code)] = {"grade": course["grade"], "term": course["term"]}
+    return transcript
+
+
+def parse_hash(value):
+    """Return the bytes of a hex hash or of a Micheline bytes node."""
+    if isinstance(value, dict):
+        value = value["bytes"]
+    if value.startswith("0x"):
+        value = value[2:]
+    digest = bytes.fromhex(value)
+    if len(digest) != HASH_SIZE:
+        raise ValueError("Not a %d-byte hash: %r" % (HASH_SIZE, value))
+    return digest
+
+
+def verify_record(record):
+    """Return None if the record matches its expected hash, or a failure report."""
+    if isinstance(record, MalformedLine):
+        return {"id": None, "line": record.line, "status": "invalid", "error": record.error}
+    if not isinstance(record, dict):
+        return {"id": None, "status": "invalid", "error": "Not a record object: %r" % (record,)}
+    record_id = record.get("id")
+    try:
+        if record.get("record_hash") is None:
+            return {"id": record_id, "status": "missing hash"}
+        expected = parse_hash(record["record_hash"])
+        actual = transcript_hash(normalize_transcript(record["record_details"], catalog))
+    except (AttributeError, KeyError, TypeError, ValueError) as error:
+        return {"id": record_id, "status": "invalid", "error": str(error)}
+    if actual != expected:
+        return {"id": record_id, "status": "mismatch", "expected": "0x" + expected.hex(), "actual": "0x" + actual.hex()}
+    return None
+
+
+def verify_chunk(records):
+    """Verify a chunk of records; return their count and the failure reports."""
+    failures = [report for report in map(verify_record, records) if report is not None]
+    return len(records), failures
+
+
+def init_worker(worker_catalog):
+    global catalog
+    catalog = worker_catalog
+
+
+def read_records(path, stream):
+    """Yield records from a JSON list, or one per line with `stream`.
+
+    A line that is not valid JSON is yielded as a MalformedLine.
+    """
+    handle = sys.stdin if path == "-" else open(path)
+    try:
+        if not stream:
+            yield from json.load(handle)
+            return
+        for number, line in enumerate(handle, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as error:
+                    yield MalformedLine(number, str(error))
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def with_hashes(records, hashes):
+    """Attach the expected hash from `hashes` to records that do not carry one."""
+    for record in records:
+        # Ids are strings, as the keys of `hashes`; other entries are reported by verify_record
+        record_id = record.get("id") if isinstance(record, dict) else None
+        if isinstance(record_id, str) and record.get("record_hash") is None and record_id in hashes:
+            record = dict(record, record_hash=hashes[record_id])
+        yield record
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def verify_all(records, workers, chunk_size, catalog=None):
+    """Yield (count, failures) per chunk, in input order.
+
+    At most a few chunks per worker are read ahead, so a streamed input is
+    never held in memory as a whole.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(catalog,)) as pool:
+        in_flight = deque()
+        for chunk in chunked(records, chunk_size):
+            in_flight.append(pool.submit(verify_chunk, chunk))
+            if len(in_flight) >= 4 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def load_catalog(path):
+    with open(path) as f:
+        return {int(code): name for code, name in json.load(f).items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("records", help='JSON list of records, or JSON Lines with --stream ("-" for stdin)')
+    parser.add_argument("--hashes", help="JSON object from record id to on-chain hash")
+    parser.add_argument("--catalog", help="JSON object from course code to course name")
+    parser.add_argument("--stream", action="store_true", help="read records as JSON Lines, one at a time")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--output", default="-", help='file for failure reports ("-" for stdout)')
+    args = parser.parse_args(argv)
+
+    records = read_records(args.records, args.stream)
+    if args.hashes:
+        with open(args.hashes) as f:
+            records = with_hashes(records, json.load(f))
+    catalog = load_catalog(args.catalog) if args.catalog else None
+
+    total = failed = 0
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for count, failures in verify_all(records, args.workers, args.chunk_size, catalog):
+            total += count
+            failed += len(failures)
+            for report in failures:
+                output.write(json.dumps(report) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print("%d records verified, %d failed" % (total, failed), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())